@@ -0,0 +1,61 @@
+from django.contrib import admin, messages
+
+from .models import Supplier, ScoringWeight, RescoreJob, ClusterRefit
+from .rescoring import create_rescore_job, launch_rescore_job
+
+
+@admin.register(Supplier)
+class SupplierAdmin(admin.ModelAdmin):
+    list_display = ('name', 'country', 'industry', 'ethical_score', 'risk_level', 'updated_at')
+    list_filter = ('risk_level', 'industry')
+    search_fields = ('name', 'country')
+
+
+@admin.register(ScoringWeight)
+class ScoringWeightAdmin(admin.ModelAdmin):
+    list_display = ('name', 'is_default', 'created_by', 'updated_at')
+    actions = ['rescore_portfolio']
+
+    @admin.action(description="Rescore all suppliers with the selected profile")
+    def rescore_portfolio(self, request, queryset):
+        if queryset.count() != 1:
+            self.message_user(request, "Select exactly one scoring weight profile.", messages.ERROR)
+            return
+        job = create_rescore_job(queryset.first())
+        launch_rescore_job(job)
+        self.message_user(
+            request,
+            f"Started rescore job {job.id} for {job.total} suppliers. Suppliers evaluated before "
+            f"their external data inputs were stored are scored without external data."
+        )
+
+
+@admin.register(RescoreJob)
+class RescoreJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'scoring_weight', 'status', 'processed', 'total', 'last_supplier_id', 'updated_at')
+    list_filter = ('status',)
+    readonly_fields = (
+        'scoring_weight', 'weights', 'status', 'last_supplier_id', 'processed', 'total',
+        'error', 'created_at', 'updated_at', 'finished_at'
+    )
+    actions = ['resume_jobs']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Resume the selected jobs")
+    def resume_jobs(self, request, queryset):
+        jobs = queryset.exclude(status='completed')
+        for job in jobs:
+            launch_rescore_job(job)
+        self.message_user(request, f"Resumed {len(jobs)} rescore jobs.")
+
+
+@admin.register(ClusterRefit)
+class ClusterRefitAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'reason', 'changed', 'requested_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('status', 'reason', 'changed', 'error', 'requested_at', 'started_at', 'finished_at')
+
+    def has_add_permission(self, request):
+        return False
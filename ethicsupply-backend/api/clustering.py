@@ -0,0 +1,237 @@
+import os
+import sys
+import logging
+import subprocess
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Supplier, ClusterCount, ClusterRefit
+from .ml_model import EthicalScoringModel, CLUSTER_FEATURES, cluster_features, scientific_libs_available
+
+logger = logging.getLogger(__name__)
+
+# Fewest suppliers the clustering model is fitted on
+MIN_CLUSTER_SUPPLIERS = 5
+
+# Seconds after which a refit still marked running is assumed to have died
+REFIT_TIMEOUT = 3600
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def assign_cluster(supplier_data, model=None):
+    """
+    Cluster label for a supplier that is about to be saved
+
+    Only predicts; the supplier is absorbed into the online model by
+    absorb_supplier once its row has been committed.
+
+    Args:
+        supplier_data: Dict of supplier metrics
+        model: Optional EthicalScoringModel holding the shared clustering model
+
+    Returns:
+        The cluster label, or None if no clustering model is available yet
+    """
+    if not scientific_libs_available():
+        return None
+
+    model = model or EthicalScoringModel()
+    return model.get_supplier_cluster(supplier_data)
+
+
+def absorb_supplier(supplier_data, model=None):
+    """
+    Absorb a committed new supplier into this process's copy of the online clustering model
+
+    Costs a single mini-batch step. When the model has drifted past its
+    threshold, or none has been fitted yet, a full refit is requested (see
+    request_recluster).
+
+    Args:
+        supplier_data: Dict of supplier metrics
+        model: Optional EthicalScoringModel holding the shared clustering model
+    """
+    if not scientific_libs_available():
+        return
+
+    model = model or EthicalScoringModel()
+    model.update_clustering(supplier_data)
+    if refit_due(model):
+        request_recluster('drift' if model.clustering_stats is not None else 'no model')
+
+
+def refit_due(model):
+    """Whether the clustering model should be refit on the full supplier table"""
+    drift = model.clustering_drift()
+    if drift is None:
+        # No online model yet: fit one as soon as there are enough suppliers
+        return Supplier.objects.values_list('id')[MIN_CLUSTER_SUPPLIERS - 1:MIN_CLUSTER_SUPPLIERS].exists()
+    return drift['refit_due']
+
+
+def request_recluster(reason=''):
+    """
+    Record that a full refit is needed, unless one is already pending or running
+
+    Only the request that inserts the pending row can launch a refit, and only
+    when CLUSTER_REFIT_IN_PROCESS is set; elsewhere (serverless deployments) a
+    scheduled recluster_suppliers --if-needed picks the request up.
+
+    Returns:
+        The new ClusterRefit, or None if a refit was already under way
+    """
+    if _open_refits().exists():
+        return None
+    try:
+        with transaction.atomic():
+            refit = ClusterRefit.objects.create(reason=reason)
+    except IntegrityError:
+        # Another process requested it first
+        return None
+
+    if getattr(settings, 'CLUSTER_REFIT_IN_PROCESS', True):
+        transaction.on_commit(launch_recluster)
+    logger.info(f"Requested clustering refit {refit.id} ({reason})")
+    return refit
+
+
+def _open_refits():
+    stale = timezone.now() - timedelta(seconds=REFIT_TIMEOUT)
+    return ClusterRefit.objects.filter(Q(status='pending') | Q(status='running', started_at__gte=stale))
+
+
+def launch_recluster():
+    """Run recluster_suppliers --if-needed in a detached process, which claims the pending refit"""
+    manage_py = os.path.join(settings.BASE_DIR, 'manage.py')
+    subprocess.Popen(
+        [sys.executable, manage_py, 'recluster_suppliers', '--if-needed'],
+        start_new_session=True
+    )
+    logger.info("Launched background clustering refit")
+
+
+def claim_recluster():
+    """
+    Claim the pending refit request for this process
+
+    The request is moved to running with a conditional update, so of several
+    processes racing for it exactly one gets it. Nothing is claimed while
+    another refit is running.
+
+    Returns:
+        The claimed ClusterRefit, or None
+    """
+    stale = timezone.now() - timedelta(seconds=REFIT_TIMEOUT)
+    if ClusterRefit.objects.filter(status='running', started_at__gte=stale).exists():
+        return None
+    refit = ClusterRefit.objects.filter(status='pending').first()
+    if refit is None:
+        return None
+    if not ClusterRefit.objects.filter(id=refit.id, status='pending').update(status='running', started_at=timezone.now()):
+        return None
+    refit.refresh_from_db()
+    return refit
+
+
+def run_recluster(refit=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Refit the clustering model and record the outcome on a ClusterRefit
+
+    Args:
+        refit: Claimed ClusterRefit; a manual run records a new one
+
+    Returns:
+        The finished ClusterRefit
+    """
+    if refit is None:
+        refit = ClusterRefit.objects.create(status='running', reason='manual', started_at=timezone.now())
+    try:
+        refit.changed = recluster_suppliers(chunk_size=chunk_size)
+    except Exception as e:
+        refit.status = 'failed'
+        refit.error = str(e)
+        refit.finished_at = timezone.now()
+        refit.save(update_fields=['status', 'error', 'finished_at'])
+        raise
+
+    refit.status = 'completed'
+    refit.finished_at = timezone.now()
+    refit.save(update_fields=['status', 'changed', 'finished_at'])
+    # Requests made before this run started are answered by it
+    ClusterRefit.objects.filter(status='pending', requested_at__lte=refit.started_at).update(
+        status='completed', finished_at=refit.finished_at
+    )
+    return refit
+
+
+def recluster_suppliers(chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Refit the clustering model on every supplier and write back changed cluster labels
+
+    Returns:
+        Number of suppliers whose label changed, or None if there are too few
+        suppliers to cluster
+    """
+    fields = [feature for feature, _ in CLUSTER_FEATURES]
+    rows = list(Supplier.objects.order_by('id').values('id', 'cluster_label', *fields))
+    if len(rows) < MIN_CLUSTER_SUPPLIERS:
+        return None
+
+    labels = EthicalScoringModel().fit_clustering(cluster_features(rows))
+
+    changed = [
+        Supplier(id=row['id'], cluster_label=int(label))
+        for row, label in zip(rows, labels)
+        if row['cluster_label'] != label
+    ]
+    for start in range(0, len(changed), chunk_size):
+        with transaction.atomic():
+            Supplier.objects.bulk_update(changed[start:start + chunk_size], ['cluster_label'], batch_size=500)
+
+    # bulk_update bypasses the signals that maintain the counts
+    rebuild_cluster_counts()
+
+    logger.info(f"Reclustered {len(rows)} suppliers, {len(changed)} labels changed")
+    return len(changed)
+
+
+def adjust_cluster_count(label, delta):
+    """Add delta to the stored supplier count of a cluster"""
+    if label is None or not delta:
+        return
+    if ClusterCount.objects.filter(label=label).update(supplier_count=F('supplier_count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            ClusterCount.objects.create(label=label, supplier_count=max(delta, 0))
+    except IntegrityError:
+        # Another request created the row first
+        ClusterCount.objects.filter(label=label).update(supplier_count=F('supplier_count') + delta)
+
+
+def rebuild_cluster_counts():
+    """Recount the suppliers in every cluster from the supplier table"""
+    counts = dict(
+        Supplier.objects.exclude(cluster_label=None).order_by()
+        .values_list('cluster_label').annotate(n=Count('id'))
+    )
+    with transaction.atomic():
+        ClusterCount.objects.exclude(label__in=list(counts)).delete()
+        for label, count in counts.items():
+            ClusterCount.objects.update_or_create(label=label, defaults={'supplier_count': count})
+
+
+def cluster_peer_counts(labels):
+    """
+    Look up the number of suppliers in each of the given clusters
+
+    Returns:
+        Dict of cluster label to supplier count
+    """
+    labels = [label for label in labels if label is not None]
+    return dict(ClusterCount.objects.filter(label__in=labels).values_list('label', 'supplier_count'))
@@ -0,0 +1,230 @@
+import time
+import logging
+import threading
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Supplier, SupplierCubeCell
+from .dashboard import SNAPSHOT_METRICS
+from .response_cache import tag_versions, SUPPLIERS
+
+logger = logging.getLogger(__name__)
+
+CUBE_DIMENSIONS = ('country', 'industry', 'risk_level')
+CUBE_METRICS = SNAPSHOT_METRICS
+
+# Supplier fields whose changes move the cube
+CUBE_FIELDS = CUBE_DIMENSIONS + CUBE_METRICS
+
+CELL_FIELDS = ['supplier_count'] + [f'{metric}_{part}' for metric in CUBE_METRICS for part in ('sum', 'count')]
+
+# Measures a cube query can return
+CUBE_MEASURES = ('count',) + tuple(
+    f'{kind}_{metric}' for metric in CUBE_METRICS for kind in ('sum', 'avg')
+)
+
+
+def _cell_key(values):
+    return tuple(values.get(dimension) or '' for dimension in CUBE_DIMENSIONS)
+
+
+def _cell_deltas(values):
+    deltas = {'supplier_count': 1}
+    for metric in CUBE_METRICS:
+        value = values.get(metric)
+        if value is not None:
+            deltas[f'{metric}_sum'] = value
+            deltas[f'{metric}_count'] = 1
+    return deltas
+
+
+def apply_cube_change(old_values, new_values):
+    """
+    Move the cube from a supplier's old field values to its new ones
+
+    Args:
+        old_values: Dict of CUBE_FIELDS before the write, or None for a new supplier
+        new_values: Dict of CUBE_FIELDS after the write, or None for a deleted supplier
+    """
+    changes = defaultdict(lambda: defaultdict(int))
+    for sign, values in ((-1, old_values), (1, new_values)):
+        if values is not None:
+            for field, delta in _cell_deltas(values).items():
+                changes[_cell_key(values)][field] += sign * delta
+    changes = {
+        key: {field: delta for field, delta in deltas.items() if delta}
+        for key, deltas in changes.items()
+    }
+    changes = {key: deltas for key, deltas in changes.items() if deltas}
+    if not changes:
+        return
+
+    with transaction.atomic():
+        for key, deltas in changes.items():
+            cell = dict(zip(CUBE_DIMENSIONS, key))
+            updates = {field: F(field) + delta for field, delta in deltas.items()}
+            if SupplierCubeCell.objects.filter(**cell).update(**updates):
+                continue
+            # Unbuilt cubes are built from the table on first read, which includes this write
+            if not SupplierCubeCell.objects.exists():
+                return
+            try:
+                with transaction.atomic():
+                    SupplierCubeCell.objects.create(**cell, **deltas)
+            except IntegrityError:
+                # Another request created the cell first
+                SupplierCubeCell.objects.filter(**cell).update(**updates)
+
+
+def rebuild_cube():
+    """
+    Reconcile the cube with the supplier table
+
+    Recomputes every cell with one grouped query and rewrites only the cells
+    that have drifted.
+
+    Returns:
+        Number of cells that had drifted from the table
+    """
+    sums = {}
+    for metric in CUBE_METRICS:
+        sums[f'{metric}_sum'] = Coalesce(Sum(metric), Value(0.0))
+        sums[f'{metric}_count'] = Count(metric)
+    grouped = (
+        Supplier.objects.order_by()
+        .annotate(**{f'cube_{dimension}': Coalesce(dimension, Value('')) for dimension in CUBE_DIMENSIONS})
+        .values(*(f'cube_{dimension}' for dimension in CUBE_DIMENSIONS))
+        .annotate(supplier_count=Count('id'), **sums)
+    )
+    computed = {
+        tuple(values.pop(f'cube_{dimension}') for dimension in CUBE_DIMENSIONS): values
+        for values in grouped
+    }
+
+    with transaction.atomic():
+        stored = {
+            tuple(getattr(cell, dimension) for dimension in CUBE_DIMENSIONS): cell
+            for cell in SupplierCubeCell.objects.select_for_update()
+        }
+        changed, created = [], []
+        for key, values in computed.items():
+            cell = stored.pop(key, None)
+            if cell is None:
+                created.append(SupplierCubeCell(**dict(zip(CUBE_DIMENSIONS, key)), **values))
+                continue
+            drifted = False
+            for field in CELL_FIELDS:
+                if abs(getattr(cell, field) - values[field]) > 1e-6 * max(1.0, abs(values[field])):
+                    setattr(cell, field, values[field])
+                    drifted = True
+            if drifted:
+                changed.append(cell)
+
+        SupplierCubeCell.objects.filter(id__in=[cell.id for cell in stored.values()]).delete()
+        SupplierCubeCell.objects.bulk_update(changed, CELL_FIELDS, batch_size=500)
+        SupplierCubeCell.objects.bulk_create(created, batch_size=500)
+
+    # Cells emptied by deletes and moves are cleaned up here, but are not drift
+    corrected = len(changed) + len(created) + sum(1 for cell in stored.values() if cell.supplier_count)
+    if corrected:
+        logger.info(f"Supplier cube rebuilt, {corrected} cells corrected")
+    return corrected
+
+
+class CubeCache:
+    """
+    Process-wide copy of the non-empty cube cells
+
+    Reloaded, in one query of the cube table, whenever the suppliers
+    response-cache tag has been invalidated since the last load, and in any
+    case once the copy is refresh_after seconds old, so that cells written by
+    other workers or management commands are picked up even when the tag is
+    local to this process. Answering a query never touches the supplier table.
+    """
+
+    def __init__(self, refresh_after=15.0):
+        self.refresh_after = refresh_after
+        self._lock = threading.Lock()
+        self._cells = (None, None, [])  # (suppliers tag version, load time, list of (key, field values))
+
+    def _fresh(self, version, now):
+        loaded_version, loaded_at, _ = self._cells
+        return loaded_version == version and loaded_at is not None and now - loaded_at < self.refresh_after
+
+    def cells(self):
+        version = tag_versions([SUPPLIERS])[SUPPLIERS]
+        now = time.monotonic()
+        if self._fresh(version, now):
+            return self._cells[2]
+        with self._lock:
+            if not self._fresh(version, now):
+                cells_query = SupplierCubeCell.objects.filter(supplier_count__gt=0).values_list(*CUBE_DIMENSIONS, *CELL_FIELDS)
+                rows = list(cells_query)
+                if not rows and not SupplierCubeCell.objects.exists():
+                    rebuild_cube()
+                    rows = list(cells_query.all())
+                n = len(CUBE_DIMENSIONS)
+                cells = [(row[:n], dict(zip(CELL_FIELDS, row[n:]))) for row in rows]
+                self._cells = (version, now, cells)
+            return self._cells[2]
+
+    def clear(self):
+        with self._lock:
+            self._cells = (None, None, [])
+
+
+cube_cache = CubeCache()
+
+
+def cube_query(filters=None, group_by=(), measures=('count',)):
+    """
+    Roll up or drill down the cube
+
+    Args:
+        filters: Dict of dimension -> list of accepted values ('' for none)
+        group_by: Dimensions to break the result down by; empty for one grand total
+        measures: Names from CUBE_MEASURES
+
+    Returns:
+        List of dicts with the group_by dimension values and the measures,
+        largest supplier count first
+    """
+    filters = filters or {}
+    for dimension in list(filters) + list(group_by):
+        if dimension not in CUBE_DIMENSIONS:
+            raise ValueError(f"dimensions must be among {', '.join(CUBE_DIMENSIONS)}")
+    unknown = [measure for measure in measures if measure not in CUBE_MEASURES]
+    if unknown:
+        raise ValueError(f"unknown measures {', '.join(unknown)}")
+
+    positions = {dimension: index for index, dimension in enumerate(CUBE_DIMENSIONS)}
+    accepted = [(positions[dimension], set(values)) for dimension, values in filters.items()]
+    group_positions = [positions[dimension] for dimension in group_by]
+
+    totals = defaultdict(lambda: dict.fromkeys(CELL_FIELDS, 0))
+    for key, values in cube_cache.cells():
+        if all(key[position] in allowed for position, allowed in accepted):
+            total = totals[tuple(key[position] for position in group_positions)]
+            for field in CELL_FIELDS:
+                total[field] += values[field]
+    if not group_by and not totals:
+        totals[()] = dict.fromkeys(CELL_FIELDS, 0)
+
+    result = []
+    for group, total in sorted(totals.items(), key=lambda item: -item[1]['supplier_count']):
+        row = {dimension: value or None for dimension, value in zip(group_by, group)}
+        for measure in measures:
+            if measure == 'count':
+                row[measure] = total['supplier_count']
+                continue
+            kind, metric = measure.split('_', 1)
+            if kind == 'sum':
+                row[measure] = total[f'{metric}_sum']
+            else:
+                count = total[f'{metric}_count']
+                row[measure] = total[f'{metric}_sum'] / count if count else None
+        result.append(row)
+    return result
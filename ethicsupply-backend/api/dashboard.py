@@ -0,0 +1,391 @@
+import math
+import random
+import logging
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Case, Count, F, IntegerField, Max, Min, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Supplier, DashboardSnapshot
+from .portfolio import supplier_metric_fields
+
+logger = logging.getLogger(__name__)
+
+# Score distribution buckets shown on the dashboard: (label, exclusive lower bound, inclusive upper bound)
+SCORE_BUCKETS = (
+    ('0-20', None, 20),
+    ('21-40', 20, 40),
+    ('41-60', 40, 60),
+    ('61-80', 60, 80),
+    ('81-100', 80, 100),
+)
+
+SCORE_FIELDS = ('ethical_score', 'environmental_score', 'social_score', 'governance_score')
+
+# Metrics whose sums and non-null counts the snapshot keeps for every rollup
+SNAPSHOT_METRICS = SCORE_FIELDS + ('co2_emissions', 'water_usage')
+
+# Rollup dimensions of the snapshot besides the portfolio total and the score buckets
+SNAPSHOT_DIMENSIONS = ('country', 'industry', 'risk_level')
+
+# Supplier fields whose changes move the snapshot
+SNAPSHOT_FIELDS = SNAPSHOT_DIMENSIONS + SNAPSHOT_METRICS
+
+# Fields a histogram can be grouped by
+HISTOGRAM_GROUPS = ('industry', 'country')
+
+# Upper limit on histogram bins, which bounds the size of the bin expression
+MAX_HISTOGRAM_BINS = 200
+
+
+def bucket_label(value):
+    """Label of the score distribution bucket holding value, or None if it falls outside all of them"""
+    if value is None:
+        return None
+    for label, lower, upper in SCORE_BUCKETS:
+        if (lower is None or value > lower) and value <= upper:
+            return label
+    return None
+
+
+def _bucket_filter(field, lower, upper):
+    if lower is None:
+        return Q(**{f'{field}__lte': upper})
+    return Q(**{f'{field}__gt': lower, f'{field}__lte': upper})
+
+
+def portfolio_overview(suppliers):
+    """
+    Totals, score averages and score distributions of suppliers, in one query
+
+    Every distribution bucket is a conditional count, so the whole overview is
+    a single aggregate whatever the number of suppliers.
+
+    Returns:
+        Dict with total_suppliers, avg_<score> for each score field,
+        <score>_distribution lists of {'range', 'count'}, and the min_id/max_id
+        used for sampling
+    """
+    aggregates = {
+        'total_suppliers': Count('id'),
+        'min_id': Min('id'),
+        'max_id': Max('id'),
+    }
+    for field in SCORE_FIELDS:
+        aggregates[f'avg_{field}'] = Avg(field)
+        for index, (_, lower, upper) in enumerate(SCORE_BUCKETS):
+            aggregates[f'{field}_bucket_{index}'] = Count('id', filter=_bucket_filter(field, lower, upper))
+
+    row = suppliers.order_by().aggregate(**aggregates)
+    overview = {
+        'total_suppliers': row['total_suppliers'],
+        'min_id': row['min_id'],
+        'max_id': row['max_id'],
+    }
+    for field in SCORE_FIELDS:
+        overview[f'avg_{field}'] = row[f'avg_{field}'] or 0
+        overview[f'{field}_distribution'] = [
+            {'range': label, 'count': row[f'{field}_bucket_{index}']}
+            for index, (label, _, _) in enumerate(SCORE_BUCKETS)
+        ]
+    return overview
+
+
+def histogram_fields():
+    """Supplier fields a histogram can be computed for"""
+    return list(SCORE_FIELDS) + [field for field in supplier_metric_fields() if field not in SCORE_FIELDS]
+
+
+def metric_histogram(suppliers, field, bins=10, lower=None, upper=None, group_by=None):
+    """
+    Equal-width histogram of a supplier field, counted in one grouped query
+
+    Each row's bin index is a CASE expression over the bin edges, which runs
+    unchanged on SQLite and PostgreSQL. Bins are closed on the left, and the
+    last one also holds values equal to upper. Null values and values outside
+    [lower, upper] are not counted.
+
+    Args:
+        suppliers: Supplier queryset to count
+        field: One of histogram_fields()
+        bins: Number of bins, at most MAX_HISTOGRAM_BINS
+        lower: Lower edge of the first bin; defaults to the field's minimum
+        upper: Upper edge of the last bin; defaults to the field's maximum
+        group_by: Optional field of HISTOGRAM_GROUPS to count each value of separately
+
+    Returns:
+        Dict with field, min, max, bin_width, total, bins (list of
+        {'range', 'lower', 'upper', 'count'}) and, when grouped, groups
+        (list of {'key', 'total', 'counts'}, counts aligned with bins)
+    """
+    if field not in histogram_fields():
+        raise ValueError(f"field must be one of {', '.join(histogram_fields())}")
+    if group_by is not None and group_by not in HISTOGRAM_GROUPS:
+        raise ValueError(f"group_by must be one of {', '.join(HISTOGRAM_GROUPS)}")
+    if not 1 <= bins <= MAX_HISTOGRAM_BINS:
+        raise ValueError(f"bins must be between 1 and {MAX_HISTOGRAM_BINS}")
+
+    suppliers = suppliers.order_by()
+    if lower is None or upper is None:
+        bounds = suppliers.aggregate(lower=Min(field), upper=Max(field))
+        lower = bounds['lower'] if lower is None else lower
+        upper = bounds['upper'] if upper is None else upper
+    if lower is None or upper is None:
+        # No supplier has a value for the field
+        lower = upper = 0.0
+    if not (math.isfinite(lower) and math.isfinite(upper)):
+        raise ValueError("min and max must be finite")
+    if upper < lower:
+        raise ValueError("max must not be less than min")
+
+    width = (upper - lower) / bins
+    edges = [lower + index * width for index in range(bins)] + [upper]
+    histogram = {
+        'field': field,
+        'min': lower,
+        'max': upper,
+        'bin_width': width,
+        'bins': [
+            {'range': f'{edges[index]:g}-{edges[index + 1]:g}', 'lower': edges[index], 'upper': edges[index + 1], 'count': 0}
+            for index in range(bins)
+        ],
+    }
+
+    # Bins of zero width (lower == upper) leave every value in the first one
+    whens = [When(**{f'{field}__lt': edges[index + 1]}, then=Value(index)) for index in range(bins - 1)] if width else []
+    counted = (
+        suppliers.filter(**{f'{field}__gte': lower, f'{field}__lte': upper})
+        .annotate(histogram_bin=Case(*whens, default=Value(bins - 1 if width else 0), output_field=IntegerField()))
+    )
+    group_fields = ['histogram_bin'] + ([group_by] if group_by else [])
+    rows = counted.values(*group_fields).annotate(count=Count('id'))
+
+    groups = defaultdict(lambda: [0] * bins)
+    for row in rows:
+        histogram['bins'][row['histogram_bin']]['count'] += row['count']
+        if group_by:
+            groups[row[group_by]][row['histogram_bin']] += row['count']
+
+    histogram['total'] = sum(bucket['count'] for bucket in histogram['bins'])
+    if group_by:
+        histogram['groups'] = sorted(
+            ({'key': key, 'total': sum(counts), 'counts': counts} for key, counts in groups.items()),
+            key=lambda group: -group['total'],
+        )
+    return histogram
+
+
+def sample_suppliers(suppliers, size, min_id, max_id, oversample=4):
+    """
+    Random sample of suppliers without sorting the whole table
+
+    Draws random ids between min_id and max_id and fetches those that exist
+    by primary key, in one query. Ids are drawn oversample times the sample
+    size so that gaps left by deleted suppliers rarely shrink the sample.
+
+    Returns:
+        List of at most size Supplier instances
+    """
+    if not size or min_id is None:
+        return []
+    span = max_id - min_id + 1
+    candidates = random.sample(range(min_id, max_id + 1), min(span, size * oversample))
+    sample = list(suppliers.order_by().filter(id__in=candidates)[:size * oversample])
+    random.shuffle(sample)
+    return sample[:size]
+
+
+def _snapshot_contributions(values):
+    """Snapshot rows a supplier with these field values counts towards, as (dimension, key) -> field deltas"""
+    totals = {'supplier_count': 1}
+    for metric in SNAPSHOT_METRICS:
+        value = values.get(metric)
+        if value is not None:
+            totals[f'{metric}_sum'] = value
+            totals[f'{metric}_count'] = 1
+
+    rows = {('total', ''): totals}
+    for dimension in SNAPSHOT_DIMENSIONS:
+        rows[(dimension, values.get(dimension) or '')] = totals
+    for field in SCORE_FIELDS:
+        label = bucket_label(values.get(field))
+        if label is not None:
+            rows[(f'{field}_bucket', label)] = {'supplier_count': 1}
+    return rows
+
+
+def apply_snapshot_change(old_values, new_values):
+    """
+    Move the snapshot from a supplier's old field values to its new ones
+
+    Args:
+        old_values: Dict of SNAPSHOT_FIELDS before the write, or None for a new supplier
+        new_values: Dict of SNAPSHOT_FIELDS after the write, or None for a deleted supplier
+    """
+    changes = defaultdict(lambda: defaultdict(int))
+    for sign, values in ((-1, old_values), (1, new_values)):
+        if values is not None:
+            for row, deltas in _snapshot_contributions(values).items():
+                for field, delta in deltas.items():
+                    changes[row][field] += sign * delta
+    changes = {
+        row: {field: delta for field, delta in deltas.items() if delta}
+        for row, deltas in changes.items()
+    }
+    changes = {row: deltas for row, deltas in changes.items() if deltas}
+    if not changes:
+        return
+
+    with transaction.atomic():
+        # An unbuilt snapshot is rebuilt from the table on first read, which includes this write
+        totals = changes.pop(('total', ''), None)
+        if totals:
+            if not _add_to_row(('total', ''), totals):
+                return
+        elif not DashboardSnapshot.objects.select_for_update().filter(dimension='total').exists():
+            return
+        for row, deltas in changes.items():
+            if not _add_to_row(row, deltas):
+                try:
+                    with transaction.atomic():
+                        DashboardSnapshot.objects.create(dimension=row[0], key=row[1], **deltas)
+                except IntegrityError:
+                    # Another request created the row first
+                    _add_to_row(row, deltas)
+
+
+def _add_to_row(row, deltas):
+    dimension, key = row
+    return DashboardSnapshot.objects.filter(dimension=dimension, key=key).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def _computed_snapshot():
+    """Snapshot rows computed from the supplier table, as (dimension, key) -> field values"""
+    sums = {}
+    for metric in SNAPSHOT_METRICS:
+        sums[f'{metric}_sum'] = Coalesce(Sum(metric), Value(0.0))
+        sums[f'{metric}_count'] = Count(metric)
+
+    suppliers = Supplier.objects.order_by()
+    rows = {('total', ''): suppliers.aggregate(supplier_count=Count('id'), **sums)}
+    for dimension in SNAPSHOT_DIMENSIONS:
+        grouped = (
+            suppliers.annotate(snapshot_key=Coalesce(dimension, Value(''))).values('snapshot_key')
+            .annotate(supplier_count=Count('id'), **sums)
+        )
+        for values in grouped:
+            key = values.pop('snapshot_key')
+            rows[(dimension, key)] = values
+
+    overview = portfolio_overview(suppliers)
+    for field in SCORE_FIELDS:
+        for bucket in overview[f'{field}_distribution']:
+            if bucket['count']:
+                rows[(f'{field}_bucket', bucket['range'])] = {'supplier_count': bucket['count']}
+    return rows
+
+
+def rebuild_dashboard_snapshot():
+    """
+    Reconcile the snapshot with the supplier table
+
+    Recomputes every rollup with grouped queries and rewrites only the rows
+    that have drifted. The total row is created if need be and locked before
+    anything is computed, so concurrent rebuilds (two first reads, say) run
+    one after the other, as do the snapshot updates of supplier writes.
+    Writes racing with the rebuild may still need another one.
+
+    Returns:
+        Number of snapshot rows that had drifted from the table
+    """
+    fields = ['supplier_count'] + [f'{metric}_{part}' for metric in SNAPSHOT_METRICS for part in ('sum', 'count')]
+
+    with transaction.atomic():
+        DashboardSnapshot.objects.get_or_create(dimension='total', key='')
+        stored = {(row.dimension, row.key): row for row in DashboardSnapshot.objects.select_for_update()}
+        computed = _computed_snapshot()
+        changed, created = [], []
+        for key, values in computed.items():
+            row = stored.pop(key, None)
+            if row is None:
+                created.append(DashboardSnapshot(dimension=key[0], key=key[1], **values))
+                continue
+            drifted = False
+            for field in fields:
+                value = values.get(field, 0)
+                if abs(getattr(row, field) - value) > 1e-6 * max(1.0, abs(value)):
+                    setattr(row, field, value)
+                    drifted = True
+            if drifted:
+                changed.append(row)
+
+        DashboardSnapshot.objects.filter(id__in=[row.id for row in stored.values()]).delete()
+        DashboardSnapshot.objects.bulk_update(changed, fields, batch_size=500)
+        DashboardSnapshot.objects.bulk_create(created, batch_size=500)
+
+    # Rows emptied by deletes and moves are cleaned up here, but are not drift
+    corrected = len(changed) + len(created) + sum(1 for row in stored.values() if row.supplier_count)
+    if corrected:
+        logger.info(f"Dashboard snapshot rebuilt, {corrected} rows corrected")
+    return corrected
+
+
+def _average(row, metric):
+    count = getattr(row, f'{metric}_count')
+    return getattr(row, f'{metric}_sum') / count if count else None
+
+
+def dashboard_snapshot():
+    """
+    Dashboard rollups read from the snapshot table in one query
+
+    The snapshot is built from the supplier table the first time it is read.
+
+    Returns:
+        Dict with overview (total_suppliers, avg_<score> and <score>_distribution
+        as returned by portfolio_overview, plus avg_co2_emissions), risk_levels,
+        countries and industries (each key -> supplier count, None for
+        unspecified), and industry_rollup: industry -> dict with count,
+        co2_emissions (total) and water_usage (average)
+    """
+    rows = list(DashboardSnapshot.objects.all())
+    if not any(row.dimension == 'total' for row in rows):
+        rebuild_dashboard_snapshot()
+        rows = list(DashboardSnapshot.objects.all())
+
+    by_dimension = defaultdict(dict)
+    for row in rows:
+        if row.supplier_count > 0:
+            by_dimension[row.dimension][row.key] = row
+
+    total = by_dimension['total'].get('')
+    overview = {'total_suppliers': total.supplier_count if total else 0}
+    for metric in SNAPSHOT_METRICS:
+        overview[f'avg_{metric}'] = (_average(total, metric) if total else None) or 0
+    for field in SCORE_FIELDS:
+        buckets = by_dimension[f'{field}_bucket']
+        overview[f'{field}_distribution'] = [
+            {'range': label, 'count': buckets[label].supplier_count if label in buckets else 0}
+            for label, _, _ in SCORE_BUCKETS
+        ]
+
+    def counts(dimension, default):
+        return {key or default: row.supplier_count for key, row in by_dimension[dimension].items()}
+
+    return {
+        'overview': overview,
+        'risk_levels': counts('risk_level', None),
+        'countries': counts('country', ''),
+        'industries': counts('industry', None),
+        'industry_rollup': {
+            key or None: {
+                'count': row.supplier_count,
+                'co2_emissions': row.co2_emissions_sum if row.co2_emissions_count else None,
+                'water_usage': _average(row, 'water_usage'),
+            }
+            for key, row in by_dimension['industry'].items()
+        },
+    }
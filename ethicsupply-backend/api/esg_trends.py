@@ -0,0 +1,175 @@
+import logging
+import datetime
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+
+from .models import ESGTrendRollup, SupplierESGReport
+
+logger = logging.getLogger(__name__)
+
+TREND_SCORES = ('environmental_score', 'social_score', 'governance_score')
+
+# Report fields whose changes move the rollup
+TREND_FIELDS = ('report_date',) + TREND_SCORES
+
+ROLLUP_FIELDS = ('report_count',) + tuple(f'{score}_sum' for score in TREND_SCORES)
+
+
+def parse_month(value):
+    """Parse a YYYY-MM or YYYY-MM-DD query parameter into the first day of its month"""
+    try:
+        parsed = datetime.datetime.strptime(value, '%Y-%m-%d' if len(value) > 7 else '%Y-%m').date()
+    except ValueError:
+        raise ValueError(f"'{value}' is not a YYYY-MM or YYYY-MM-DD date")
+    return parsed.replace(day=1)
+
+
+def _report_contribution(values):
+    """Rollup row a report with these values counts towards, as ((month, industry), field deltas)"""
+    deltas = {'report_count': 1}
+    for score in TREND_SCORES:
+        deltas[f'{score}_sum'] = values[score]
+    return (values['report_date'].replace(day=1), values.get('industry') or ''), deltas
+
+
+def _apply(changes):
+    changes = {
+        row: {field: delta for field, delta in deltas.items() if delta}
+        for row, deltas in changes.items()
+    }
+    with transaction.atomic():
+        for (month, industry), deltas in changes.items():
+            if not deltas:
+                continue
+            updates = {field: F(field) + delta for field, delta in deltas.items()}
+            if ESGTrendRollup.objects.filter(month=month, industry=industry).update(**updates):
+                continue
+            try:
+                with transaction.atomic():
+                    ESGTrendRollup.objects.create(month=month, industry=industry, **deltas)
+            except IntegrityError:
+                # Another request created the row first
+                ESGTrendRollup.objects.filter(month=month, industry=industry).update(**updates)
+
+
+def apply_report_change(old_values, new_values):
+    """
+    Move the rollup from a report's old values to its new ones
+
+    Args:
+        old_values: Dict of TREND_FIELDS plus the supplier's industry before
+            the write, or None for a new report
+        new_values: The same after the write, or None for a deleted report
+    """
+    changes = defaultdict(lambda: defaultdict(float))
+    for sign, values in ((-1, old_values), (1, new_values)):
+        if values is not None:
+            row, deltas = _report_contribution(values)
+            for field, delta in deltas.items():
+                changes[row][field] += sign * delta
+    _apply(changes)
+
+
+def move_supplier_reports(supplier_id, old_industry, new_industry):
+    """Move a supplier's reports to its new industry's rollup rows, with one grouped query over its reports"""
+    if (old_industry or '') == (new_industry or ''):
+        return
+    changes = defaultdict(lambda: defaultdict(float))
+    for values in _monthly_totals(SupplierESGReport.objects.filter(supplier_id=supplier_id)):
+        for field in ROLLUP_FIELDS:
+            changes[(values['month'], old_industry or '')][field] -= values[field]
+            changes[(values['month'], new_industry or '')][field] += values[field]
+    _apply(changes)
+
+
+def _monthly_totals(reports, by_industry=False):
+    """Report counts and score sums of reports grouped by month (and industry), in one query"""
+    groups = {'month': TruncMonth('report_date')}
+    if by_industry:
+        groups['rollup_industry'] = Coalesce('supplier__industry', Value(''))
+    sums = {f'{score}_sum': Sum(score) for score in TREND_SCORES}
+    return (
+        reports.order_by().annotate(**groups).values(*groups)
+        .annotate(report_count=Count('id'), **sums)
+    )
+
+
+def rebuild_esg_trends():
+    """
+    Reconcile the trend rollup with the report table
+
+    Returns:
+        Number of rollup rows that had drifted from the table
+    """
+    computed = {
+        (values['month'], values['rollup_industry']): values
+        for values in _monthly_totals(SupplierESGReport.objects.all(), by_industry=True)
+    }
+
+    with transaction.atomic():
+        stored = {(row.month, row.industry): row for row in ESGTrendRollup.objects.select_for_update()}
+        changed, created = [], []
+        for key, values in computed.items():
+            row = stored.pop(key, None)
+            if row is None:
+                created.append(ESGTrendRollup(
+                    month=key[0], industry=key[1], **{field: values[field] for field in ROLLUP_FIELDS}
+                ))
+                continue
+            drifted = False
+            for field in ROLLUP_FIELDS:
+                if abs(getattr(row, field) - values[field]) > 1e-6 * max(1.0, abs(values[field])):
+                    setattr(row, field, values[field])
+                    drifted = True
+            if drifted:
+                changed.append(row)
+
+        ESGTrendRollup.objects.filter(id__in=[row.id for row in stored.values()]).delete()
+        ESGTrendRollup.objects.bulk_update(changed, ROLLUP_FIELDS, batch_size=500)
+        ESGTrendRollup.objects.bulk_create(created, batch_size=500)
+
+    # Rows emptied by deletes and moves are cleaned up here, but are not drift
+    corrected = len(changed) + len(created) + sum(1 for row in stored.values() if row.report_count)
+    if corrected:
+        logger.info(f"ESG trend rollup rebuilt, {corrected} rows corrected")
+    return corrected
+
+
+def esg_trends(start=None, end=None, industry=None):
+    """
+    Monthly average ESG scores of all reports, read from the rollup in one grouped query
+
+    Args:
+        start: First month to include (a date; the day is ignored)
+        end: Last month to include (a date; the day is ignored)
+        industry: Only count reports of suppliers in this industry
+
+    Returns:
+        List of dicts with date (YYYY-MM), report_count, ethical_score (mean of
+        the three category averages) and the average of each category score,
+        oldest month first
+    """
+    rows = ESGTrendRollup.objects.filter(report_count__gt=0)
+    if start is not None:
+        rows = rows.filter(month__gte=start.replace(day=1))
+    if end is not None:
+        rows = rows.filter(month__lte=end.replace(day=1))
+    if industry is not None:
+        rows = rows.filter(industry=industry)
+
+    sums = {f'{score}_sum': Sum(f'{score}_sum') for score in TREND_SCORES}
+    months = rows.order_by('month').values('month').annotate(report_count=Sum('report_count'), **sums)
+
+    trends = []
+    for values in months:
+        averages = {score: values[f'{score}_sum'] / values['report_count'] for score in TREND_SCORES}
+        trends.append({
+            'date': values['month'].strftime('%Y-%m'),
+            'report_count': values['report_count'],
+            'ethical_score': round(sum(averages.values()) / len(TREND_SCORES), 1),
+            **{score: round(average, 1) for score, average in averages.items()},
+        })
+    return trends
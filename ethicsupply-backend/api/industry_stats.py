@@ -0,0 +1,226 @@
+import math
+import logging
+from collections import defaultdict
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import IndustryStats, Supplier
+
+logger = logging.getLogger(__name__)
+
+# Numeric supplier fields the statistics cover: every metric and score
+STATS_FIELDS = tuple(
+    field.name for field in Supplier._meta.concrete_fields if isinstance(field, models.FloatField)
+)
+
+# Supplier fields whose changes move the statistics
+INDUSTRY_STATS_FIELDS = ('industry',) + STATS_FIELDS
+
+
+def _empty_stat():
+    return {'count': 0, 'sum': 0.0, 'sumsq': 0.0, 'min': None, 'max': None}
+
+
+def _add(stat, value):
+    stat['count'] += 1
+    stat['sum'] += value
+    stat['sumsq'] += value * value
+    stat['min'] = value if stat['min'] is None else min(stat['min'], value)
+    stat['max'] = value if stat['max'] is None else max(stat['max'], value)
+
+
+def _remove(stat, value):
+    """Take value out of stat; returns True if the minimum or maximum must be recomputed"""
+    stat['count'] -= 1
+    stat['sum'] -= value
+    stat['sumsq'] -= value * value
+    if stat['count'] <= 0:
+        stat.update(_empty_stat())
+        return False
+    return (stat['min'] is not None and value <= stat['min']) or (stat['max'] is not None and value >= stat['max'])
+
+
+def apply_industry_stats_change(old_values, new_values):
+    """
+    Move the industry statistics from a supplier's old field values to its new ones
+
+    Each affected industry row is read, updated and written back under a row
+    lock. Removing a value that was an industry's minimum or maximum
+    recomputes that bound with one aggregate over the industry.
+
+    Args:
+        old_values: Dict of INDUSTRY_STATS_FIELDS before the write, or None for a new supplier
+        new_values: Dict of INDUSTRY_STATS_FIELDS after the write, or None for a deleted supplier
+    """
+    if old_values == new_values:
+        return
+    changes = defaultdict(list)
+    for sign, values in ((-1, old_values), (1, new_values)):
+        if values is not None:
+            changes[values.get('industry') or ''].append((sign, values))
+
+    with transaction.atomic():
+        for industry, industry_changes in changes.items():
+            row = IndustryStats.objects.select_for_update().filter(industry=industry).first()
+            if row is None:
+                # Unbuilt statistics are computed from the table on first read, which includes this write
+                if not IndustryStats.objects.exists():
+                    return
+                row = _create_row(industry)
+
+            stale_bounds = set()
+            for sign, values in industry_changes:
+                row.supplier_count += sign
+                for field in STATS_FIELDS:
+                    value = values.get(field)
+                    if value is None:
+                        continue
+                    stat = row.stats.setdefault(field, _empty_stat())
+                    if sign > 0:
+                        _add(stat, value)
+                    elif _remove(stat, value):
+                        stale_bounds.add(field)
+
+            if stale_bounds and row.supplier_count > 0:
+                _recompute_bounds(row, stale_bounds)
+            row.save(update_fields=['supplier_count', 'stats', 'updated_at'])
+
+
+def _create_row(industry):
+    try:
+        with transaction.atomic():
+            return IndustryStats.objects.create(industry=industry)
+    except IntegrityError:
+        # Another request created the row first
+        return IndustryStats.objects.select_for_update().get(industry=industry)
+
+
+def _industry_suppliers(industry):
+    if industry:
+        return Supplier.objects.filter(industry=industry)
+    return Supplier.objects.filter(Q(industry__isnull=True) | Q(industry=''))
+
+
+def _recompute_bounds(row, fields):
+    """Reset the minimum and maximum of fields from the industry's suppliers, in one aggregate"""
+    aggregates = {}
+    for field in fields:
+        aggregates[f'{field}__min'] = Min(field)
+        aggregates[f'{field}__max'] = Max(field)
+    bounds = _industry_suppliers(row.industry).order_by().aggregate(**aggregates)
+    for field in fields:
+        row.stats[field]['min'] = bounds[f'{field}__min']
+        row.stats[field]['max'] = bounds[f'{field}__max']
+
+
+def _computed_stats():
+    """Statistics computed from the supplier table, as industry -> (supplier count, stats)"""
+    aggregates = {}
+    for field in STATS_FIELDS:
+        aggregates[f'{field}__count'] = Count(field)
+        aggregates[f'{field}__sum'] = Coalesce(Sum(field), Value(0.0))
+        aggregates[f'{field}__sumsq'] = Coalesce(Sum(F(field) * F(field)), Value(0.0))
+        aggregates[f'{field}__min'] = Min(field)
+        aggregates[f'{field}__max'] = Max(field)
+
+    grouped = (
+        Supplier.objects.order_by().annotate(stats_industry=Coalesce('industry', Value('')))
+        .values('stats_industry').annotate(supplier_count=Count('id'), **aggregates)
+    )
+    computed = {}
+    for values in grouped:
+        stats = {}
+        for field in STATS_FIELDS:
+            if values[f'{field}__count']:
+                stats[field] = {part: values[f'{field}__{part}'] for part in ('count', 'sum', 'sumsq', 'min', 'max')}
+        computed[values['stats_industry']] = (values['supplier_count'], stats)
+    return computed
+
+
+def _drifted(stored, computed):
+    # Fields whose last value was removed are kept empty rather than dropped
+    stored = {field: stat for field, stat in stored.items() if stat.get('count')}
+    if set(stored) != set(computed):
+        return True
+    for field, stat in computed.items():
+        for part, value in stat.items():
+            current = stored[field].get(part)
+            if value is None or current is None:
+                if value != current:
+                    return True
+            elif abs(current - value) > 1e-6 * max(1.0, abs(value)):
+                return True
+    return False
+
+
+def rebuild_industry_stats():
+    """
+    Reconcile the industry statistics with the supplier table
+
+    Recomputes every industry with one grouped query and rewrites only the
+    rows that have drifted.
+
+    Returns:
+        Number of industry rows that had drifted from the table
+    """
+    computed = _computed_stats()
+
+    with transaction.atomic():
+        stored = {row.industry: row for row in IndustryStats.objects.select_for_update()}
+        changed, created = [], []
+        for industry, (supplier_count, stats) in computed.items():
+            row = stored.pop(industry, None)
+            if row is None:
+                created.append(IndustryStats(industry=industry, supplier_count=supplier_count, stats=stats))
+            elif row.supplier_count != supplier_count or _drifted(row.stats, stats):
+                row.supplier_count = supplier_count
+                row.stats = stats
+                row.updated_at = timezone.now()
+                changed.append(row)
+
+        IndustryStats.objects.filter(id__in=[row.id for row in stored.values()]).delete()
+        IndustryStats.objects.bulk_update(changed, ['supplier_count', 'stats', 'updated_at'], batch_size=500)
+        IndustryStats.objects.bulk_create(created, batch_size=500)
+
+    # Rows emptied by deletes and moves are cleaned up here, but are not drift
+    corrected = len(changed) + len(created) + sum(1 for row in stored.values() if row.supplier_count)
+    if corrected:
+        logger.info(f"Industry statistics rebuilt, {corrected} rows corrected")
+    return corrected
+
+
+def industry_stats(industry):
+    """
+    Statistics of one industry's suppliers, read from a single row
+
+    The statistics are built from the supplier table the first time they are read.
+
+    Args:
+        industry: Industry name; None or '' for suppliers without one
+
+    Returns:
+        Dict with supplier_count and fields: field -> dict with count, mean,
+        std (population), min and max, None when no supplier has a value
+    """
+    row = IndustryStats.objects.filter(industry=industry or '').first()
+    if row is None and not IndustryStats.objects.exists():
+        rebuild_industry_stats()
+        row = IndustryStats.objects.filter(industry=industry or '').first()
+
+    fields = {}
+    stats = row.stats if row is not None else {}
+    for field in STATS_FIELDS:
+        stat = stats.get(field) or _empty_stat()
+        count = stat['count']
+        mean = stat['sum'] / count if count else None
+        fields[field] = {
+            'count': count,
+            'mean': mean,
+            'std': math.sqrt(max(0.0, stat['sumsq'] / count - mean * mean)) if count else None,
+            'min': stat['min'] if count else None,
+            'max': stat['max'] if count else None,
+        }
+    return {'supplier_count': row.supplier_count if row is not None else 0, 'fields': fields}
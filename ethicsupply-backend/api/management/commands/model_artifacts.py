@@ -0,0 +1,47 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.ml_model import model_artifacts, scientific_libs_available
+
+
+class Command(BaseCommand):
+    help = (
+        "List the stored versions of the scoring and clustering model artifact, "
+        "or roll back to an earlier one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rollback', nargs='?', type=int, const=0, metavar='VERSION',
+            help="Make VERSION current again (default: the version before the current one)"
+        )
+
+    def handle(self, *args, **options):
+        if not scientific_libs_available():
+            raise CommandError("Model artifacts require numpy, scikit-learn and joblib")
+
+        registry = model_artifacts()
+        if options['rollback'] is not None:
+            try:
+                version = registry.rollback(options['rollback'] or None)
+            except (ValueError, OSError) as e:
+                raise CommandError(f"Rollback failed: {e}")
+            self.stdout.write(self.style.SUCCESS(
+                f"Version {version} is current. Run recluster_suppliers to relabel suppliers with it."
+            ))
+            return
+
+        current = registry.current_version()
+        manifests = registry.versions()
+        if not manifests:
+            self.stdout.write("No model artifact has been published")
+            return
+        for manifest in manifests:
+            stats = manifest.get('clustering_stats') or {}
+            published = datetime.datetime.fromtimestamp(manifest['published_at']).isoformat(timespec='seconds')
+            marker = '*' if manifest['version'] == current else ' '
+            self.stdout.write(
+                f"{marker} {manifest['version']:>5}  {published}  "
+                f"fitted on {stats.get('fitted_on', '-')}, absorbed {stats.get('absorbed', '-')}"
+            )
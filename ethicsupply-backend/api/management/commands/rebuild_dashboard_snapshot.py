@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.dashboard import rebuild_dashboard_snapshot
+from api.esg_trends import rebuild_esg_trends
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile the dashboard snapshot with the supplier table and the ESG trend "
+        "rollup with the report table. Signals keep both current; run this after bulk "
+        "imports or updates that bypass them."
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        corrected = rebuild_dashboard_snapshot()
+        trends_corrected = rebuild_esg_trends()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt dashboard snapshot in {time.monotonic() - started:.1f}s, "
+            f"{corrected} snapshot rows and {trends_corrected} trend rows corrected"
+        ))
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.industry_stats import rebuild_industry_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile the per-industry statistics with the supplier table. Signals keep "
+        "them current; run this after bulk imports or updates that bypass them."
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        corrected = rebuild_industry_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt industry statistics in {time.monotonic() - started:.1f}s, {corrected} rows corrected"
+        ))
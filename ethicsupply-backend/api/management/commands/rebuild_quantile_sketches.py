@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.sketches import rebuild_quantile_sketches
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the per-industry and per-country quantile sketches from the supplier "
+        "table. Signals keep them current; run this after bulk imports or updates that "
+        "bypass them."
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        written = rebuild_quantile_sketches()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} quantile sketches in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.cube import rebuild_cube
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile the country x industry x risk level supplier cube with the supplier "
+        "table. Signals keep it current; run this after bulk imports or updates that "
+        "bypass them."
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        corrected = rebuild_cube()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt supplier cube in {time.monotonic() - started:.1f}s, {corrected} cells corrected"
+        ))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.ml_model import scientific_libs_available
+from api.clustering import DEFAULT_CHUNK_SIZE, claim_recluster, run_recluster
+
+
+class Command(BaseCommand):
+    help = (
+        "Refit the supplier clustering model on the full supplier table and update "
+        "every supplier's cluster label. Between refits the model is updated online. "
+        "With --if-needed, only run the refit web processes have requested; schedule "
+        "that where the server cannot launch it (CLUSTER_REFIT_IN_PROCESS off)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--if-needed', action='store_true', help="Only refit when a refit has been requested")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Labels written per transaction")
+
+    def handle(self, *args, **options):
+        if not scientific_libs_available():
+            raise CommandError("Clustering requires numpy, scikit-learn and joblib")
+
+        refit = None
+        if options['if_needed']:
+            refit = claim_recluster()
+            if refit is None:
+                self.stdout.write("No refit requested, or another refit is running")
+                return
+
+        started = time.monotonic()
+        refit = run_recluster(refit, chunk_size=options['chunk_size'])
+        if refit.changed is None:
+            self.stdout.write("Not enough suppliers to cluster")
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Reclustered suppliers in {time.monotonic() - started:.1f}s, {refit.changed} labels changed"
+        ))
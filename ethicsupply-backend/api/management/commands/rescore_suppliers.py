@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import ScoringWeight, RescoreJob
+from api.rescoring import DEFAULT_CHUNK_SIZE, create_rescore_job, run_rescore_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the stored ethical, E/S/G scores and risk level of every supplier. "
+        "Uses the given scoring weight profile, the default profile, or the built-in weights. "
+        "External data (sentiment, worker satisfaction, controversies) comes from the inputs "
+        "stored on each supplier; suppliers evaluated before those were stored are scored without it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--weights', type=int, help="ScoringWeight id to score with")
+        parser.add_argument('--resume', type=int, metavar='JOB_ID', help="Resume an interrupted rescore job")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Suppliers per chunk and transaction")
+        parser.add_argument('--workers', type=int, default=None, help="Scoring processes (default: up to 4)")
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            try:
+                job = RescoreJob.objects.get(id=options['resume'])
+            except RescoreJob.DoesNotExist:
+                raise CommandError(f"Rescore job {options['resume']} does not exist")
+            if job.status == 'completed':
+                self.stdout.write(f"Rescore job {job.id} already completed")
+                return
+            self.stdout.write(f"Resuming rescore job {job.id} after supplier {job.last_supplier_id}")
+        else:
+            scoring_weight = None
+            if options['weights'] is not None:
+                try:
+                    scoring_weight = ScoringWeight.objects.get(id=options['weights'])
+                except ScoringWeight.DoesNotExist:
+                    raise CommandError(f"ScoringWeight {options['weights']} does not exist")
+            job = create_rescore_job(scoring_weight)
+            self.stdout.write(f"Started rescore job {job.id} for {job.total} suppliers")
+
+        started = time.monotonic()
+        processed_at_start = job.processed
+
+        def report(job):
+            elapsed = time.monotonic() - started
+            rate = (job.processed - processed_at_start) / elapsed if elapsed else 0
+            self.stdout.write(f"  {job.processed}/{job.total} suppliers rescored ({rate:.0f}/s)")
+
+        try:
+            run_rescore_job(job, chunk_size=options['chunk_size'], workers=options['workers'], progress=report)
+        except Exception as e:
+            raise CommandError(f"Rescore job {job.id} failed: {e}. Resume it with --resume {job.id}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rescore job {job.id} completed: {job.processed} suppliers in {time.monotonic() - started:.1f}s"
+        ))
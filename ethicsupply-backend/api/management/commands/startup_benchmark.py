@@ -0,0 +1,100 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Modules that must not be imported to serve a health check
+HEAVY_MODULES = ('numpy', 'pandas', 'sklearn', 'joblib', 'scipy')
+
+# Boots the WSGI application in a fresh interpreter, the way api/index.py does on
+# Vercel, serves one /api/health/ request and reports what it cost
+BOOT_SCRIPT = '''
+import io, json, os, sys, time
+start = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ethicsupply.settings')
+from ethicsupply.wsgi import application
+booted = time.perf_counter()
+environ = {
+    'REQUEST_METHOD': 'GET',
+    'PATH_INFO': '/api/health/',
+    'QUERY_STRING': '',
+    'SERVER_NAME': 'localhost',
+    'SERVER_PORT': '80',
+    'HTTP_HOST': 'localhost',
+    'wsgi.input': io.BytesIO(),
+    'wsgi.errors': sys.stderr,
+    'wsgi.url_scheme': 'http',
+}
+statuses = []
+b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+done = time.perf_counter()
+print(json.dumps({
+    'boot_ms': (booted - start) * 1000,
+    'total_ms': (done - start) * 1000,
+    'status': statuses[0] if statuses else None,
+    'heavy_modules': sorted(name for name in %r if name in sys.modules),
+}))
+''' % (HEAVY_MODULES,)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold-start cost of serving /api/health/: a python -X importtime report "
+        "of the slowest imports plus a wall-clock boot test against a fixed budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget-ms', type=float, default=1000, help="Maximum median cold start in milliseconds")
+        parser.add_argument('--runs', type=int, default=5, help="Number of cold starts to time")
+        parser.add_argument('--top', type=int, default=15, help="Number of slowest imports to list")
+
+    def _run_boot(self, *python_flags):
+        env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+        result = subprocess.run(
+            [sys.executable, *python_flags, '-c', BOOT_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Cold start failed:\n{result.stderr}")
+        return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+    def _import_report(self, stderr, top):
+        # Lines look like: "import time:  self [us] | cumulative | imported package"
+        imports = []
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or 'imported package' in line:
+                continue
+            _, self_us, cumulative_us, name = [part.strip() for part in line.replace('import time:', '|', 1).split('|')]
+            imports.append((int(cumulative_us), int(self_us), name))
+
+        self.stdout.write(f"Slowest imports (of {len(imports)}), cumulative / self in ms:")
+        for cumulative_us, self_us, name in sorted(imports, reverse=True)[:top]:
+            self.stdout.write(f"  {cumulative_us / 1000:8.1f} {self_us / 1000:8.1f}  {name}")
+
+    def handle(self, *args, **options):
+        report, stderr = self._run_boot('-X', 'importtime')
+        self._import_report(stderr, options['top'])
+
+        timings = [self._run_boot()[0] for _ in range(options['runs'])]
+        boot_ms = statistics.median(t['boot_ms'] for t in timings)
+        total_ms = statistics.median(t['total_ms'] for t in timings)
+        self.stdout.write(
+            f"Cold start over {options['runs']} runs (median): "
+            f"WSGI boot {boot_ms:.0f} ms, first /api/health/ response {total_ms:.0f} ms"
+        )
+
+        failures = []
+        if report['status'] is None or not report['status'].startswith('200'):
+            failures.append(f"/api/health/ returned {report['status']}")
+        if report['heavy_modules']:
+            failures.append(f"health check imported {', '.join(report['heavy_modules'])}")
+        if total_ms > options['budget_ms']:
+            failures.append(f"cold start {total_ms:.0f} ms exceeds budget of {options['budget_ms']:.0f} ms")
+
+        if failures:
+            raise CommandError("; ".join(failures))
+        self.stdout.write(self.style.SUCCESS(f"Cold start within {options['budget_ms']:.0f} ms budget"))
@@ -0,0 +1,54 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUMemo:
+    """
+    Bounded, thread-safe memo of computed results, evicted least-recently-used first
+
+    Counts hits and misses so the hit rate can be monitored.
+    """
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        """Return the memoized result for key, computing and storing it on a miss"""
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+
+        # Computed outside the lock; concurrent misses on one key just compute twice
+        result = compute()
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+        return result
+
+    def stats(self):
+        """Return the size and hit/miss counters of the memo"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._results),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self.hits = 0
+            self.misses = 0
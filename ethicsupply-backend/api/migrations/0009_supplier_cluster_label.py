@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-17 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_rescorejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supplier',
+            name='cluster_label',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.3 on 2026-10-17 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_supplier_cluster_label'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClusterCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.IntegerField(unique=True)),
+                ('supplier_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['label'],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.3 on 2026-10-17 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_clustercount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=40)),
+                ('key', models.CharField(blank=True, default='', max_length=100)),
+                ('supplier_count', models.IntegerField(default=0)),
+                ('ethical_score_sum', models.FloatField(default=0)),
+                ('ethical_score_count', models.IntegerField(default=0)),
+                ('environmental_score_sum', models.FloatField(default=0)),
+                ('environmental_score_count', models.IntegerField(default=0)),
+                ('social_score_sum', models.FloatField(default=0)),
+                ('social_score_count', models.IntegerField(default=0)),
+                ('governance_score_sum', models.FloatField(default=0)),
+                ('governance_score_count', models.IntegerField(default=0)),
+                ('co2_emissions_sum', models.FloatField(default=0)),
+                ('co2_emissions_count', models.IntegerField(default=0)),
+                ('water_usage_sum', models.FloatField(default=0)),
+                ('water_usage_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['dimension', 'key'],
+                'unique_together': {('dimension', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.0.3 on 2026-10-17 13:05
+
+from django.db import migrations, models
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+
+
+def build_rollup(apps, schema_editor):
+    """Fill the rollup from the existing reports; signals maintain it from here on"""
+    SupplierESGReport = apps.get_model('api', 'SupplierESGReport')
+    ESGTrendRollup = apps.get_model('api', 'ESGTrendRollup')
+    totals = (
+        SupplierESGReport.objects.order_by()
+        .annotate(month=TruncMonth('report_date'), rollup_industry=Coalesce('supplier__industry', Value('')))
+        .values('month', 'rollup_industry')
+        .annotate(
+            report_count=Count('id'),
+            environmental_score_sum=Sum('environmental_score'),
+            social_score_sum=Sum('social_score'),
+            governance_score_sum=Sum('governance_score'),
+        )
+    )
+    ESGTrendRollup.objects.bulk_create(
+        [
+            ESGTrendRollup(
+                month=values['month'],
+                industry=values['rollup_industry'],
+                report_count=values['report_count'],
+                environmental_score_sum=values['environmental_score_sum'],
+                social_score_sum=values['social_score_sum'],
+                governance_score_sum=values['governance_score_sum'],
+            )
+            for values in totals
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_dashboardsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ESGTrendRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('industry', models.CharField(blank=True, default='', max_length=100)),
+                ('report_count', models.IntegerField(default=0)),
+                ('environmental_score_sum', models.FloatField(default=0)),
+                ('social_score_sum', models.FloatField(default=0)),
+                ('governance_score_sum', models.FloatField(default=0)),
+            ],
+            options={
+                'ordering': ['month', 'industry'],
+                'unique_together': {('month', 'industry')},
+            },
+        ),
+        migrations.RunPython(build_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.3 on 2026-10-17 13:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_esgtrendrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndustryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('industry', models.CharField(blank=True, default='', max_length=100, unique=True)),
+                ('supplier_count', models.IntegerField(default=0)),
+                ('stats', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Industry stats',
+                'ordering': ['industry'],
+            },
+        ),
+    ]
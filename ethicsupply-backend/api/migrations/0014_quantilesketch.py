@@ -0,0 +1,30 @@
+# Generated by Django 5.0.3 on 2026-10-17 14:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_industrystats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuantileSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=40)),
+                ('key', models.CharField(blank=True, default='', max_length=100)),
+                ('metric', models.CharField(max_length=40)),
+                ('count', models.IntegerField(default=0)),
+                ('removed_count', models.IntegerField(default=0)),
+                ('inserted', models.JSONField(default=dict)),
+                ('removed', models.JSONField(default=dict)),
+            ],
+            options={
+                'ordering': ['dimension', 'key', 'metric'],
+                'unique_together': {('dimension', 'key', 'metric')},
+            },
+        ),
+    ]
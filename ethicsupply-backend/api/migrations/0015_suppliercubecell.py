@@ -0,0 +1,39 @@
+# Generated by Django 5.0.3 on 2026-10-17 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_quantilesketch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupplierCubeCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('country', models.CharField(blank=True, default='', max_length=100)),
+                ('industry', models.CharField(blank=True, default='', max_length=100)),
+                ('risk_level', models.CharField(blank=True, default='', max_length=20)),
+                ('supplier_count', models.IntegerField(default=0)),
+                ('ethical_score_sum', models.FloatField(default=0)),
+                ('ethical_score_count', models.IntegerField(default=0)),
+                ('environmental_score_sum', models.FloatField(default=0)),
+                ('environmental_score_count', models.IntegerField(default=0)),
+                ('social_score_sum', models.FloatField(default=0)),
+                ('social_score_count', models.IntegerField(default=0)),
+                ('governance_score_sum', models.FloatField(default=0)),
+                ('governance_score_count', models.IntegerField(default=0)),
+                ('co2_emissions_sum', models.FloatField(default=0)),
+                ('co2_emissions_count', models.IntegerField(default=0)),
+                ('water_usage_sum', models.FloatField(default=0)),
+                ('water_usage_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['country', 'industry', 'risk_level'],
+                'unique_together': {('country', 'industry', 'risk_level')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.3 on 2026-10-17 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_suppliercubecell'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClusterRefit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('reason', models.CharField(blank=True, default='', max_length=100)),
+                ('changed', models.PositiveIntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('requested_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-requested_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='clusterrefit',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('status',), name='one_pending_cluster_refit'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.3 on 2026-10-17 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_clusterrefit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supplier',
+            name='controversy_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='news_sentiment',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='social_media_sentiment',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='worker_satisfaction',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
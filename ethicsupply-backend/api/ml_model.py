@@ -1,28 +1,464 @@
 import os
+import time
 import logging
 import random
+import threading
+import importlib.util
+from types import MappingProxyType
+
+from .memo import LRUMemo
+from .model_registry import artifact_registry
 
 logger = logging.getLogger(__name__)
 
-# Try to import scientific libraries, but provide fallbacks if not available
-try:
-    import numpy as np
-    import pandas as pd
-    from sklearn.cluster import KMeans
-    from sklearn.preprocessing import StandardScaler
-    import joblib
-    SCIENTIFIC_LIBS_AVAILABLE = True
-except ImportError:
-    logger.warning("Scientific libraries not available. Using fallback functionality.")
-    SCIENTIFIC_LIBS_AVAILABLE = False
+# Scientific libraries are imported on first use rather than at import time, so
+# that processes which never score (e.g. a cold start serving /api/health/) do
+# not pay for them. numpy is bound here by scientific_libs_available(); the
+# scikit-learn classes are imported where they are needed.
+np = None
+_scientific_libs_available = None
+
+
+def scientific_libs_available():
+    """Check once whether numpy, scikit-learn and joblib are installed, importing numpy"""
+    global np, _scientific_libs_available
+    if _scientific_libs_available is None:
+        missing = [name for name in ('numpy', 'sklearn', 'joblib') if importlib.util.find_spec(name) is None]
+        if missing:
+            logger.warning("Scientific libraries not available. Using fallback functionality.")
+            _scientific_libs_available = False
+        else:
+            import numpy
+            np = numpy
+            _scientific_libs_available = True
+    return _scientific_libs_available
+
+
+def __getattr__(name):
+    # Keep ml_model.SCIENTIFIC_LIBS_AVAILABLE working for callers outside this module
+    if name == 'SCIENTIFIC_LIBS_AVAILABLE':
+        return scientific_libs_available()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Metrics consumed by calculate_score, in the column order expected by score_batch
+SCORING_METRICS = (
+    'co2_emissions',
+    'water_usage',
+    'energy_efficiency',
+    'waste_management_score',
+    'wage_fairness',
+    'human_rights_index',
+    'diversity_inclusion_score',
+    'community_engagement',
+    'transparency_score',
+    'corruption_risk',
+    'social_media_sentiment',
+    'news_sentiment',
+    'worker_satisfaction',
+    'controversy_count',
+)
+
+# Values calculate_score assumes when a metric is absent from the supplier data
+METRIC_DEFAULTS = {
+    'co2_emissions': 50,
+    'water_usage': 50,
+    'energy_efficiency': 0.5,
+    'waste_management_score': 0.5,
+    'wage_fairness': 0.5,
+    'human_rights_index': 0.5,
+    'diversity_inclusion_score': 0.5,
+    'community_engagement': 0.5,
+    'transparency_score': 0.5,
+    'corruption_risk': 0.5,
+    'social_media_sentiment': None,
+    'news_sentiment': None,
+    'worker_satisfaction': None,
+    'controversy_count': 0,
+}
+
+# External sentiment columns where a missing value (NaN) simply means "no data"
+OPTIONAL_METRICS = ('social_media_sentiment', 'news_sentiment', 'worker_satisfaction')
+
+# E/S/G inputs a supplier reports and can act on itself, unlike the observed external data
+SELF_REPORTED_METRICS = (
+    'co2_emissions',
+    'water_usage',
+    'energy_efficiency',
+    'waste_management_score',
+    'wage_fairness',
+    'human_rights_index',
+    'diversity_inclusion_score',
+    'community_engagement',
+    'transparency_score',
+    'corruption_risk',
+)
+
+# Per metric: direction of improvement (+1 higher is better, -1 lower is better),
+# best attainable value and the span of its scale
+METRIC_SCALES = {
+    'co2_emissions': (-1, 0, 100),
+    'water_usage': (-1, 0, 100),
+    'energy_efficiency': (1, 1, 1),
+    'waste_management_score': (1, 1, 1),
+    'wage_fairness': (1, 1, 1),
+    'human_rights_index': (1, 1, 1),
+    'diversity_inclusion_score': (1, 1, 1),
+    'community_engagement': (1, 1, 1),
+    'transparency_score': (1, 1, 1),
+    'corruption_risk': (-1, 0, 1),
+    'social_media_sentiment': (1, 1, 2),
+    'news_sentiment': (1, 1, 2),
+    'worker_satisfaction': (1, 5, 5),
+    'controversy_count': (-1, 0, 5),
+}
+
+# Measurement error assumed for self-reported metrics in score_uncertainty: a
+# normal error with this standard deviation, as a fraction of the metric's scale
+DEFAULT_METRIC_ERROR = 0.05
+
+# Suppliers x samples x metrics scored per chunk by score_uncertainty
+UNCERTAINTY_CHUNK_VALUES = 8_000_000
+
+# Metrics recommendations act on: category and wording of the action
+RECOMMENDATION_ACTIONS = {
+    'co2_emissions': ('environmental', 'Reduce CO2 emissions', 'CO2 emissions'),
+    'water_usage': ('environmental', 'Reduce water usage', 'Water usage'),
+    'energy_efficiency': ('environmental', 'Improve energy efficiency', 'Energy efficiency'),
+    'waste_management_score': ('environmental', 'Strengthen waste management', 'Waste management'),
+    'wage_fairness': ('social', 'Improve wage fairness', 'Wage fairness'),
+    'human_rights_index': ('social', 'Strengthen human rights practices', 'Human rights'),
+    'diversity_inclusion_score': ('social', 'Expand diversity and inclusion programs', 'Diversity and inclusion'),
+    'community_engagement': ('social', 'Increase community engagement', 'Community engagement'),
+    'transparency_score': ('governance', 'Increase transparency', 'Transparency'),
+    'corruption_risk': ('governance', 'Reduce corruption risk', 'Corruption risk'),
+}
+
+# Lowest overall score of each risk level, as used by determine_risk_level
+RISK_LEVEL_THRESHOLDS = {
+    'low': 80,
+    'medium': 50,
+    'high': 0,
+}
+
+# Supplier metrics the clustering model groups on, with the value assumed when one is missing
+CLUSTER_FEATURES = (
+    ('co2_emissions', 50),
+    ('water_usage', 50),
+    ('energy_efficiency', 0.5),
+    ('waste_management_score', 0.5),
+    ('wage_fairness', 0.5),
+    ('human_rights_index', 0.5),
+    ('diversity_inclusion_score', 0.5),
+    ('transparency_score', 0.5),
+    ('corruption_risk', 0.5),
+)
+
+# Online clustering: a full refit is due once the smoothed squared distance of newly
+# absorbed suppliers to their centroid exceeds the distance measured at the last fit
+# by CLUSTER_DRIFT_THRESHOLD, or once the model has absorbed more than
+# CLUSTER_MAX_ABSORBED_FRACTION of the population it was fitted on
+CLUSTER_DRIFT_THRESHOLD = 1.5
+CLUSTER_MAX_ABSORBED_FRACTION = 0.5
+CLUSTER_MIN_DRIFT_SAMPLES = 50
+CLUSTER_DRIFT_SMOOTHING = 0.02
+
+# Serializes in-place updates of the shared clustering model
+_clustering_lock = threading.Lock()
+
+# Memo of calculate_score and predict_impact results, shared by all model instances
+# and keyed by the weights fingerprint plus the normalized metric values
+score_memo = LRUMemo(max_size=8192)
+
+# Versioned artifact directory of the saved model, and the pickle written by earlier releases
+MODEL_ARTIFACT_PATH = os.path.join(os.path.dirname(__file__), 'models', 'ethical_scoring_model')
+LEGACY_MODEL_PATH = os.path.join(os.path.dirname(__file__), 'models', 'ethical_scoring_model.joblib')
+
+
+def metrics_to_columns(records):
+    """
+    Convert supplier dicts into the columnar layout expected by score_batch
+
+    Absent metrics take the same defaults as calculate_score, while explicit
+    None values become NaN so that score_batch treats them exactly like the
+    scalar path does.
+
+    Args:
+        records: Iterable of dicts keyed by metric name
+
+    Returns:
+        A float array of shape (n_suppliers, len(SCORING_METRICS)), or a list of
+        column lists when scientific libraries are not available
+    """
+    columns = [[] for _ in SCORING_METRICS]
+    for record in records:
+        for column, metric in zip(columns, SCORING_METRICS):
+            value = record.get(metric, METRIC_DEFAULTS[metric])
+            try:
+                column.append(float('nan') if value is None else float(value))
+            except (TypeError, ValueError):
+                column.append(float('nan'))
+
+    if scientific_libs_available():
+        return np.array(columns, dtype=float).reshape(len(SCORING_METRICS), -1).T
+    return columns
+
+
+def round_like_scalar(values, digits):
+    """
+    Round an array exactly as Python's round does on each element
+
+    np.round scales by 10 ** digits before rounding, so values a hair above a
+    half-way point (59.650000000000006) can land on the other side of it than
+    the correctly rounded round() of the scalar path.
+    """
+    return np.array([round(value, digits) for value in np.asarray(values, dtype=float).tolist()])
+
+
+def cluster_features(records):
+    """
+    Build the clustering feature matrix from supplier dicts
+
+    Args:
+        records: Iterable of dicts keyed by metric name
+
+    Returns:
+        A float array of shape (n_suppliers, len(CLUSTER_FEATURES))
+    """
+    rows = []
+    for record in records:
+        row = []
+        for feature, default in CLUSTER_FEATURES:
+            value = record.get(feature)
+            row.append(default if value is None else float(value))
+        rows.append(row)
+    return np.array(rows, dtype=float).reshape(-1, len(CLUSTER_FEATURES))
+
+
+_METRIC_DEFAULT_VALUES = tuple(METRIC_DEFAULTS[metric] for metric in SCORING_METRICS)
+
+
+def metric_fingerprint(data):
+    """
+    Tuple of the metric values calculate_score reads from data
+
+    Absent metrics take their defaults, so inputs that score identically share
+    a fingerprint (ints and equal floats also compare and hash equal). Returns
+    None when a value is neither a number nor None, in which case the result
+    is not memoized.
+    """
+    fingerprint = tuple(map(data.get, SCORING_METRICS, _METRIC_DEFAULT_VALUES))
+    for value in fingerprint:
+        if value is not None and not isinstance(value, (int, float)):
+            return None
+    return fingerprint
+
+
+class FeatureScaler:
+    """
+    Standardizes clustering features with a stored mean and scale
+
+    Offers the transform/inverse_transform subset of scikit-learn's
+    StandardScaler, backed by plain arrays that can be memory-mapped.
+    """
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    @classmethod
+    def fit(cls, X):
+        scale = X.std(axis=0)
+        scale[scale == 0] = 1
+        return cls(X.mean(axis=0), scale)
+
+    def transform(self, X):
+        return (X - self.mean_) / self.scale_
+
+    def inverse_transform(self, X):
+        return X * self.scale_ + self.mean_
+
+
+class CentroidModel:
+    """
+    Online k-means model: cluster centroids plus the number of points absorbed by each
+
+    Offers the predict/partial_fit subset of scikit-learn's MiniBatchKMeans,
+    backed by plain arrays. partial_fit takes the same per-sample step as
+    mini-batch k-means, moving the nearest centroid towards the sample by
+    1 / (points absorbed). Memory-mapped (read-only) arrays are copied on the
+    first update.
+    """
+
+    def __init__(self, cluster_centers, counts):
+        self.cluster_centers_ = cluster_centers
+        self.counts_ = counts
+
+    def predict(self, X):
+        distances = (
+            (X ** 2).sum(axis=1)[:, None]
+            - 2 * X @ self.cluster_centers_.T
+            + (self.cluster_centers_ ** 2).sum(axis=1)[None, :]
+        )
+        return distances.argmin(axis=1)
+
+    def partial_fit(self, X):
+        if not self.cluster_centers_.flags.writeable:
+            self.cluster_centers_ = np.array(self.cluster_centers_)
+            self.counts_ = np.array(self.counts_, dtype=float)
+        for x, index in zip(X, self.predict(X)):
+            self.counts_[index] += 1
+            self.cluster_centers_[index] += (x - self.cluster_centers_[index]) / self.counts_[index]
+        return self
+
+
+def _decode_model_artifact(arrays, manifest):
+    """Rebuild the shared model components from a stored artifact version"""
+    artifact = {
+        'version': manifest['version'],
+        'weights': manifest.get('weights'),
+        'clustering_model': None,
+        'scaler': None,
+        'clustering_stats': None,
+    }
+    if 'cluster_centers' in arrays:
+        if manifest.get('features') != [feature for feature, _ in CLUSTER_FEATURES]:
+            logger.warning(
+                f"Model artifact version {manifest['version']} was trained on other features; ignoring its clustering model"
+            )
+        else:
+            artifact['scaler'] = FeatureScaler(arrays['scaler_mean'], arrays['scaler_scale'])
+            artifact['clustering_model'] = CentroidModel(arrays['cluster_centers'], arrays['cluster_counts'])
+            artifact['clustering_stats'] = manifest.get('clustering_stats')
+    return artifact
+
+
+def model_artifacts():
+    """Return the versioned artifact registry of the scoring and clustering model"""
+    return artifact_registry(MODEL_ARTIFACT_PATH, decode=_decode_model_artifact)
+
+
+def score_columns(weights, metrics):
+    """
+    Run score_batch with the given weights
+
+    Module-level so it can be shipped to process pool workers.
+    """
+    return EthicalScoringModel(weights, load_model=False).score_batch(metrics)
+
+
+# Weight keys that multiply each linear score feature, in profile_features column order:
+# (category weight, subcategory weight)
+PROFILE_LINEAR_WEIGHTS = (
+    ('environmental', 'co2_emissions'),
+    ('environmental', 'water_usage'),
+    ('environmental', 'energy_efficiency'),
+    ('environmental', 'waste_management'),
+    ('social', 'wage_fairness'),
+    ('social', 'human_rights'),
+    ('social', 'diversity_inclusion'),
+    ('social', 'community_engagement'),
+    ('governance', 'transparency'),
+    ('governance', 'corruption_risk'),
+)
+PROFILE_EXTERNAL_WEIGHTS = ('social_media', 'news_coverage', 'worker_reviews', 'controversies')
+
+
+def profile_features(X):
+    """
+    Split supplier metrics into the weight-independent parts of calculate_score
+
+    The overall score is (linear @ c) * where(has_external_data, 0.75 + 0.5 * (external @ d), 1)
+    for a profile's coefficients c (PROFILE_LINEAR_WEIGHTS) and d (PROFILE_EXTERNAL_WEIGHTS).
+
+    Args:
+        X: Array of shape (n_suppliers, len(SCORING_METRICS))
+
+    Returns:
+        Tuple of (linear, external, has_external_data, valid) arrays
+    """
+    column = {metric: X[:, i] for i, metric in enumerate(SCORING_METRICS)}
+    linear = np.column_stack([
+        np.maximum(0, 100 - column['co2_emissions']),
+        np.maximum(0, 100 - column['water_usage']),
+        column['energy_efficiency'] * 100,
+        column['waste_management_score'] * 100,
+        column['wage_fairness'] * 100,
+        column['human_rights_index'] * 100,
+        column['diversity_inclusion_score'] * 100,
+        column['community_engagement'] * 100,
+        column['transparency_score'] * 100,
+        (1 - column['corruption_risk']) * 100,
+    ])
+
+    social_media = column['social_media_sentiment']
+    news = column['news_sentiment']
+    worker = column['worker_satisfaction']
+    controversies = column['controversy_count']
+    external = np.column_stack([
+        np.where(np.isnan(social_media), 0.5, (social_media + 1) / 2),
+        np.where(np.isnan(news), 0.5, (news + 1) / 2),
+        np.where(np.isnan(worker), 0.5, worker / 5),
+        np.where(controversies > 0, np.maximum(0, 1 - (np.minimum(controversies, 5) / 5)), 1.0),
+    ])
+    has_external_data = ~(np.isnan(social_media) & np.isnan(news) & np.isnan(worker)) | (controversies > 0)
+    valid = ~np.isnan(linear.sum(axis=1) + controversies)
+    return linear, external, has_external_data, valid
+
+
+def score_profiles(metrics, profiles):
+    """
+    Score every supplier under several weight profiles with two matrix products
+
+    Args:
+        metrics: Supplier metrics in any layout accepted by score_batch
+        profiles: List of K weight dicts, as used by EthicalScoringModel
+
+    Returns:
+        Dict with overall_score, an (n_suppliers, K) array of unrounded scores
+        (NaN where calculate_score would fall back), and risk_level, an
+        (n_suppliers, K) array of risk levels
+    """
+    if not scientific_libs_available():
+        models = [EthicalScoringModel(dict(weights), load_model=False) for weights in profiles]
+        overall = [
+            [models[k]._unrounded_score(dict(zip(SCORING_METRICS, (None if v != v else v for v in row))))
+             for k in range(len(models))]
+            for row in zip(*metrics)
+        ]
+        return {
+            'overall_score': overall,
+            'risk_level': [[models[0].determine_risk_level(score) if score is not None else 'medium' for score in row] for row in overall]
+        }
+
+    X = EthicalScoringModel._as_matrix(metrics)
+    linear, external, has_external_data, valid = profile_features(X)
+    linear_coefficients = np.array([
+        [weights[category] * weights[subcategory] for weights in profiles]
+        for category, subcategory in PROFILE_LINEAR_WEIGHTS
+    ])
+    external_coefficients = np.array([[weights[key] for weights in profiles] for key in PROFILE_EXTERNAL_WEIGHTS])
+
+    weighted = np.nan_to_num(linear) @ linear_coefficients
+    multiplier = np.where(has_external_data[:, None], 0.75 + (external @ external_coefficients) * 0.5, 1.0)
+    overall = np.where(valid[:, None], weighted * multiplier, np.nan)
+
+    # Unscorable suppliers get calculate_score's fallback score of 50
+    return {
+        'overall_score': overall,
+        'risk_level': EthicalScoringModel(load_model=False).determine_risk_levels(np.where(valid[:, None], overall, 50.0))
+    }
+
 
 class EthicalScoringModel:
-    def __init__(self, scoring_weights=None):
+    def __init__(self, scoring_weights=None, load_model=True):
         """
         Initialize the model with customizable scoring weights
         
         Args:
             scoring_weights: Optional dict containing custom weights for scoring algorithm
+            load_model: Whether to load the saved clustering model from disk. Pure
+                scoring does not need it, and the saved weights would replace
+                scoring_weights.
         """
         # Initialize default weights if none provided
         self.weights = scoring_weights or {
@@ -56,46 +492,100 @@ class EthicalScoringModel:
         }
         
         # Initialize other model components if scientific libraries are available
-        if SCIENTIFIC_LIBS_AVAILABLE:
-            self.scaler = StandardScaler()
+        if scientific_libs_available():
+            # Fitted by train_clustering or loaded along with the clustering model
+            self.scaler = None
             self.clustering_model = None
-            self.model_path = os.path.join(os.path.dirname(__file__), 'models', 'ethical_scoring_model.joblib')
+            self.clustering_stats = None
+            self.model_path = MODEL_ARTIFACT_PATH
             
             # Try to load existing model if it exists
             try:
-                self._load_model()
+                if load_model:
+                    self._load_model()
             except (FileNotFoundError, ValueError, AttributeError) as e:
                 logger.warning(f"Could not load existing model: {e}. Will initialize new model.")
         else:
             # Fallback when scientific libraries are not available
             self.scaler = None
             self.clustering_model = None
+            self.clustering_stats = None
             self.model_path = None
     
+    @property
+    def weights(self):
+        return self._weights
+
+    @weights.setter
+    def weights(self, weights):
+        # Frozen so the fingerprint keying the score memo always matches the weights in use
+        self._weights = MappingProxyType(dict(weights))
+        self.weights_fingerprint = tuple(sorted(self._weights.items()))
+
     def _load_model(self):
-        """Load model from disk if available"""
-        if not SCIENTIFIC_LIBS_AVAILABLE or not os.path.exists(self.model_path):
+        """Load the current version of the shared model artifact if one has been saved"""
+        if not scientific_libs_available():
             return
             
-        loaded_data = joblib.load(self.model_path)
+        loaded_data = model_artifacts().get()
+        if loaded_data is None:
+            loaded_data = self._import_legacy_model()
+            if loaded_data is None:
+                return
         self.clustering_model = loaded_data.get('clustering_model')
         self.scaler = loaded_data.get('scaler')
-        self.weights = loaded_data.get('weights', self.weights)
-        logger.info("Model loaded successfully")
+        self.clustering_stats = loaded_data.get('clustering_stats')
+        self.weights = dict(loaded_data.get('weights') or self.weights)
+
+    def _import_legacy_model(self):
+        """Convert a joblib pickle saved by an earlier release into the first artifact version"""
+        if not os.path.exists(LEGACY_MODEL_PATH):
+            return None
+        import joblib
+
+        legacy = joblib.load(LEGACY_MODEL_PATH)
+        clustering_model, scaler = legacy.get('clustering_model'), legacy.get('scaler')
+        if clustering_model is not None and scaler is not None:
+            self.scaler = FeatureScaler(np.asarray(scaler.mean_, dtype=float), np.asarray(scaler.scale_, dtype=float))
+            self.clustering_model = CentroidModel(
+                np.asarray(clustering_model.cluster_centers_, dtype=float),
+                np.asarray(getattr(clustering_model, '_counts', np.ones(len(clustering_model.cluster_centers_))), dtype=float)
+            )
+            self.clustering_stats = legacy.get('clustering_stats')
+        self.weights = dict(legacy.get('weights', self.weights))
+        logger.info(f"Converting legacy model {LEGACY_MODEL_PATH} to a versioned artifact")
+        self._save_model()
+        return model_artifacts().get()
     
     def _save_model(self):
-        """Save model to disk"""
-        if not SCIENTIFIC_LIBS_AVAILABLE:
+        """Publish the model as a new artifact version and swap it into this process"""
+        if not scientific_libs_available():
             logger.warning("Scientific libraries not available, cannot save model")
             return
             
-        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
+        arrays = {}
+        metadata = {'weights': dict(self.weights)}
+        if self.clustering_model is not None:
+            arrays = {
+                'scaler_mean': self.scaler.mean_,
+                'scaler_scale': self.scaler.scale_,
+                'cluster_centers': self.clustering_model.cluster_centers_,
+                'cluster_counts': self.clustering_model.counts_,
+            }
+            import sklearn
+            metadata.update(
+                features=[feature for feature, _ in CLUSTER_FEATURES],
+                clustering_stats=self.clustering_stats,
+                training={'numpy_version': np.__version__, 'sklearn_version': sklearn.__version__}
+            )
+
         model_data = {
             'clustering_model': self.clustering_model,
             'scaler': self.scaler,
-            'weights': self.weights
+            'clustering_stats': self.clustering_stats,
+            'weights': dict(self.weights)
         }
-        joblib.dump(model_data, self.model_path)
+        model_data['version'] = model_artifacts().publish(arrays, metadata, artifact=model_data)
         logger.info("Model saved successfully")
     
     def calculate_environmental_score(self, data):
@@ -203,7 +693,22 @@ class EthicalScoringModel:
         return impact_multiplier
     
     def calculate_score(self, data):
-        """Calculate the ethical score based on all metrics"""
+        """
+        Calculate the ethical score based on all metrics
+
+        Results are memoized per weights and metric fingerprint, so
+        repeated evaluations of the same metrics cost a dictionary lookup.
+        """
+        fingerprint = metric_fingerprint(data)
+        if fingerprint is None:
+            return self._calculate_score(data)
+        result = score_memo.get_or_compute(
+            ('score', self.weights_fingerprint, fingerprint), lambda: self._calculate_score(data)
+        )
+        return dict(result)
+
+    def _calculate_score(self, data):
+        """Calculate the ethical score without the memo"""
         try:
             # Calculate sub-scores
             environmental_score = self.calculate_environmental_score(data)
@@ -242,10 +747,574 @@ class EthicalScoringModel:
                 'governance_score': 50.0,
                 'risk_level': 'medium'
             }
-    
+
+    def score_batch(self, metrics):
+        """
+        Score many suppliers at once, matching calculate_score row for row
+
+        Args:
+            metrics: Either a 2-D array of shape (n_suppliers, len(SCORING_METRICS))
+                or a sequence of len(SCORING_METRICS) column arrays, both ordered
+                as SCORING_METRICS. NaN marks a missing value (see metrics_to_columns).
+
+        Returns:
+            Dict with overall_score, environmental_score, social_score,
+            governance_score, external_impact and risk_level arrays (plain lists
+            when scientific libraries are not available)
+        """
+        if not scientific_libs_available():
+            return self._score_batch_fallback(metrics)
+
+        X = self._as_matrix(metrics)
+        scores = self._score_arrays(X)
+
+        # Rows the scalar path rejects (missing required metrics) get its default scores
+        invalid = ~scores['valid']
+        if invalid.any():
+            logger.warning(f"{int(invalid.sum())} suppliers had missing metrics; using default scores")
+            for key in ['overall_score', 'environmental_score', 'social_score', 'governance_score']:
+                scores[key] = np.where(invalid, 50.0, scores[key])
+            scores['external_impact'] = np.where(invalid, 1.0, scores['external_impact'])
+
+        result = {
+            key: round_like_scalar(scores[key], 1)
+            for key in ['overall_score', 'environmental_score', 'social_score', 'governance_score']
+        }
+        result['external_impact'] = scores['external_impact']
+        result['risk_level'] = self.determine_risk_levels(scores['overall_score'])
+        return result
+
+    @staticmethod
+    def _as_matrix(metrics):
+        """Convert score_batch input into a (n_suppliers, len(SCORING_METRICS)) float array"""
+        if isinstance(metrics, np.ndarray):
+            X = np.asarray(metrics, dtype=float)
+        else:
+            X = np.column_stack([np.asarray(column, dtype=float) for column in metrics])
+        if X.ndim != 2 or X.shape[1] != len(SCORING_METRICS):
+            raise ValueError(f"Expected {len(SCORING_METRICS)} metric columns, got shape {X.shape}")
+        return X
+
+    def _score_arrays(self, X):
+        """
+        Vectorized form of calculate_score over the last axis of X
+
+        Works for any number of leading dimensions and returns unrounded scores,
+        plus a 'valid' mask of the rows the scalar path would score successfully.
+        """
+        return self._score_columns({metric: X[..., i] for i, metric in enumerate(SCORING_METRICS)})
+
+    def _score_columns(self, column):
+        """_score_arrays over a dict of metric -> array, where the arrays only need to broadcast together"""
+        w = self.weights
+
+        # Operations are ordered as in the scalar methods so results are bit-identical
+        environmental_score = (
+            w['co2_emissions'] * np.maximum(0, 100 - column['co2_emissions']) +
+            w['water_usage'] * np.maximum(0, 100 - column['water_usage']) +
+            w['energy_efficiency'] * (column['energy_efficiency'] * 100) +
+            w['waste_management'] * (column['waste_management_score'] * 100)
+        )
+        social_score = (
+            w['wage_fairness'] * (column['wage_fairness'] * 100) +
+            w['human_rights'] * (column['human_rights_index'] * 100) +
+            w['diversity_inclusion'] * (column['diversity_inclusion_score'] * 100) +
+            w['community_engagement'] * (column['community_engagement'] * 100)
+        )
+        governance_score = (
+            w['transparency'] * (column['transparency_score'] * 100) +
+            w['corruption_risk'] * ((1 - column['corruption_risk']) * 100)
+        )
+
+        social_media = column['social_media_sentiment']
+        news = column['news_sentiment']
+        worker = column['worker_satisfaction']
+        controversies = column['controversy_count']
+        has_social_media = ~np.isnan(social_media)
+        has_news = ~np.isnan(news)
+        has_worker = ~np.isnan(worker)
+        has_controversies = controversies > 0
+        has_enough_data = has_social_media | has_news | has_worker | has_controversies
+
+        external = (
+            w['social_media'] * np.where(has_social_media, (social_media + 1) / 2, 0.5) +
+            w['news_coverage'] * np.where(has_news, (news + 1) / 2, 0.5) +
+            w['worker_reviews'] * np.where(has_worker, worker / 5, 0.5) +
+            w['controversies'] * np.where(
+                has_controversies, np.maximum(0, 1 - (np.minimum(controversies, 5) / 5)), 1.0
+            )
+        )
+        external_impact = np.where(has_enough_data, 0.75 + (external * 0.5), 1.0)
+
+        weighted_score = (
+            w['environmental'] * environmental_score +
+            w['social'] * social_score +
+            w['governance'] * governance_score
+        )
+
+        # Every required metric feeds one of the sub-scores, so NaN propagates there
+        valid = ~np.isnan(environmental_score + social_score + governance_score + controversies)
+
+        return {
+            'overall_score': weighted_score * external_impact,
+            'environmental_score': environmental_score,
+            'social_score': social_score,
+            'governance_score': governance_score,
+            'external_impact': external_impact,
+            'weighted_score': weighted_score,
+            'has_external_data': has_enough_data,
+            'valid': valid
+        }
+
+    def sensitivity(self, metrics, costs=None, top=3):
+        """
+        Closed-form marginal contribution of every metric to the overall score
+
+        Apart from the external-data multiplier, calculate_score is a weighted
+        linear combination, so the points gained per unit of improvement are
+        exact within a supplier's current linear region (co2 and water only
+        count below 100, controversies up to 5, and external metrics only once
+        external data is present).
+
+        Args:
+            metrics: Supplier metrics in any layout accepted by score_batch
+            costs: Optional dict of metric -> cost of improving it by 1% of its
+                scale (see METRIC_SCALES); metrics not listed cost 1
+            top: Number of levers to rank per supplier
+
+        Returns:
+            Dict of (n_suppliers, len(SCORING_METRICS)) arrays:
+                derivatives: partial derivative of the overall score
+                gain_per_unit: points gained per unit of improvement
+                max_gain: points gained by improving the metric to its best value
+                efficiency: points gained per unit of cost
+            plus levers, the (n_suppliers, top) indices into SCORING_METRICS of
+            each supplier's cheapest levers, best first
+        """
+        if not scientific_libs_available():
+            return self._sensitivity_fallback(metrics, costs, top)
+
+        X = self._as_matrix(metrics)
+        scores = self._score_arrays(X)
+        w = self.weights
+        column = {metric: X[:, i] for i, metric in enumerate(SCORING_METRICS)}
+        multiplier = scores['external_impact']
+        # The multiplier is linear in each external impact, scaled by the weighted score
+        external_slope = np.where(scores['has_external_data'], scores['weighted_score'] * 0.5, 0.0)
+
+        gain = {
+            'co2_emissions': np.where(column['co2_emissions'] <= 100, w['environmental'] * w['co2_emissions'], 0.0) * multiplier,
+            'water_usage': np.where(column['water_usage'] <= 100, w['environmental'] * w['water_usage'], 0.0) * multiplier,
+            'energy_efficiency': w['environmental'] * w['energy_efficiency'] * 100 * multiplier,
+            'waste_management_score': w['environmental'] * w['waste_management'] * 100 * multiplier,
+            'wage_fairness': w['social'] * w['wage_fairness'] * 100 * multiplier,
+            'human_rights_index': w['social'] * w['human_rights'] * 100 * multiplier,
+            'diversity_inclusion_score': w['social'] * w['diversity_inclusion'] * 100 * multiplier,
+            'community_engagement': w['social'] * w['community_engagement'] * 100 * multiplier,
+            'transparency_score': w['governance'] * w['transparency'] * 100 * multiplier,
+            'corruption_risk': w['governance'] * w['corruption_risk'] * 100 * multiplier,
+            'social_media_sentiment': np.where(
+                np.isnan(column['social_media_sentiment']), 0.0, external_slope * w['social_media'] * 0.5
+            ),
+            'news_sentiment': np.where(
+                np.isnan(column['news_sentiment']), 0.0, external_slope * w['news_coverage'] * 0.5
+            ),
+            'worker_satisfaction': np.where(
+                np.isnan(column['worker_satisfaction']), 0.0, external_slope * w['worker_reviews'] / 5
+            ),
+            'controversy_count': np.where(
+                (column['controversy_count'] > 0) & (column['controversy_count'] <= 5),
+                external_slope * w['controversies'] / 5, 0.0
+            ),
+        }
+        gain_per_unit = np.column_stack([np.broadcast_to(gain[metric], len(X)) for metric in SCORING_METRICS])
+        # Rows calculate_score cannot score have no meaningful sensitivity
+        gain_per_unit = np.where(scores['valid'][:, None], np.nan_to_num(gain_per_unit), 0.0)
+
+        direction, best, span = (np.array(values, dtype=float) for values in zip(*(METRIC_SCALES[m] for m in SCORING_METRICS)))
+        headroom = np.nan_to_num(np.clip((best - X) * direction, 0, None))
+        cost = np.array([float((costs or {}).get(metric, 1)) for metric in SCORING_METRICS])
+        efficiency = gain_per_unit * span / 100 / cost
+
+        return {
+            'derivatives': gain_per_unit * direction,
+            'gain_per_unit': gain_per_unit,
+            'max_gain': gain_per_unit * headroom,
+            'efficiency': efficiency,
+            'levers': np.argsort(-efficiency, axis=1, kind='stable')[:, :top]
+        }
+
+    def _sensitivity_fallback(self, metrics, costs, top):
+        """Pure-Python sensitivity using one-sided differences, exact on the linear pieces"""
+        result = {key: [] for key in ['derivatives', 'gain_per_unit', 'max_gain', 'efficiency', 'levers']}
+        for row in zip(*metrics):
+            data = {metric: None if value != value else value for metric, value in zip(SCORING_METRICS, row)}
+            base = self._unrounded_score(data)
+            gains, headrooms = [], []
+            for metric in SCORING_METRICS:
+                direction, best, span = METRIC_SCALES[metric]
+                value = data[metric]
+                gain = 0.0
+                if base is not None and value is not None and (metric != 'controversy_count' or value > 0):
+                    step = span * 1e-6
+                    improved = self._unrounded_score(dict(data, **{metric: value + direction * step}))
+                    gain = max(0.0, (improved - base) / step)
+                gains.append(gain)
+                headrooms.append(max(0.0, (best - value) * direction) if value is not None else 0.0)
+
+            efficiency = [
+                gain * METRIC_SCALES[metric][2] / 100 / float((costs or {}).get(metric, 1))
+                for gain, metric in zip(gains, SCORING_METRICS)
+            ]
+            result['derivatives'].append([g * METRIC_SCALES[m][0] for g, m in zip(gains, SCORING_METRICS)])
+            result['gain_per_unit'].append(gains)
+            result['max_gain'].append([g * h for g, h in zip(gains, headrooms)])
+            result['efficiency'].append(efficiency)
+            result['levers'].append(sorted(range(len(SCORING_METRICS)), key=lambda j: -efficiency[j])[:top])
+        return result
+
+    def optimize_changes(self, metrics, target, bounds=None, costs=None, levers=None):
+        """
+        Cheapest change to each supplier's metrics that lifts its overall score to target
+
+        Improving a metric by 1% of its scale (see METRIC_SCALES) costs
+        costs[metric]. Within its linear region the score gains a fixed number
+        of points per unit of each metric, so this is a fractional knapsack:
+        levers are used in order of points per unit of cost, each up to its
+        bound, until the target is reached. The solution is the exact minimum
+        when a supplier has no external data. With external data the score is
+        the product of two linear parts; the linearized solution then
+        undershoots the true gain, so the target is still met at slightly more
+        than the minimum cost.
+
+        Args:
+            metrics: Supplier metrics in any layout accepted by score_batch
+            target: Overall score to reach, unrounded as in determine_risk_level
+            bounds: Optional dict of metric -> (min, max) values a metric may move within
+            costs: Optional dict of metric -> cost of a 1% improvement; default 1
+            levers: Metrics that may change; defaults to all of SCORING_METRICS
+
+        Returns:
+            Dict of per-supplier arrays: changes (n_suppliers, len(SCORING_METRICS))
+            of deltas to apply, cost, feasible, current_score and projected_score
+        """
+        if not scientific_libs_available():
+            return self._optimize_changes_fallback(metrics, target, bounds, costs, levers)
+
+        X = self._as_matrix(metrics)
+        current = self._score_arrays(X)
+        rates = self.sensitivity(X)['gain_per_unit']
+
+        direction, best, span = (np.array(values, dtype=float) for values in zip(*(METRIC_SCALES[m] for m in SCORING_METRICS)))
+        low, high = (
+            np.array([(bounds or {}).get(metric, (None, None))[i] for metric in SCORING_METRICS], dtype=float)
+            for i in range(2)
+        )
+        limit = np.where(direction > 0, np.fmin(best, high), np.fmax(best, low))
+        room = np.nan_to_num(np.clip((limit - X) * direction, 0, None))
+        if levers is not None:
+            room[:, [metric not in levers for metric in SCORING_METRICS]] = 0
+
+        unit_cost = np.array([float((costs or {}).get(metric, 1)) for metric in SCORING_METRICS]) * 100 / span
+        order = np.argsort(-(rates / unit_cost), axis=1, kind='stable')
+        sorted_rates = np.take_along_axis(rates, order, axis=1)
+        sorted_gains = sorted_rates * np.take_along_axis(room, order, axis=1)
+
+        # A hair of slack keeps the projected score from landing a rounding error short of target
+        needed = np.clip(target - current['overall_score'], 0, None)[:, None] + 1e-6
+        before = np.cumsum(sorted_gains, axis=1) - sorted_gains
+        used = np.clip(needed - before, 0, sorted_gains)
+        sorted_units = np.divide(used, sorted_rates, out=np.zeros_like(used), where=sorted_rates > 0)
+
+        units = np.empty_like(sorted_units)
+        np.put_along_axis(units, order, sorted_units, axis=1)
+        already_met = current['overall_score'] >= target
+        units[already_met | ~current['valid']] = 0
+        changes = units * direction
+
+        projected = self._score_arrays(X + changes)['overall_score']
+        return {
+            'changes': changes,
+            'cost': (units * unit_cost).sum(axis=1),
+            'feasible': current['valid'] & (projected >= target),
+            'current_score': current['overall_score'],
+            'projected_score': projected
+        }
+
+    def _optimize_changes_fallback(self, metrics, target, bounds, costs, levers):
+        """Pure-Python optimize_changes used when scientific libraries are not available"""
+        sensitivity = self._sensitivity_fallback(metrics, costs, len(SCORING_METRICS))
+        result = {key: [] for key in ['changes', 'cost', 'feasible', 'current_score', 'projected_score']}
+        for row, rates in zip(zip(*metrics), sensitivity['gain_per_unit']):
+            data = {metric: None if value != value else value for metric, value in zip(SCORING_METRICS, row)}
+            current = self._unrounded_score(data)
+            needed = target - current + 1e-6 if current is not None and current < target else 0
+
+            candidates = []
+            for j, metric in enumerate(SCORING_METRICS):
+                direction, best, span = METRIC_SCALES[metric]
+                low, high = (bounds or {}).get(metric, (None, None))
+                limit = best
+                if direction > 0 and high is not None:
+                    limit = min(best, high)
+                elif direction < 0 and low is not None:
+                    limit = max(best, low)
+                room = max(0.0, (limit - data[metric]) * direction) if data[metric] is not None else 0.0
+                if levers is not None and metric not in levers:
+                    room = 0.0
+                unit_cost = float((costs or {}).get(metric, 1)) * 100 / span
+                if rates[j] > 0 and room > 0:
+                    candidates.append((rates[j] / unit_cost, j, room, unit_cost))
+
+            changes = [0.0] * len(SCORING_METRICS)
+            cost = 0.0
+            for _, j, room, unit_cost in sorted(candidates, key=lambda candidate: -candidate[0]):
+                if needed <= 0:
+                    break
+                units = min(room, needed / rates[j])
+                needed -= units * rates[j]
+                changes[j] = units * METRIC_SCALES[SCORING_METRICS[j]][0]
+                cost += units * unit_cost
+
+            projected = self._unrounded_score({
+                metric: value + change if value is not None else None
+                for (metric, value), change in zip(data.items(), changes)
+            })
+            result['changes'].append(changes)
+            result['cost'].append(cost)
+            result['feasible'].append(projected is not None and projected >= target)
+            result['current_score'].append(current)
+            result['projected_score'].append(projected)
+        return result
+
+    def score_uncertainty(self, metrics, errors=None, samples=1000, percentiles=(5, 50, 95), seed=None):
+        """
+        Monte Carlo distribution of every supplier's overall score under metric noise
+
+        Each metric is perturbed by its error distribution and clipped to its
+        valid range, and all samples of all suppliers are scored together as
+        (samples, suppliers) arrays per metric - a 3-D samples x suppliers x
+        metrics computation in which unperturbed metrics broadcast instead of
+        being copied - in chunks of suppliers to bound memory. Missing metrics
+        stay missing.
+
+        Args:
+            metrics: Supplier metrics in any layout accepted by score_batch
+            errors: Optional dict of metric -> error, either a number (standard
+                deviation of a normal error) or a dict with 'distribution'
+                ('normal' or 'uniform') and 'scale' (standard deviation or
+                half-width). Defaults to DEFAULT_METRIC_ERROR of the scale of each
+                metric stored on suppliers; metrics mapped to 0 are not perturbed.
+            samples: Number of samples per supplier
+            percentiles: Score percentiles to report
+            seed: Optional random seed, for reproducible runs
+
+        Returns:
+            Dict with per-supplier arrays mean, std, percentiles (n_suppliers,
+            len(percentiles)) and risk_probabilities (n_suppliers, 3, ordered
+            low/medium/high), plus portfolio percentiles of the mean score and
+            expected_risk_counts
+        """
+        errors = self._error_distributions(errors)
+        if not scientific_libs_available():
+            return self._score_uncertainty_fallback(metrics, errors, samples, percentiles, seed)
+
+        X = self._as_matrix(metrics)
+        n = len(X)
+        rng = np.random.default_rng(seed)
+        perturbed = [(SCORING_METRICS.index(metric), spec) for metric, spec in errors.items()]
+
+        mean = np.empty(n)
+        std = np.empty(n)
+        score_percentiles = np.empty((n, len(percentiles)))
+        risk_probabilities = np.empty((n, 3))
+        portfolio_sum = np.zeros(samples)
+        portfolio_count = 0
+
+        # Only perturbed metrics get a sample axis; the others broadcast from (1, suppliers)
+        chunk = max(1, UNCERTAINTY_CHUNK_VALUES // (samples * max(len(perturbed), 1)))
+        for start in range(0, n, chunk):
+            block = X[start:start + chunk]
+            column = {metric: block[None, :, i] for i, metric in enumerate(SCORING_METRICS)}
+            for j, (distribution, scale, low, high) in perturbed:
+                # Single precision halves sampling cost and is ample for measurement noise
+                if distribution == 'uniform':
+                    values = rng.random((samples, len(block)), dtype=np.float32)
+                    values *= 2 * scale
+                    values -= scale
+                else:
+                    values = rng.standard_normal((samples, len(block)), dtype=np.float32)
+                    values *= scale
+                values += block[:, j]
+                np.maximum(values, low, out=values)
+                np.minimum(values, high, out=values)
+                values[:, np.isnan(block[:, j])] = np.nan
+                column[SCORING_METRICS[j]] = values
+
+            scores = self._score_columns(column)
+            valid = np.broadcast_to(scores['valid'], (samples, len(block)))[0]
+            overall = np.broadcast_to(scores['overall_score'], (samples, len(block)))
+
+            stop = start + len(block)
+            mean[start:stop] = overall.mean(axis=0)
+            std[start:stop] = overall.std(axis=0)
+            score_percentiles[start:stop] = np.percentile(overall, percentiles, axis=0).T
+            low_risk = (overall >= RISK_LEVEL_THRESHOLDS['low']).mean(axis=0)
+            high_risk = (overall < RISK_LEVEL_THRESHOLDS['medium']).mean(axis=0)
+            risk_probabilities[start:stop] = np.column_stack([low_risk, 1 - low_risk - high_risk, high_risk])
+
+            portfolio_sum += overall[:, valid].sum(axis=1)
+            portfolio_count += int(valid.sum())
+            mean[start:stop][~valid] = np.nan
+
+        invalid = np.isnan(mean)
+        std[invalid] = np.nan
+        score_percentiles[invalid] = np.nan
+        risk_probabilities[invalid] = np.nan
+        portfolio_mean = portfolio_sum / portfolio_count if portfolio_count else np.full(samples, np.nan)
+        return {
+            'mean': mean,
+            'std': std,
+            'percentiles': score_percentiles,
+            'risk_probabilities': risk_probabilities,
+            'portfolio': {
+                'mean_score_percentiles': np.percentile(portfolio_mean, percentiles),
+                'expected_risk_counts': np.nansum(risk_probabilities, axis=0)
+            }
+        }
+
+    @staticmethod
+    def _error_distributions(errors):
+        """
+        Normalize score_uncertainty error specs to metric -> (distribution, scale, low, high)
+
+        Raises:
+            ValueError: For unknown metrics or distributions, or negative scales
+        """
+        if errors is None:
+            errors = {
+                metric: DEFAULT_METRIC_ERROR * METRIC_SCALES[metric][2]
+                for metric in SCORING_METRICS
+                if metric not in OPTIONAL_METRICS and metric != 'controversy_count'
+            }
+
+        distributions = {}
+        for metric, spec in errors.items():
+            if metric not in SCORING_METRICS:
+                raise ValueError(f"Unknown metric {metric!r}")
+            if isinstance(spec, dict):
+                distribution = spec.get('distribution', 'normal')
+                scale = float(spec.get('scale', 0))
+            else:
+                distribution, scale = 'normal', float(spec)
+            if distribution not in ('normal', 'uniform'):
+                raise ValueError(f"Unknown error distribution {distribution!r}")
+            if scale < 0:
+                raise ValueError(f"Error scale of {metric} must not be negative")
+            if scale == 0:
+                continue
+
+            direction, best, span = METRIC_SCALES[metric]
+            low, high = (best - span, best) if direction > 0 else (best, best + span)
+            distributions[metric] = (distribution, scale, low, high)
+        return distributions
+
+    def _score_uncertainty_fallback(self, metrics, errors, samples, percentiles, seed):
+        """Pure-Python score_uncertainty used when scientific libraries are not available"""
+        rng = random.Random(seed)
+
+        def percentile(ordered, q):
+            position = (len(ordered) - 1) * q / 100
+            lower = int(position)
+            upper = min(lower + 1, len(ordered) - 1)
+            return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+        result = {key: [] for key in ['mean', 'std', 'percentiles', 'risk_probabilities']}
+        portfolio = [0.0] * samples
+        portfolio_count = 0
+        for row in zip(*metrics):
+            data = {metric: None if value != value else value for metric, value in zip(SCORING_METRICS, row)}
+            if self._unrounded_score(data) is None or not self._has_required_metrics(data):
+                for key in result:
+                    result[key].append(None)
+                continue
+
+            scores = []
+            for _ in range(samples):
+                sample = dict(data)
+                for metric, (distribution, scale, low, high) in errors.items():
+                    if sample[metric] is None:
+                        continue
+                    noise = rng.uniform(-scale, scale) if distribution == 'uniform' else rng.gauss(0, scale)
+                    sample[metric] = min(high, max(low, sample[metric] + noise))
+                scores.append(self._unrounded_score(sample))
+
+            for i, score in enumerate(scores):
+                portfolio[i] += score
+            portfolio_count += 1
+
+            mean = sum(scores) / samples
+            ordered = sorted(scores)
+            levels = [self.determine_risk_level(score) for score in scores]
+            result['mean'].append(mean)
+            result['std'].append((sum((score - mean) ** 2 for score in scores) / samples) ** 0.5)
+            result['percentiles'].append([percentile(ordered, q) for q in percentiles])
+            result['risk_probabilities'].append([levels.count(level) / samples for level in ('low', 'medium', 'high')])
+
+        portfolio_mean = sorted(total / portfolio_count for total in portfolio) if portfolio_count else []
+        probabilities = [p for p in result['risk_probabilities'] if p is not None]
+        result['portfolio'] = {
+            'mean_score_percentiles': [percentile(portfolio_mean, q) for q in percentiles] if portfolio_mean else [None] * len(percentiles),
+            'expected_risk_counts': [sum(p[level] for p in probabilities) for level in range(3)]
+        }
+        return result
+
+    def _unrounded_score(self, data):
+        """Overall score before rounding, or None when calculate_score would fall back"""
+        try:
+            weighted_score = (
+                self.weights['environmental'] * self.calculate_environmental_score(data) +
+                self.weights['social'] * self.calculate_social_score(data) +
+                self.weights['governance'] * self.calculate_governance_score(data)
+            )
+            return weighted_score * self.calculate_external_data_impact(data)
+        except TypeError:
+            return None
+
+    def _score_batch_fallback(self, metrics):
+        """Pure-Python score_batch used when scientific libraries are not available"""
+        if metrics and not isinstance(metrics[0], (list, tuple)):
+            raise ValueError("Expected a sequence of metric columns")
+        if len(metrics) != len(SCORING_METRICS):
+            raise ValueError(f"Expected {len(SCORING_METRICS)} metric columns, got {len(metrics)}")
+
+        result = {key: [] for key in [
+            'overall_score', 'environmental_score', 'social_score', 'governance_score',
+            'external_impact', 'risk_level'
+        ]}
+        for row in zip(*metrics):
+            data = {
+                metric: None if value != value else value  # NaN marks a missing value
+                for metric, value in zip(SCORING_METRICS, row)
+            }
+            scores = self.calculate_score(data)
+            if self._has_required_metrics(data):
+                external_impact = self.calculate_external_data_impact(data)
+            else:
+                external_impact = 1.0
+            for key, value in scores.items():
+                result[key].append(value)
+            result['external_impact'].append(external_impact)
+        return result
+
+    @staticmethod
+    def _has_required_metrics(data):
+        """Check whether calculate_score can score data without falling back"""
+        return all(data[metric] is not None for metric in SCORING_METRICS if metric not in OPTIONAL_METRICS)
+
     def train_clustering(self, suppliers_data):
         """Train a clustering model to group similar suppliers"""
-        if not SCIENTIFIC_LIBS_AVAILABLE:
+        if not scientific_libs_available():
             logger.warning("Scientific libraries not available, cannot train clustering model")
             return False
             
@@ -254,66 +1323,143 @@ class EthicalScoringModel:
             return False
             
         try:
-            # Extract relevant features for clustering
-            features = []
-            for supplier in suppliers_data:
-                # Select features for clustering
-                feature_vector = [
-                    supplier.get('co2_emissions', 50),
-                    supplier.get('water_usage', 50),
-                    supplier.get('energy_efficiency', 0.5),
-                    supplier.get('waste_management_score', 0.5),
-                    supplier.get('wage_fairness', 0.5),
-                    supplier.get('human_rights_index', 0.5),
-                    supplier.get('diversity_inclusion_score', 0.5),
-                    supplier.get('transparency_score', 0.5),
-                    supplier.get('corruption_risk', 0.5)
-                ]
-                features.append(feature_vector)
-                
-            # Convert to numpy array and normalize
-            X = np.array(features)
-            X_scaled = self.scaler.fit_transform(X)
-            
-            # Determine optimal number of clusters (2-6 based on dataset size)
-            max_clusters = min(6, len(suppliers_data) // 2)
-            n_clusters = max(2, min(max_clusters, len(suppliers_data) // 5))
-            
-            # Train K-means model
-            self.clustering_model = KMeans(n_clusters=n_clusters, random_state=42)
-            self.clustering_model.fit(X_scaled)
-            
-            # Save the trained model
-            self._save_model()
-            
+            self.fit_clustering(cluster_features(suppliers_data))
             return True
             
         except Exception as e:
             logger.error(f"Error training clustering model: {e}")
             return False
+
+    def fit_clustering(self, X):
+        """
+        Fit the scaler and an online (mini-batch) k-means model from scratch and save them
+
+        Cluster labels are kept stable across refits: each new cluster takes the
+        label of the nearest previous cluster, so a refit only relabels suppliers
+        whose group actually changed.
+
+        Args:
+            X: Feature matrix built with cluster_features
+
+        Returns:
+            Array with the cluster label of every row of X
+        """
+        from sklearn.cluster import MiniBatchKMeans
+
+        # Fit a fresh scaler; the loaded one is shared with other model instances
+        scaler = FeatureScaler.fit(X)
+        X_scaled = scaler.transform(X)
+
+        # Determine optimal number of clusters (2-6 based on dataset size)
+        max_clusters = min(6, len(X) // 2)
+        n_clusters = max(2, min(max_clusters, len(X) // 5))
+
+        kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, batch_size=1024, n_init=3)
+        indices = kmeans.fit_predict(X_scaled)
+        model = CentroidModel(kmeans.cluster_centers_, np.bincount(indices, minlength=n_clusters).astype(float))
+        distance = float(((X_scaled - model.cluster_centers_[indices]) ** 2).sum(axis=1).mean())
+
+        label_map = self._stable_label_map(scaler, model)
+        self.scaler = scaler
+        self.clustering_model = model
+        self.clustering_stats = {
+            'label_map': label_map,
+            'fitted_on': len(X),
+            'fitted_at': time.time(),
+            'baseline_distance': distance,
+            'recent_distance': distance,
+            'absorbed': 0,
+        }
+        self._save_model()
+        return np.asarray(label_map)[indices]
+
+    def _stable_label_map(self, scaler, model):
+        """Map the clusters of a new model to the labels of the nearest current clusters"""
+        n_clusters = len(model.cluster_centers_)
+        if self.clustering_model is None or self.scaler is None:
+            return list(range(n_clusters))
+
+        from scipy.optimize import linear_sum_assignment
+
+        previous_map = (self.clustering_stats or {}).get('label_map') or list(range(len(self.clustering_model.cluster_centers_)))
+        # Compare centroids in the new model's feature space
+        previous_centers = scaler.transform(self.scaler.inverse_transform(self.clustering_model.cluster_centers_))
+        costs = ((model.cluster_centers_[:, None, :] - previous_centers[None, :, :]) ** 2).sum(axis=2)
+        new_indices, previous_indices = linear_sum_assignment(costs)
+
+        label_map = [None] * n_clusters
+        for new_index, previous_index in zip(new_indices, previous_indices):
+            label_map[new_index] = int(previous_map[previous_index])
+        unused = (label for label in range(n_clusters + len(previous_map)) if label not in label_map)
+        return [label if label is not None else next(unused) for label in label_map]
+
+    def update_clustering(self, supplier_data):
+        """
+        Assign a supplier to a cluster and absorb it into the model incrementally
+
+        Instead of a refit, the model takes one mini-batch k-means step towards
+        the supplier and updates the drift statistics that decide when a full
+        refit is due. Only this process's copy of the artifact is updated: the
+        artifact is published by full refits alone, so processes never
+        overwrite each other's updates, and each picks up the next refit's
+        model, which has seen every supplier.
+
+        Returns:
+            The cluster label, or None if no online clustering model is available
+        """
+        if not scientific_libs_available() or self.clustering_stats is None:
+            return None
+
+        try:
+            X_scaled = self.scaler.transform(cluster_features([supplier_data]))
+            with _clustering_lock:
+                stats = self.clustering_stats
+                index = int(self.clustering_model.predict(X_scaled)[0])
+                distance = float(((X_scaled[0] - self.clustering_model.cluster_centers_[index]) ** 2).sum())
+                self.clustering_model.partial_fit(X_scaled)
+                stats['absorbed'] += 1
+                stats['recent_distance'] += CLUSTER_DRIFT_SMOOTHING * (distance - stats['recent_distance'])
+            return int(stats['label_map'][index])
+
+        except Exception as e:
+            logger.error(f"Error updating clustering model: {e}")
+            return None
+
+    def clustering_drift(self):
+        """
+        Summarise how far the online clustering model has moved since its last full fit
+
+        Returns:
+            Dict with the drift ratio, the number of suppliers absorbed since the
+            fit and whether a refit is due, or None without an online model
+        """
+        stats = self.clustering_stats
+        if stats is None:
+            return None
+
+        ratio = stats['recent_distance'] / stats['baseline_distance'] if stats['baseline_distance'] > 0 else 1.0
+        absorbed_fraction = stats['absorbed'] / max(stats['fitted_on'], 1)
+        return {
+            'drift_ratio': ratio,
+            'absorbed': stats['absorbed'],
+            'fitted_on': stats['fitted_on'],
+            'refit_due': (
+                (stats['absorbed'] >= CLUSTER_MIN_DRIFT_SAMPLES and ratio > CLUSTER_DRIFT_THRESHOLD)
+                or absorbed_fraction > CLUSTER_MAX_ABSORBED_FRACTION
+            )
+        }
     
     def get_supplier_cluster(self, supplier_data):
         """Get the cluster for a specific supplier"""
-        if not SCIENTIFIC_LIBS_AVAILABLE or self.clustering_model is None:
+        if not scientific_libs_available() or self.clustering_model is None:
             return None
             
         try:
-            # Extract features in the same order as training
-            feature_vector = np.array([
-                supplier_data.get('co2_emissions', 50),
-                supplier_data.get('water_usage', 50),
-                supplier_data.get('energy_efficiency', 0.5),
-                supplier_data.get('waste_management_score', 0.5),
-                supplier_data.get('wage_fairness', 0.5),
-                supplier_data.get('human_rights_index', 0.5),
-                supplier_data.get('diversity_inclusion_score', 0.5),
-                supplier_data.get('transparency_score', 0.5),
-                supplier_data.get('corruption_risk', 0.5)
-            ]).reshape(1, -1)
-            
             # Scale and predict
-            X_scaled = self.scaler.transform(feature_vector)
-            cluster = self.clustering_model.predict(X_scaled)[0]
+            X_scaled = self.scaler.transform(cluster_features([supplier_data]))
+            cluster = int(self.clustering_model.predict(X_scaled)[0])
+            if self.clustering_stats is not None:
+                cluster = self.clustering_stats['label_map'][cluster]
             
             return int(cluster)
             
@@ -321,102 +1467,237 @@ class EthicalScoringModel:
             logger.error(f"Error predicting cluster: {e}")
             return None
     
-    def generate_recommendations(self, supplier_data, all_suppliers_data=None):
-        """Generate recommendations for a supplier"""
-        # Simplified fallback implementation that returns mock recommendations
-        if not SCIENTIFIC_LIBS_AVAILABLE:
-            return [
-                {
-                    "category": "environmental",
-                    "action": "Consider reducing CO2 emissions",
-                    "impact": "high",
-                    "difficulty": "medium",
-                    "timeframe": "6-12 months"
-                },
-                {
-                    "category": "social",
-                    "action": "Improve worker conditions and wage fairness",
-                    "impact": "high",
-                    "difficulty": "medium",
-                    "timeframe": "3-6 months"
-                },
-                {
-                    "category": "governance",
-                    "action": "Implement stronger transparency measures",
-                    "impact": "medium",
-                    "difficulty": "low",
-                    "timeframe": "1-3 months"
+    def generate_recommendations(self, supplier_data, all_suppliers_data=None, benchmarks=None):
+        """
+        Generate recommendations for a supplier
+
+        Args:
+            supplier_data: Dict of supplier metrics
+            all_suppliers_data: Optional supplier dicts whose averages serve as the
+                benchmark when benchmarks is not given
+            benchmarks: Optional dict of benchmark name (e.g. 'cluster', 'industry')
+                -> dict of metric -> reference value
+
+        Returns:
+            List of recommendation dicts, most valuable first
+        """
+        metrics = metrics_to_columns([supplier_data])
+        return self.recommend_batch(metrics, self._benchmark_columns(benchmarks, all_suppliers_data))[0]
+
+    def generate_explanation(self, supplier_data, all_suppliers=None, benchmarks=None):
+        """Generate natural language explanation for a supplier's ethical score"""
+        metrics = metrics_to_columns([supplier_data])
+        return self.explain_batch(metrics, self._benchmark_columns(benchmarks, all_suppliers))[0]
+
+    @staticmethod
+    def _benchmark_columns(benchmarks, all_suppliers_data):
+        """Single-supplier benchmarks, as one-row metric columns"""
+        if benchmarks is None:
+            benchmarks = {}
+            if all_suppliers_data:
+                benchmarks['portfolio'] = {
+                    metric: sum(values) / len(values)
+                    for metric in RECOMMENDATION_ACTIONS
+                    for values in [[s[metric] for s in all_suppliers_data if s.get(metric) is not None]]
+                    if values
                 }
+        return {
+            name: metrics_to_columns([{metric: values.get(metric) for metric in SCORING_METRICS}])
+            for name, values in benchmarks.items()
+        }
+
+    def _recommendation_gaps(self, metrics, benchmarks):
+        """
+        Vectorized gaps of every supplier against its benchmarks
+
+        Returns:
+            Tuple of (X, targets, sources, gains, scores) where targets holds, per
+            recommendable metric, the best benchmark value the supplier falls short
+            of (NaN if none), sources the benchmark it came from, and gains the
+            score points expected from closing each gap
+        """
+        X = self._as_matrix(metrics)
+        scores = self._score_arrays(X)
+        gain_per_unit = self.sensitivity(X)['gain_per_unit']
+        direction = np.array([METRIC_SCALES[metric][0] for metric in SCORING_METRICS], dtype=float)
+
+        names = list(benchmarks)
+        if names:
+            stacked = np.stack([self._as_matrix(benchmarks[name]) for name in names])
+            gaps = np.nan_to_num((stacked - X) * direction, nan=-np.inf)
+        else:
+            # Without benchmarks the best value of each metric is the target
+            best = np.array([METRIC_SCALES[metric][1] for metric in SCORING_METRICS], dtype=float)
+            stacked = np.broadcast_to(best, (1,) + X.shape)
+            gaps = np.nan_to_num((stacked - X) * direction, nan=-np.inf)
+            names = ['best']
+
+        source = gaps.argmax(axis=0)
+        gap = np.take_along_axis(gaps, source[None], axis=0)[0]
+        target = np.take_along_axis(stacked, source[None], axis=0)[0]
+        recommendable = np.array([metric in RECOMMENDATION_ACTIONS for metric in SCORING_METRICS])
+        behind = (gap > 0) & recommendable & scores['valid'][:, None]
+        gains = np.where(behind, gain_per_unit * np.where(behind, gap, 0), 0.0)
+        targets = np.where(behind, target, np.nan)
+        return X, targets, np.asarray(names, dtype=object)[source], gains, scores
+
+    def recommend_batch(self, metrics, benchmarks, top=3):
+        """
+        Data-driven improvement actions for many suppliers at once
+
+        Every supplier is compared with its benchmark rows, such as the centroid
+        of its cluster and its industry average. For each metric the target is
+        the most demanding benchmark the supplier falls short of, and the
+        expected gain is the exact score sensitivity times the gap. Actions are
+        ranked by expected gain.
+
+        Args:
+            metrics: Supplier metrics in any layout accepted by score_batch
+            benchmarks: Dict of benchmark name -> reference metrics per supplier,
+                in the same layout (NaN where there is no reference value)
+            top: Maximum number of actions per supplier
+
+        Returns:
+            List with one list of recommendation dicts per supplier
+        """
+        if not scientific_libs_available():
+            return [
+                self._recommendations_from_gaps(*gaps, top=top)
+                for gaps in self._recommendation_gaps_fallback(metrics, benchmarks)
             ]
-        
-        # Original implementation follows here...
-        # ... (original code) ...
-        
-        # For brevity, returning simplified recommendations
+
+        X, targets, sources, gains, _ = self._recommendation_gaps(metrics, benchmarks)
+        order = np.argsort(-gains, axis=1, kind='stable')[:, :top]
         return [
-            {
-                "category": "environmental",
-                "action": "Reduce CO2 emissions by 10%",
-                "impact": "high",
-                "difficulty": "medium",
-                "timeframe": "6-12 months"
-            },
-            {
-                "category": "social",
-                "action": "Improve worker conditions",
-                "impact": "high",
-                "difficulty": "medium", 
-                "timeframe": "3-6 months"
-            },
-            {
-                "category": "governance",
-                "action": "Increase transparency",
-                "impact": "medium",
-                "difficulty": "low",
-                "timeframe": "1-3 months"
-            }
+            self._recommendations_from_gaps(X[i], targets[i], sources[i], gains[i], order=order[i])
+            for i in range(len(X))
         ]
-    
-    def generate_explanation(self, supplier_data, all_suppliers=None):
-        """Generate natural language explanation for a supplier's ethical score"""
-        # Simplified fallback implementation
-        if not SCIENTIFIC_LIBS_AVAILABLE:
-            score_data = self.calculate_score(supplier_data)
-            return {
-                "summary": f"The supplier has an overall ethical score of {score_data['overall_score']}, which is considered {score_data['risk_level']} risk.",
-                "strengths": [
-                    "Moderate environmental performance",
-                    "Acceptable social practices", 
-                    "Standard governance measures"
-                ],
-                "weaknesses": [
-                    "Room for improvement in emissions reduction",
-                    "Could enhance worker conditions",
-                    "Transparency could be improved"
-                ],
-                "recommendations": self.generate_recommendations(supplier_data)
-            }
-        
-        # Original implementation would go here
-        # ... (original code) ...
-        
-        # For brevity, returning simplified explanation
-        score_data = self.calculate_score(supplier_data)
+
+    def explain_batch(self, metrics, benchmarks):
+        """
+        Explanations of many suppliers' scores against their benchmarks
+
+        Returns:
+            List of dicts with summary, strengths, weaknesses and recommendations
+        """
+        if not scientific_libs_available():
+            gaps = self._recommendation_gaps_fallback(metrics, benchmarks)
+            return [self._explanation_from_gaps(*supplier_gaps, benchmarks_row=i, benchmarks=benchmarks) for i, supplier_gaps in enumerate(gaps)]
+
+        X, targets, sources, gains, scores = self._recommendation_gaps(metrics, benchmarks)
+        return [
+            self._explanation_from_gaps(
+                X[i], targets[i], sources[i], gains[i],
+                score=float(scores['overall_score'][i]) if scores['valid'][i] else None,
+                benchmarks_row=i, benchmarks=benchmarks
+            )
+            for i in range(len(X))
+        ]
+
+    def _recommendation_gaps_fallback(self, metrics, benchmarks):
+        """Pure-Python _recommendation_gaps, one (row, targets, sources, gains, score) tuple per supplier"""
+        gain_rows = self._sensitivity_fallback(metrics, None, 0)['gain_per_unit']
+        results = []
+        for i, (row, gain_row) in enumerate(zip(zip(*metrics), gain_rows)):
+            targets, sources, gains = [], [], []
+            for j, metric in enumerate(SCORING_METRICS):
+                direction, best, _ = METRIC_SCALES[metric]
+                references = [(name, columns[j][i]) for name, columns in benchmarks.items()] or [('best', best)]
+                best_gap, target, source = 0.0, float('nan'), None
+                for name, reference in references:
+                    if reference == reference and row[j] == row[j] and (reference - row[j]) * direction > best_gap:
+                        best_gap, target, source = (reference - row[j]) * direction, reference, name
+                if metric not in RECOMMENDATION_ACTIONS or best_gap <= 0:
+                    best_gap, target = 0.0, float('nan')
+                targets.append(target)
+                sources.append(source)
+                gains.append(gain_row[j] * best_gap)
+            data = {metric: None if value != value else value for metric, value in zip(SCORING_METRICS, row)}
+            results.append((list(row), targets, sources, gains, self._unrounded_score(data)))
+        return results
+
+    def _recommendations_from_gaps(self, row, targets, sources, gains, score=None, order=None, top=3):
+        """Build recommendation dicts for one supplier from its benchmark gaps"""
+        if order is None:
+            order = sorted(range(len(SCORING_METRICS)), key=lambda j: -gains[j])[:top]
+
+        recommendations = []
+        for j in order:
+            if not gains[j] > 0:
+                continue
+            metric = SCORING_METRICS[j]
+            category, action, label = RECOMMENDATION_ACTIONS[metric]
+            span = METRIC_SCALES[metric][2]
+            relative_gap = abs(targets[j] - row[j]) / span
+            difficulty = 'high' if relative_gap >= 0.25 else 'medium' if relative_gap >= 0.1 else 'low'
+            benchmark = {
+                'cluster': 'the peer group average', 'industry': 'the industry average', 'portfolio': 'the portfolio average'
+            }.get(sources[j], 'best practice')
+            recommendations.append({
+                'category': category,
+                'metric': metric,
+                'action': f"{action} from {row[j]:.2f} to {targets[j]:.2f} to match {benchmark}",
+                'current_value': round(float(row[j]), 4),
+                'target_value': round(float(targets[j]), 4),
+                'benchmark': sources[j],
+                'expected_score_gain': round(float(gains[j]), 2),
+                'impact': 'high' if gains[j] >= 3 else 'medium' if gains[j] >= 1 else 'low',
+                'difficulty': difficulty,
+                'timeframe': {'low': '1-3 months', 'medium': '3-6 months', 'high': '6-12 months'}[difficulty]
+            })
+        return recommendations
+
+    def _explanation_from_gaps(self, row, targets, sources, gains, score=None, benchmarks_row=0, benchmarks=None):
+        """Build the explanation of one supplier's score from its benchmark gaps"""
+        recommendations = self._recommendations_from_gaps(row, targets, sources, gains)
+
+        # Strengths and weaknesses compare against the last benchmark given (the broadest)
+        strengths, weaknesses = [], []
+        if benchmarks:
+            name = list(benchmarks)[-1]
+            reference = self._benchmark_row(benchmarks[name], benchmarks_row)
+            margins = []
+            for j, metric in enumerate(SCORING_METRICS):
+                if metric not in RECOMMENDATION_ACTIONS or row[j] != row[j] or reference[j] != reference[j]:
+                    continue
+                direction, _, span = METRIC_SCALES[metric]
+                margins.append(((row[j] - reference[j]) * direction / span, metric, row[j], reference[j]))
+            margins.sort(reverse=True)
+            for margin, metric, value, average in margins[:3]:
+                if margin > 0:
+                    strengths.append(f"{RECOMMENDATION_ACTIONS[metric][2]} of {value:.2f} is better than the {name} average of {average:.2f}")
+            for margin, metric, value, average in reversed(margins[-3:]):
+                if margin < 0:
+                    weaknesses.append(f"{RECOMMENDATION_ACTIONS[metric][2]} of {value:.2f} trails the {name} average of {average:.2f}")
+
+        if score is None:
+            summary = "The supplier is missing metrics needed to calculate its ethical score."
+        else:
+            summary = (
+                f"The supplier has an overall ethical score of {round(score, 1)}, "
+                f"which is considered {self.determine_risk_level(score)} risk."
+            )
+            if recommendations:
+                best = recommendations[0]
+                summary += (
+                    f" The biggest opportunity is {RECOMMENDATION_ACTIONS[best['metric']][2].lower()}, "
+                    f"worth about {best['expected_score_gain']} points."
+                )
+
         return {
-            "summary": f"The supplier has an overall ethical score of {score_data['overall_score']}, which is considered {score_data['risk_level']} risk.",
-            "strengths": [
-                "Moderate environmental performance",
-                "Acceptable social practices", 
-                "Standard governance measures"
-            ],
-            "weaknesses": [
-                "Room for improvement in emissions reduction",
-                "Could enhance worker conditions",
-                "Transparency could be improved"
-            ],
-            "recommendations": self.generate_recommendations(supplier_data)
+            "summary": summary,
+            "strengths": strengths,
+            "weaknesses": weaknesses,
+            "recommendations": recommendations
         }
-        
+
+    @staticmethod
+    def _benchmark_row(columns, i):
+        """Row i of benchmark metrics given as a matrix or as metric columns"""
+        if scientific_libs_available() and isinstance(columns, np.ndarray):
+            return list(columns[i])
+        return [column[i] for column in columns]
+
     def determine_risk_level(self, score):
         """Determine risk level based on score"""
         if score >= 80:
@@ -425,25 +1706,46 @@ class EthicalScoringModel:
             return "medium"
         else:
             return "high"
+
+    def determine_risk_levels(self, scores):
+        """Vectorized determine_risk_level for an array of scores"""
+        levels = np.array(['high', 'medium', 'low'])
+        return levels[(scores >= 50).astype(np.intp) + (scores >= 80)]
     
-    def predict_impact(self, current_data, changes):
+    def predict_impact(self, current_data, changes, current_scores=None):
         """
         Predict the impact of proposed changes on the ethical score
         
         Args:
             current_data: Dict with current supplier metrics
             changes: Dict with proposed changes to metrics
+            current_scores: Optional calculate_score result for current_data, to
+                avoid recomputing the baseline when simulating several changes
             
         Returns:
             Dict with predicted scores and percentage changes
         """
-        # Calculate current score
-        current_scores = self.calculate_score(current_data)
-        
         # Create a copy of current data and apply changes
         modified_data = current_data.copy()
         for metric, new_value in changes.items():
             modified_data[metric] = new_value
+
+        if current_scores is None:
+            current_fingerprint, new_fingerprint = metric_fingerprint(current_data), metric_fingerprint(modified_data)
+            if current_fingerprint is not None and new_fingerprint is not None:
+                result = score_memo.get_or_compute(
+                    ('impact', self.weights_fingerprint, current_fingerprint, new_fingerprint),
+                    lambda: self._predict_impact(current_data, modified_data)
+                )
+                return {key: dict(value) for key, value in result.items()}
+
+        return self._predict_impact(current_data, modified_data, current_scores)
+
+    def _predict_impact(self, current_data, modified_data, current_scores=None):
+        """Predict the impact of modified_data against current_data without the memo"""
+        # Calculate current score
+        if current_scores is None:
+            current_scores = self.calculate_score(current_data)
         
         # Calculate new score with changes
         new_scores = self.calculate_score(modified_data)
@@ -460,4 +1762,74 @@ class EthicalScoringModel:
             'current_scores': current_scores,
             'predicted_scores': new_scores,
             'improvements': improvements
-        } 
\ No newline at end of file
+        } 
+
+    def predict_impact_batch(self, current_metrics, scenario_rows, changes):
+        """
+        Predict the impact of many change-sets at once
+
+        Every supplier's baseline is scored once, then all scenarios are scored
+        together as a single score_batch call.
+
+        Args:
+            current_metrics: Current metrics of each supplier, in any layout
+                accepted by score_batch
+            scenario_rows: For every scenario, the current_metrics row it starts from
+            changes: For every scenario, a dict of metric -> proposed value.
+                Metrics outside SCORING_METRICS do not affect the score.
+
+        Returns:
+            Dict with 'current_scores' (arrays with one entry per supplier) and
+            'predicted_scores' and 'improvements' (one entry per scenario)
+        """
+        if not scientific_libs_available():
+            return self._predict_impact_batch_fallback(current_metrics, scenario_rows, changes)
+
+        base = self._as_matrix(current_metrics)
+        current_scores = self.score_batch(base)
+
+        rows = np.asarray(scenario_rows, dtype=np.intp)
+        scenarios = base[rows]
+        column_index = {metric: i for i, metric in enumerate(SCORING_METRICS)}
+        for i, scenario in enumerate(changes):
+            for metric, value in scenario.items():
+                j = column_index.get(metric)
+                if j is not None:
+                    scenarios[i, j] = np.nan if value is None else value
+        predicted_scores = self.score_batch(scenarios)
+
+        improvements = {}
+        for key in ['overall_score', 'environmental_score', 'social_score', 'governance_score']:
+            current = current_scores[key][rows]
+            new = predicted_scores[key]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                pct_change = np.where(current > 0, ((new - current) / current) * 100, 0.0)
+            improvements[key] = round_like_scalar(pct_change, 2)
+
+        return {
+            'current_scores': current_scores,
+            'predicted_scores': predicted_scores,
+            'improvements': improvements
+        }
+
+    def _predict_impact_batch_fallback(self, current_metrics, scenario_rows, changes):
+        """Pure-Python predict_impact_batch used when scientific libraries are not available"""
+        suppliers = [
+            {metric: None if value != value else value for metric, value in zip(SCORING_METRICS, row)}
+            for row in zip(*current_metrics)
+        ]
+        current = [self.calculate_score(data) for data in suppliers]
+        results = [
+            self.predict_impact(suppliers[row], scenario, current_scores=current[row])
+            for row, scenario in zip(scenario_rows, changes)
+        ]
+
+        def columns(items):
+            keys = items[0].keys() if items else []
+            return {key: [item[key] for item in items] for key in keys}
+
+        return {
+            'current_scores': columns(current),
+            'predicted_scores': columns([result['predicted_scores'] for result in results]),
+            'improvements': columns([result['improvements'] for result in results])
+        }
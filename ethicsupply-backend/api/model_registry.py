@@ -0,0 +1,260 @@
+import os
+import json
+import time
+import shutil
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the on-disk layout changes incompatibly
+ARTIFACT_FORMAT = 1
+
+# Versions kept on disk for rollback, including the current one
+ARTIFACT_HISTORY = 5
+
+MANIFEST_NAME = 'manifest.json'
+CURRENT_NAME = 'CURRENT'
+
+
+class ModelArtifactRegistry:
+    """
+    Process-level holder of a versioned, memory-mapped model artifact
+
+    An artifact is a directory of raw .npy arrays plus a JSON manifest, stored
+    under versions/<n>/ in the registry directory. A CURRENT file names the
+    version in use. Arrays are opened with mmap, so every worker shares one
+    copy through the page cache and loading costs no unpickling.
+
+    Publishing writes the new version to a temporary directory, renames it
+    into place and then replaces CURRENT, so readers never see a half-written
+    artifact. The last ARTIFACT_HISTORY versions are kept for rollback.
+
+    A cheap os.stat of CURRENT (at most every check_interval seconds) detects
+    a new version. The version is then decoded once per process, through
+    decode(arrays, manifest), and swapped in with a single reference
+    assignment.
+    """
+
+    def __init__(self, path, decode=None, check_interval=1.0, history=ARTIFACT_HISTORY):
+        self.path = path
+        self.decode = decode or (lambda arrays, manifest: {'arrays': arrays, 'manifest': manifest})
+        self.check_interval = check_interval
+        self.history = history
+        self._current = (None, None)  # (CURRENT file signature, decoded artifact)
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def _versions_dir(self):
+        return os.path.join(self.path, 'versions')
+
+    @property
+    def _current_path(self):
+        return os.path.join(self.path, CURRENT_NAME)
+
+    def _version_dir(self, version):
+        return os.path.join(self._versions_dir, str(version))
+
+    def _signature(self):
+        try:
+            stat = os.stat(self._current_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def current_version(self):
+        """Return the version CURRENT points to, or None if nothing has been published"""
+        try:
+            with open(self._current_path) as current_file:
+                return int(current_file.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def get(self):
+        """Return the decoded current artifact, or None if nothing has been published"""
+        now = time.monotonic()
+        signature, artifact = self._current
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return artifact
+
+        latest = self._signature()
+        if latest != signature:
+            with self._lock:
+                signature, artifact = self._current
+                if latest != signature:
+                    artifact = self._load(latest)
+                    self._current = (latest, artifact)
+        self._checked_at = now
+        return artifact
+
+    def _load(self, signature):
+        if signature is None:
+            return None
+        version = self.current_version()
+        arrays, manifest = self.read(version)
+        logger.info(f"Loaded model artifact {self.path} version {version}")
+        return self.decode(arrays, manifest)
+
+    def read(self, version):
+        """
+        Open a stored version
+
+        Returns:
+            Tuple of (dict of array name -> read-only memory-mapped array, manifest dict)
+        """
+        import numpy as np
+
+        directory = self._version_dir(version)
+        with open(os.path.join(directory, MANIFEST_NAME)) as manifest_file:
+            manifest = json.load(manifest_file)
+        if manifest.get('format') != ARTIFACT_FORMAT:
+            raise ValueError(f"Unsupported model artifact format {manifest.get('format')} in {directory}")
+
+        arrays = {}
+        for name, spec in manifest['arrays'].items():
+            array = np.load(os.path.join(directory, spec['file']), mmap_mode='r', allow_pickle=False)
+            if list(array.shape) != spec['shape'] or str(array.dtype) != spec['dtype']:
+                raise ValueError(f"Array {name} of {directory} does not match its manifest")
+            arrays[name] = array
+        return arrays, manifest
+
+    def versions(self):
+        """Return the manifests of the stored versions, oldest first"""
+        manifests = []
+        for version in self._stored_versions():
+            try:
+                with open(os.path.join(self._version_dir(version), MANIFEST_NAME)) as manifest_file:
+                    manifests.append(json.load(manifest_file))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable model artifact version {version}: {e}")
+        return manifests
+
+    def _stored_versions(self):
+        try:
+            names = os.listdir(self._versions_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(int(name) for name in names if name.isdigit())
+
+    def publish(self, arrays, metadata=None, artifact=None):
+        """
+        Store a new version and make it current, on disk and in this process
+
+        Args:
+            arrays: Dict of name -> numpy array
+            metadata: JSON-serializable dict stored in the manifest
+            artifact: The decoded artifact for this process, if the caller
+                already has it; otherwise it is decoded from the stored files
+
+        Returns:
+            The new version number
+        """
+        import numpy as np
+
+        os.makedirs(self._versions_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.path, prefix='.tmp-')
+        try:
+            specs = {}
+            for name, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                filename = f'{name}.npy'
+                with open(os.path.join(staging, filename), 'wb') as array_file:
+                    np.save(array_file, array, allow_pickle=False)
+                    array_file.flush()
+                    os.fsync(array_file.fileno())
+                specs[name] = {'file': filename, 'dtype': str(array.dtype), 'shape': list(array.shape)}
+
+            # Claim the next version number; a concurrent publisher makes the rename fail
+            while True:
+                stored = self._stored_versions()
+                version = stored[-1] + 1 if stored else 1
+                manifest = dict(metadata or {}, format=ARTIFACT_FORMAT, version=version, published_at=time.time(), arrays=specs)
+                with open(os.path.join(staging, MANIFEST_NAME), 'w') as manifest_file:
+                    json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+                    manifest_file.flush()
+                    os.fsync(manifest_file.fileno())
+                os.chmod(staging, 0o755)
+                try:
+                    os.rename(staging, self._version_dir(version))
+                    break
+                except OSError:
+                    if not os.path.exists(self._version_dir(version)):
+                        raise
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self._point_to(version, artifact)
+        self._prune()
+        logger.info(f"Published model artifact {self.path} version {version}")
+        return version
+
+    def rollback(self, version=None):
+        """
+        Make a stored version current again
+
+        Args:
+            version: Version to restore; defaults to the one before the current version
+
+        Returns:
+            The restored version number
+        """
+        stored = self._stored_versions()
+        if version is None:
+            current = self.current_version()
+            older = [stored_version for stored_version in stored if current is None or stored_version < current]
+            if not older:
+                raise ValueError("No earlier model artifact version to roll back to")
+            version = older[-1]
+        elif version not in stored:
+            raise ValueError(f"Model artifact version {version} is not stored")
+
+        # Decode before switching, so a broken version is never made current
+        arrays, manifest = self.read(version)
+        self._point_to(version, self.decode(arrays, manifest))
+        logger.info(f"Rolled model artifact {self.path} back to version {version}")
+        return version
+
+    def _point_to(self, version, artifact):
+        """Atomically replace CURRENT and swap the decoded artifact into this process"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as tmp_file:
+                tmp_file.write(f'{version}\n')
+                tmp_file.flush()
+                os.fsync(tmp_file.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self._current_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            if artifact is None:
+                artifact = self.decode(*self.read(version))
+            self._current = (self._signature(), artifact)
+            self._checked_at = time.monotonic()
+
+    def _prune(self):
+        """Delete the oldest versions beyond the history size, never the current one"""
+        current = self.current_version()
+        stored = [version for version in self._stored_versions() if version != current]
+        for version in stored[:max(0, len(stored) - (self.history - 1))]:
+            # Workers still mapping an old version keep their mapping after the unlink
+            shutil.rmtree(self._version_dir(version), ignore_errors=True)
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def artifact_registry(path, decode=None):
+    """Return the shared registry for an artifact directory"""
+    registry = _registries.get(path)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.setdefault(path, ModelArtifactRegistry(path, decode=decode))
+    return registry
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import DEFERRED
 
 class Supplier(models.Model):
     name = models.CharField(max_length=200)
@@ -27,11 +28,17 @@ class Supplier(models.Model):
     geopolitical_risk = models.FloatField(null=True, blank=True, default=0.5)
     climate_risk = models.FloatField(null=True, blank=True, default=0.5)
     labor_dispute_risk = models.FloatField(null=True, blank=True, default=0.5)
+    # External data inputs of the score, kept so rescoring uses them too; null means no data
+    social_media_sentiment = models.FloatField(null=True, blank=True)
+    news_sentiment = models.FloatField(null=True, blank=True)
+    worker_satisfaction = models.FloatField(null=True, blank=True)
+    controversy_count = models.PositiveIntegerField(default=0)
     ethical_score = models.FloatField(null=True, blank=True)
     environmental_score = models.FloatField(null=True, blank=True)
     social_score = models.FloatField(null=True, blank=True)
     governance_score = models.FloatField(null=True, blank=True)
     risk_level = models.CharField(max_length=20, null=True, blank=True)
+    cluster_label = models.IntegerField(null=True, blank=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -41,6 +48,130 @@ class Supplier(models.Model):
     def __str__(self):
         return f"{self.name} ({self.country})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so signal handlers can tell what a save changes
+        instance._loaded_values = {name: value for name, value in zip(field_names, values) if value is not DEFERRED}
+        return instance
+
+class ClusterCount(models.Model):
+    """Number of suppliers carrying each cluster label, maintained by signals"""
+    label = models.IntegerField(unique=True)
+    supplier_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['label']
+
+    def __str__(self):
+        return f"Cluster {self.label}: {self.supplier_count} suppliers"
+
+class DashboardSnapshot(models.Model):
+    """
+    Supplier rollups behind the dashboards, maintained incrementally by signals
+
+    One row per (dimension, key): the whole portfolio ('total'), each country,
+    industry and risk level, and each score distribution bucket. Rows hold the
+    supplier count plus the sum and non-null count of every dashboard metric.
+    """
+    dimension = models.CharField(max_length=40)
+    key = models.CharField(max_length=100, blank=True, default='')
+    supplier_count = models.IntegerField(default=0)
+    ethical_score_sum = models.FloatField(default=0)
+    ethical_score_count = models.IntegerField(default=0)
+    environmental_score_sum = models.FloatField(default=0)
+    environmental_score_count = models.IntegerField(default=0)
+    social_score_sum = models.FloatField(default=0)
+    social_score_count = models.IntegerField(default=0)
+    governance_score_sum = models.FloatField(default=0)
+    governance_score_count = models.IntegerField(default=0)
+    co2_emissions_sum = models.FloatField(default=0)
+    co2_emissions_count = models.IntegerField(default=0)
+    water_usage_sum = models.FloatField(default=0)
+    water_usage_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('dimension', 'key')
+        ordering = ['dimension', 'key']
+
+    def __str__(self):
+        return f"{self.dimension} {self.key}: {self.supplier_count} suppliers"
+
+class SupplierCubeCell(models.Model):
+    """
+    One cell of the country x industry x risk level cube, maintained by signals
+
+    Holds the supplier count plus the sum and non-null count of every cube
+    metric for the suppliers with exactly these dimension values ('' when a
+    supplier has none). Any roll-up is a sum over cells.
+    """
+    country = models.CharField(max_length=100, blank=True, default='')
+    industry = models.CharField(max_length=100, blank=True, default='')
+    risk_level = models.CharField(max_length=20, blank=True, default='')
+    supplier_count = models.IntegerField(default=0)
+    ethical_score_sum = models.FloatField(default=0)
+    ethical_score_count = models.IntegerField(default=0)
+    environmental_score_sum = models.FloatField(default=0)
+    environmental_score_count = models.IntegerField(default=0)
+    social_score_sum = models.FloatField(default=0)
+    social_score_count = models.IntegerField(default=0)
+    governance_score_sum = models.FloatField(default=0)
+    governance_score_count = models.IntegerField(default=0)
+    co2_emissions_sum = models.FloatField(default=0)
+    co2_emissions_count = models.IntegerField(default=0)
+    water_usage_sum = models.FloatField(default=0)
+    water_usage_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('country', 'industry', 'risk_level')
+        ordering = ['country', 'industry', 'risk_level']
+
+    def __str__(self):
+        return f"{self.country} / {self.industry} / {self.risk_level}: {self.supplier_count} suppliers"
+
+class IndustryStats(models.Model):
+    """
+    Running statistics of every numeric supplier field per industry, maintained by signals
+
+    stats maps each field to the count of non-null values and their sum, sum
+    of squares, minimum and maximum, so means and standard deviations of an
+    industry are one row read. industry is '' for suppliers without one.
+    """
+    industry = models.CharField(max_length=100, blank=True, default='', unique=True)
+    supplier_count = models.IntegerField(default=0)
+    stats = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['industry']
+        verbose_name_plural = "Industry stats"
+
+    def __str__(self):
+        return f"{self.industry or 'No industry'}: {self.supplier_count} suppliers"
+
+class QuantileSketch(models.Model):
+    """
+    Serialized KLL quantile sketches of one metric within one group of suppliers, maintained by signals
+
+    inserted sketches every value added to the group and removed every value
+    taken out since the group was last rebuilt; count is the number of live
+    values. key is '' for suppliers without a value for the dimension.
+    """
+    dimension = models.CharField(max_length=40)
+    key = models.CharField(max_length=100, blank=True, default='')
+    metric = models.CharField(max_length=40)
+    count = models.IntegerField(default=0)
+    removed_count = models.IntegerField(default=0)
+    inserted = models.JSONField(default=dict)
+    removed = models.JSONField(default=dict)
+
+    class Meta:
+        unique_together = ('dimension', 'key', 'metric')
+        ordering = ['dimension', 'key', 'metric']
+
+    def __str__(self):
+        return f"{self.dimension} {self.key} {self.metric}: {self.count} values"
+
 class ScoringWeight(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True, null=True)
@@ -81,6 +212,97 @@ class ScoringWeight(models.Model):
     def __str__(self):
         return self.name
 
+    def as_model_weights(self):
+        """Return the weights dict expected by EthicalScoringModel"""
+        return {
+            'environmental': self.environmental_weight,
+            'social': self.social_weight,
+            'governance': self.governance_weight,
+            'external_data': self.external_data_weight,
+            
+            # Environmental subcategory weights
+            'co2_emissions': self.co2_weight,
+            'water_usage': self.water_usage_weight,
+            'energy_efficiency': self.energy_efficiency_weight,
+            'waste_management': self.waste_management_weight,
+            
+            # Social subcategory weights
+            'wage_fairness': self.wage_fairness_weight,
+            'human_rights': self.human_rights_weight,
+            'diversity_inclusion': self.diversity_inclusion_weight,
+            'community_engagement': self.community_engagement_weight,
+            
+            # Governance subcategory weights
+            'transparency': self.transparency_weight,
+            'corruption_risk': self.corruption_risk_weight,
+            
+            # External data subcategory weights
+            'social_media': self.social_media_weight,
+            'news_coverage': self.news_coverage_weight,
+            'worker_reviews': self.worker_reviews_weight,
+            'controversies': self.controversy_weight,
+        }
+
+class RescoreJob(models.Model):
+    """Progress and checkpoint of a portfolio rescoring run"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    scoring_weight = models.ForeignKey(ScoringWeight, related_name="rescore_jobs", null=True, blank=True, on_delete=models.SET_NULL)
+    # Snapshot of the weights in use, so a resumed job scores every row the same way
+    weights = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # Keyset checkpoint: every supplier with id <= last_supplier_id has been rescored
+    last_supplier_id = models.BigIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Rescore job {self.id} ({self.status}, {self.processed}/{self.total})"
+
+class ClusterRefit(models.Model):
+    """
+    A request for a full clustering refit, and its progress
+
+    Web processes only insert a pending request when their online model has
+    drifted; at most one request is pending at a time, and a single
+    recluster_suppliers run claims it.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    reason = models.CharField(max_length=100, blank=True, default='')
+    changed = models.PositiveIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    requested_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-requested_at']
+        constraints = [
+            models.UniqueConstraint(fields=['status'], condition=models.Q(status='pending'), name='one_pending_cluster_refit'),
+        ]
+
+    def __str__(self):
+        return f"Cluster refit {self.id} ({self.status})"
+
 class MediaSentiment(models.Model):
     supplier = models.ForeignKey(Supplier, related_name="media_sentiments", on_delete=models.CASCADE)
     source = models.CharField(max_length=100)
@@ -108,6 +330,27 @@ class SupplierESGReport(models.Model):
     def __str__(self):
         return f"{self.supplier.name} ESG Report ({self.report_date})"
 
+class ESGTrendRollup(models.Model):
+    """
+    Monthly ESG report totals per industry behind the score trends, maintained by signals
+
+    One row per (month, industry) holding the number of reports dated in the
+    month and the sums of their scores. month is the first day of the month.
+    """
+    month = models.DateField()
+    industry = models.CharField(max_length=100, blank=True, default='')
+    report_count = models.IntegerField(default=0)
+    environmental_score_sum = models.FloatField(default=0)
+    social_score_sum = models.FloatField(default=0)
+    governance_score_sum = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ('month', 'industry')
+        ordering = ['month', 'industry']
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.industry}: {self.report_count} reports"
+
 class Controversy(models.Model):
     supplier = models.ForeignKey(Supplier, related_name="controversies", on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
@@ -0,0 +1,240 @@
+import time
+import logging
+import threading
+
+from django.db.models import Max
+
+from .models import Supplier
+from .ml_model import CLUSTER_FEATURES, cluster_features, scientific_libs_available
+
+logger = logging.getLogger(__name__)
+
+CLUSTER_FEATURE_FIELDS = [feature for feature, _ in CLUSTER_FEATURES]
+
+# Up to this many suppliers a brute-force matrix product beats a KD-tree
+BRUTE_FORCE_MAX = 20000
+
+# Changes buffered before the index is rebuilt: at least MIN_REBUILD_CHANGES,
+# or REBUILD_FRACTION of the indexed suppliers
+MIN_REBUILD_CHANGES = 256
+REBUILD_FRACTION = 0.01
+
+
+class SupplierNeighborIndex:
+    """
+    Process-wide k-nearest-neighbour index over supplier metric vectors
+
+    Suppliers are indexed on the clustering features, standardized with the
+    mean and standard deviation of the portfolio at build time. The base index
+    is sorted by industry so an industry filter searches one contiguous slice,
+    and is searched by brute force (one matrix-vector product) up to
+    BRUTE_FORCE_MAX suppliers or with a KD-tree beyond that.
+
+    Saves and deletes in this process are applied incrementally: the old row is
+    marked dead and the new vector goes into a small brute-force buffer until
+    enough changes pile up to rebuild the base in memory. Changes made by other
+    processes are picked up from updated_at every revalidate_after seconds.
+    """
+
+    def __init__(self, brute_force_max=BRUTE_FORCE_MAX, revalidate_after=30.0):
+        self.brute_force_max = brute_force_max
+        self.revalidate_after = revalidate_after
+        self._lock = threading.RLock()
+        self._built = False
+        self._checked_at = None
+
+    @property
+    def size(self):
+        """Number of suppliers currently indexed"""
+        with self._lock:
+            if not self._built:
+                return 0
+            return int(self._alive.sum()) + len(self._buffer)
+
+    def _normalize(self, X):
+        return (X - self._mean) / self._scale
+
+    def _build(self):
+        from .ml_model import np
+
+        rows = list(Supplier.objects.order_by().values('id', 'industry', *CLUSTER_FEATURE_FIELDS))
+        self._watermark = Supplier.objects.aggregate(latest=Max('updated_at'))['latest']
+        X = cluster_features(rows)
+        self._mean = X.mean(axis=0) if len(X) else np.zeros(len(CLUSTER_FEATURES))
+        scale = X.std(axis=0) if len(X) else np.ones(len(CLUSTER_FEATURES))
+        scale[scale == 0] = 1
+        self._scale = scale
+
+        self._set_base(
+            np.array([row['id'] for row in rows], dtype=np.int64),
+            [row['industry'] for row in rows],
+            self._normalize(X)
+        )
+        self._built = True
+        self._checked_at = time.monotonic()
+        logger.info(f"Built supplier neighbour index over {len(rows)} suppliers")
+
+    def _set_base(self, ids, industries, X):
+        from .ml_model import np
+
+        # Sort by industry, then id, so that every industry is one slice
+        keys = sorted(set(industries), key=lambda industry: (industry is not None, industry or ''))
+        codes = {industry: code for code, industry in enumerate(keys)}
+        industry_codes = np.array([codes[industry] for industry in industries], dtype=np.int64)
+        order = np.lexsort((ids, industry_codes))
+
+        self._ids = ids[order]
+        self._X = np.ascontiguousarray(X[order])
+        self._norms = (self._X ** 2).sum(axis=1)
+        self._alive = np.ones(len(self._ids), dtype=bool)
+        self._positions = {int(supplier_id): position for position, supplier_id in enumerate(self._ids)}
+
+        bounds = np.searchsorted(industry_codes[order], np.arange(len(keys) + 1))
+        self._slices = {industry: (int(bounds[code]), int(bounds[code + 1])) for industry, code in codes.items()}
+        self._industries = [industries[i] for i in order]
+
+        self._tree = None
+        if len(self._ids) > self.brute_force_max:
+            from sklearn.neighbors import KDTree
+            self._tree = KDTree(self._X)
+
+        self._buffer = {}  # supplier id -> (industry, normalized vector)
+        self._dead = 0
+
+    def _compact(self):
+        """Fold buffered changes into a new base, keeping the current normalization"""
+        from .ml_model import np
+
+        alive = np.flatnonzero(self._alive)
+        ids = [self._ids[alive]]
+        industries = [self._industries[i] for i in alive]
+        vectors = [self._X[alive]]
+        if self._buffer:
+            ids.append(np.array(list(self._buffer), dtype=np.int64))
+            industries.extend(industry for industry, _ in self._buffer.values())
+            vectors.append(np.array([vector for _, vector in self._buffer.values()]))
+        self._set_base(np.concatenate(ids), industries, np.concatenate(vectors))
+
+    def _ensure_current(self):
+        if not self._built:
+            self._build()
+            return
+
+        now = time.monotonic()
+        if now - self._checked_at < self.revalidate_after:
+            return
+        self._checked_at = now
+
+        # Rows saved by other processes since the last check
+        if self._watermark is not None:
+            changed = Supplier.objects.filter(updated_at__gte=self._watermark).order_by()
+            rows = list(changed.values('id', 'industry', 'updated_at', *CLUSTER_FEATURE_FIELDS))
+            for row in rows:
+                self._upsert(row['id'], row['industry'], row)
+            if rows:
+                self._watermark = max(row['updated_at'] for row in rows)
+
+        # Deletions leave no trace in updated_at
+        if Supplier.objects.count() != self.size:
+            self._build()
+
+    def _upsert(self, supplier_id, industry, record):
+        position = self._positions.get(supplier_id)
+        if position is not None and self._alive[position]:
+            self._alive[position] = False
+            self._dead += 1
+        self._buffer[supplier_id] = (industry, self._normalize(cluster_features([record]))[0])
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if len(self._buffer) + self._dead > max(MIN_REBUILD_CHANGES, REBUILD_FRACTION * len(self._ids)):
+            self._compact()
+
+    def update(self, supplier):
+        """Index the current metrics of a saved supplier, if the index has been built"""
+        with self._lock:
+            if self._built:
+                self._upsert(supplier.id, supplier.industry, supplier.__dict__)
+
+    def remove(self, supplier_id):
+        """Drop a deleted supplier from the index, if the index has been built"""
+        with self._lock:
+            if not self._built:
+                return
+            position = self._positions.get(supplier_id)
+            if position is not None and self._alive[position]:
+                self._alive[position] = False
+                self._dead += 1
+            self._buffer.pop(supplier_id, None)
+            self._maybe_compact()
+
+    def neighbors(self, supplier, k=5, industry=None):
+        """
+        Find the suppliers whose metrics are closest to a supplier's
+
+        Args:
+            supplier: Supplier instance (or dict of metrics with an 'id') to search around
+            k: Number of neighbours to return
+            industry: Only return suppliers in this industry
+
+        Returns:
+            List of (supplier_id, distance) tuples, nearest first. Distances are
+            Euclidean, in standard deviations of the portfolio.
+        """
+        from .ml_model import np
+
+        record = supplier if isinstance(supplier, dict) else supplier.__dict__
+        exclude_id = record.get('id')
+
+        with self._lock:
+            self._ensure_current()
+            query = self._normalize(cluster_features([record]))[0]
+            query_norm = float(query @ query)
+
+            # Base index: brute force over the industry slice or the whole base, or the KD-tree
+            if industry is not None or self._tree is None:
+                start, stop = self._slices.get(industry, (0, 0)) if industry is not None else (0, len(self._ids))
+                distances = self._norms[start:stop] - 2 * (self._X[start:stop] @ query) + query_norm
+                distances[~self._alive[start:stop]] = np.inf
+                count = min(k + 1, stop - start)
+                if count:
+                    nearest = np.argpartition(distances, count - 1)[:count]
+                    candidates = [(int(self._ids[start + i]), float(distances[i])) for i in nearest]
+                else:
+                    candidates = []
+            else:
+                count = min(k + 1 + self._dead, len(self._ids))
+                tree_distances, indices = self._tree.query(query[None, :], k=count)
+                candidates = [
+                    (int(self._ids[i]), float(distance) ** 2)
+                    for distance, i in zip(tree_distances[0], indices[0]) if self._alive[i]
+                ]
+
+            # Buffered changes: brute force
+            for supplier_id, (buffered_industry, vector) in self._buffer.items():
+                if industry is None or buffered_industry == industry:
+                    candidates.append((supplier_id, float(((vector - query) ** 2).sum())))
+
+        results = sorted(
+            (distance, supplier_id) for supplier_id, distance in candidates
+            if supplier_id != exclude_id and distance != np.inf
+        )[:k]
+        return [(supplier_id, max(distance, 0.0) ** 0.5) for distance, supplier_id in results]
+
+
+supplier_index = SupplierNeighborIndex()
+
+
+def nearest_suppliers(supplier, k=5, industry=None):
+    """
+    Nearest suppliers to a supplier by metric similarity
+
+    Returns:
+        List of (Supplier, distance) tuples nearest first, or None when
+        scientific libraries are not available
+    """
+    if not scientific_libs_available():
+        return None
+    matches = supplier_index.neighbors(supplier, k=k, industry=industry)
+    suppliers = Supplier.objects.in_bulk([supplier_id for supplier_id, _ in matches])
+    return [(suppliers[supplier_id], distance) for supplier_id, distance in matches if supplier_id in suppliers]
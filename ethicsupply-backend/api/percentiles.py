@@ -0,0 +1,106 @@
+import time
+import bisect
+import logging
+import threading
+
+from django.db.models import Count, Max
+
+from .models import Supplier
+from .dashboard import SCORE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+
+class ScorePercentileIndex:
+    """
+    Process-wide sorted copy of every score column, for percentile lookups by binary search
+
+    The percentile of a value is the share of suppliers with a non-null score
+    strictly below it, so a lookup is one bisect instead of a column scan.
+
+    The columns are reloaded together, in one query, when the table's version
+    (max updated_at and row count) has moved. The version is checked at most
+    every check_interval seconds; writes in this process make the next lookup
+    check it straight away.
+    """
+
+    def __init__(self, fields=SCORE_FIELDS, check_interval=1.0):
+        self.fields = tuple(fields)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._columns = None
+        self._version = None
+        self._checked_at = None
+
+    def _table_version(self):
+        row = Supplier.objects.order_by().aggregate(latest=Max('updated_at'), count=Count('id'))
+        return (row['latest'], row['count'])
+
+    def _sorted_columns(self):
+        """Return the sorted columns, reloading them first if the table has changed"""
+        now = time.monotonic()
+        columns = self._columns
+        if columns is not None and self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return columns
+
+        with self._lock:
+            version = self._table_version()
+            if self._columns is None or version != self._version:
+                rows = Supplier.objects.order_by().values_list(*self.fields)
+                values = list(zip(*rows)) or [()] * len(self.fields)
+                self._columns = {
+                    field: sorted(value for value in column if value is not None)
+                    for field, column in zip(self.fields, values)
+                }
+                self._version = version
+                logger.info(f"Loaded score percentile index over {version[1]} suppliers")
+            self._checked_at = now
+            return self._columns
+
+    def invalidate(self):
+        """Check the table version on the next lookup"""
+        self._checked_at = None
+
+    def percentile(self, value, field='ethical_score'):
+        """
+        Percentile of value among all suppliers' non-null field scores
+
+        Returns:
+            Share of suppliers scoring strictly below value, in percent rounded
+            to one decimal; 0 if value is None or no supplier has a score
+        """
+        if field not in self.fields:
+            raise ValueError(f"No percentile index for {field}")
+        if value is None:
+            return 0
+        column = self._sorted_columns()[field]
+        if not column:
+            return 0
+        return round(bisect.bisect_left(column, value) / len(column) * 100, 1)
+
+    def supplier_percentiles(self, suppliers=None):
+        """
+        Percentile of every score of many suppliers, with one query for their scores
+
+        Args:
+            suppliers: Supplier queryset; defaults to all suppliers
+
+        Returns:
+            Dict of supplier id -> dict of score field -> percentile
+        """
+        suppliers = Supplier.objects.all() if suppliers is None else suppliers
+        columns = self._sorted_columns()
+        result = {}
+        for row in suppliers.order_by().values_list('id', *self.fields):
+            result[row[0]] = {}
+            for field, value in zip(self.fields, row[1:]):
+                column = columns[field]
+                result[row[0]][field] = (
+                    round(bisect.bisect_left(column, value) / len(column) * 100, 1)
+                    if value is not None and column else 0
+                )
+        return result
+
+
+# Shared by every request in the process
+score_percentiles = ScorePercentileIndex()
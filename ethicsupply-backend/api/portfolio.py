@@ -0,0 +1,24 @@
+from .models import Supplier
+from .ml_model import SCORING_METRICS, metrics_to_columns
+
+
+def supplier_metric_fields():
+    """Scoring metrics that are stored as columns on Supplier"""
+    field_names = {field.name for field in Supplier._meta.get_fields()}
+    return [metric for metric in SCORING_METRICS if metric in field_names]
+
+
+def load_metrics(queryset, extra_fields=()):
+    """
+    Load supplier metrics as a score_batch matrix with a single query
+
+    Args:
+        queryset: Supplier queryset to load
+        extra_fields: Additional columns to return alongside the metrics
+
+    Returns:
+        Tuple of (rows, metrics) where rows are the fetched value dicts in
+        queryset order and metrics is the matrix built from them
+    """
+    rows = list(queryset.values('id', *supplier_metric_fields(), *extra_fields))
+    return rows, metrics_to_columns(rows)
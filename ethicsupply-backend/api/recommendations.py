@@ -0,0 +1,169 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from django.db.models import Avg
+
+from .models import Supplier
+from .ml_model import EthicalScoringModel, RECOMMENDATION_ACTIONS, SCORING_METRICS, metrics_to_columns
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_METRICS = list(RECOMMENDATION_ACTIONS)
+
+
+class BenchmarkCache:
+    """
+    Process-wide cluster centroids and industry averages of supplier metrics
+
+    Both are computed by the database with one grouped aggregate each and
+    refreshed at most every refresh_after seconds. The version changes
+    whenever refreshed values differ, which invalidates recommendations
+    derived from the old benchmarks.
+    """
+
+    def __init__(self, refresh_after=60.0):
+        self.refresh_after = refresh_after
+        self._values = None  # (cluster averages, industry averages)
+        self._refreshed_at = None
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return (averages by cluster label, averages by industry)"""
+        now = time.monotonic()
+        if self._values is not None and now - self._refreshed_at < self.refresh_after:
+            return self._values
+
+        with self._lock:
+            if self._values is None or now - self._refreshed_at >= self.refresh_after:
+                averages = [Avg(metric) for metric in BENCHMARK_METRICS]
+                values = tuple(
+                    {
+                        row[group]: {metric: row[f'{metric}__avg'] for metric in BENCHMARK_METRICS}
+                        for row in Supplier.objects.exclude(**{f'{group}__isnull': True}).order_by()
+                        .values(group).annotate(*averages)
+                    }
+                    for group in ('cluster_label', 'industry')
+                )
+                if values != self._values:
+                    self.version += 1
+                self._values = values
+                self._refreshed_at = now
+        return self._values
+
+    def clear(self):
+        with self._lock:
+            self._values = None
+
+
+class RecommendationCache:
+    """
+    LRU cache of recommendations and explanations per supplier
+
+    Entries are keyed by supplier id and checked against the supplier's
+    updated_at, the benchmark version and the scoring weights, so edits made by other processes
+    and benchmark refreshes are picked up too. Saves and deletes in this
+    process drop entries through signals.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # supplier id -> ((updated_at, benchmark version, weights), result)
+        self._lock = threading.Lock()
+
+    def get(self, supplier_id, key):
+        with self._lock:
+            entry = self._entries.get(supplier_id)
+            if entry is None or entry[0] != key:
+                return None
+            self._entries.move_to_end(supplier_id)
+            return entry[1]
+
+    def put(self, supplier_id, key, result):
+        with self._lock:
+            self._entries[supplier_id] = (key, result)
+            self._entries.move_to_end(supplier_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, supplier_id):
+        with self._lock:
+            self._entries.pop(supplier_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+benchmarks = BenchmarkCache()
+recommendation_cache = RecommendationCache()
+
+
+def _benchmark_metrics(records, cluster_averages, industry_averages):
+    """Benchmark columns for supplier records: their cluster centroid and industry average"""
+    def lookup(averages, key):
+        values = averages.get(key) if key is not None else None
+        return {metric: (values or {}).get(metric) for metric in SCORING_METRICS}
+
+    return {
+        'cluster': metrics_to_columns([lookup(cluster_averages, record.get('cluster_label')) for record in records]),
+        'industry': metrics_to_columns([lookup(industry_averages, record.get('industry')) for record in records]),
+    }
+
+
+def recommend_for_data(supplier_data, model=None):
+    """
+    Recommendations and explanation for supplier data that is not cached, such as an unsaved supplier
+
+    Returns:
+        Dict with 'recommendations' and 'explanation'
+    """
+    model = model or EthicalScoringModel(load_model=False)
+    cluster_averages, industry_averages = benchmarks.get()
+    metrics = metrics_to_columns([supplier_data])
+    references = _benchmark_metrics([supplier_data], cluster_averages, industry_averages)
+    explanation = model.explain_batch(metrics, references)[0]
+    return {'recommendations': explanation['recommendations'], 'explanation': explanation}
+
+
+def supplier_recommendations(suppliers, model=None):
+    """
+    Recommendations and explanations for saved suppliers, computed in one batch
+
+    Cached results are reused while neither the supplier nor the benchmarks
+    have changed; the rest are computed together.
+
+    Args:
+        suppliers: Supplier instances
+        model: Optional EthicalScoringModel whose weights drive expected gains
+
+    Returns:
+        Dict of supplier id -> {'recommendations': [...], 'explanation': {...}}
+    """
+    model = model or EthicalScoringModel(load_model=False)
+    cluster_averages, industry_averages = benchmarks.get()
+
+    weights = model.weights_fingerprint
+
+    results = {}
+    missing = []
+    for supplier in suppliers:
+        key = (supplier.updated_at, benchmarks.version, weights)
+        cached = recommendation_cache.get(supplier.id, key)
+        if cached is not None:
+            results[supplier.id] = cached
+        else:
+            missing.append((supplier, key))
+
+    if missing:
+        records = [supplier.__dict__ for supplier, _ in missing]
+        references = _benchmark_metrics(records, cluster_averages, industry_averages)
+        explanations = model.explain_batch(metrics_to_columns(records), references)
+        for (supplier, key), explanation in zip(missing, explanations):
+            result = {'recommendations': explanation['recommendations'], 'explanation': explanation}
+            recommendation_cache.put(supplier.id, key, result)
+            results[supplier.id] = result
+
+    return results
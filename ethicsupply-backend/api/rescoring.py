@@ -0,0 +1,206 @@
+import os
+import sys
+import logging
+import subprocess
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Supplier, ScoringWeight, RescoreJob
+from .ml_model import EthicalScoringModel, score_columns
+from .portfolio import load_metrics
+from .dashboard import rebuild_dashboard_snapshot
+from .industry_stats import rebuild_industry_stats
+from .sketches import rebuild_quantile_sketches
+from .cube import rebuild_cube
+from .response_cache import invalidate_tags, SUPPLIERS
+from .percentiles import score_percentiles
+
+logger = logging.getLogger(__name__)
+
+# Score columns stored on Supplier, keyed by the score_batch result they come from
+SCORE_FIELDS = {
+    'ethical_score': 'overall_score',
+    'environmental_score': 'environmental_score',
+    'social_score': 'social_score',
+    'governance_score': 'governance_score',
+    'risk_level': 'risk_level',
+}
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def create_rescore_job(scoring_weight=None):
+    """
+    Create a pending rescore job
+
+    Args:
+        scoring_weight: ScoringWeight to score with. Defaults to the profile flagged
+            is_default, or the model's built-in weights when there is none.
+    """
+    if scoring_weight is None:
+        scoring_weight = ScoringWeight.objects.filter(is_default=True).first()
+
+    if scoring_weight is not None:
+        weights = scoring_weight.as_model_weights()
+    else:
+        weights = dict(EthicalScoringModel(load_model=False).weights)
+
+    return RescoreJob.objects.create(
+        scoring_weight=scoring_weight,
+        weights=weights,
+        total=Supplier.objects.count()
+    )
+
+
+def launch_rescore_job(job):
+    """Run a job in a detached rescore_suppliers process so it outlives the request"""
+    manage_py = os.path.join(settings.BASE_DIR, 'manage.py')
+    subprocess.Popen(
+        [sys.executable, manage_py, 'rescore_suppliers', '--resume', str(job.id)],
+        start_new_session=True
+    )
+
+
+def _iter_ranges(after_id, chunk_size):
+    """Yield (after_id, last_id] keyset ranges holding at most chunk_size suppliers each"""
+    while True:
+        ids = Supplier.objects.filter(id__gt=after_id).order_by('id').values_list('id', flat=True)
+        bound = list(ids[chunk_size - 1:chunk_size])
+        if bound:
+            last_id = bound[0]
+        else:
+            last_id = ids.aggregate(last_id=Max('id'))['last_id']
+            if last_id is None:
+                return
+        yield after_id, last_id
+        after_id = last_id
+
+
+def rescore_range(weights, after_id, last_id):
+    """
+    Score the suppliers with after_id < id <= last_id and write their scores back
+
+    Runs inside process pool workers as well as in-process; each call is one
+    bounded transaction.
+
+    Returns:
+        Number of suppliers rescored
+    """
+    rows, metrics = load_metrics(
+        Supplier.objects.filter(id__gt=after_id, id__lte=last_id).order_by('id'),
+        extra_fields=SCORE_FIELDS
+    )
+    if not rows:
+        return 0
+    scores = score_columns(weights, metrics)
+
+    # Only rows whose scores actually change are written back
+    now = timezone.now()
+    suppliers = []
+    for i, row in enumerate(rows):
+        new_scores = {
+            field: str(scores[key][i]) if field == 'risk_level' else float(scores[key][i])
+            for field, key in SCORE_FIELDS.items()
+        }
+        if all(row[field] == value for field, value in new_scores.items()):
+            continue
+        suppliers.append(Supplier(id=row['id'], updated_at=now, **new_scores))
+
+    if suppliers:
+        with transaction.atomic():
+            Supplier.objects.bulk_update(suppliers, list(SCORE_FIELDS) + ['updated_at'], batch_size=500)
+    return len(rows)
+
+
+def _default_workers():
+    # SQLite only allows one writer at a time, so parallel workers would just queue on its lock
+    if connection.vendor == 'sqlite':
+        return 1
+    return min(4, os.cpu_count() or 1)
+
+
+def run_rescore_job(job, chunk_size=DEFAULT_CHUNK_SIZE, workers=None, progress=None):
+    """
+    Recompute the stored scores of every supplier after job.last_supplier_id
+
+    Suppliers are split into keyset-ordered id ranges that a process pool
+    scores with score_batch and writes back with bulk_update, one transaction
+    per range. The job checkpoint only advances past ranges that are written,
+    in id order, so a crashed run resumes where it stopped (at worst rescoring
+    a few ranges twice).
+
+    Args:
+        job: RescoreJob to run or resume
+        chunk_size: Number of suppliers scored and written per transaction
+        workers: Size of the process pool; 0 or 1 scores in-process
+        progress: Optional callable receiving the job after every chunk
+
+    Returns:
+        The finished RescoreJob
+    """
+    if workers is None:
+        workers = _default_workers()
+
+    job.status = 'running'
+    job.error = ''
+    job.save(update_fields=['status', 'error', 'updated_at'])
+
+    def checkpoint(last_id, count):
+        job.last_supplier_id = last_id
+        job.processed += count
+        job.save(update_fields=['last_supplier_id', 'processed', 'updated_at'])
+        if progress:
+            progress(job)
+
+    ranges = _iter_ranges(job.last_supplier_id, chunk_size)
+
+    try:
+        if workers <= 1:
+            for after_id, last_id in ranges:
+                checkpoint(last_id, rescore_range(job.weights, after_id, last_id))
+        else:
+            # Workers are spawned fresh and open their own database connections.
+            # A bounded number of ranges stays in flight and results are consumed
+            # in submission order, so the checkpoint only ever moves forward.
+            pending = deque()
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup
+            )
+            with pool:
+                for after_id, last_id in ranges:
+                    pending.append((last_id, pool.submit(rescore_range, job.weights, after_id, last_id)))
+                    if len(pending) >= workers * 2:
+                        last_id, future = pending.popleft()
+                        checkpoint(last_id, future.result())
+                while pending:
+                    last_id, future = pending.popleft()
+                    checkpoint(last_id, future.result())
+    except Exception as e:
+        logger.error(f"Rescore job {job.id} failed after supplier {job.last_supplier_id}: {e}")
+        job.status = 'failed'
+        job.error = str(e)
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        raise
+
+    # bulk_update bypasses the signals that maintain the dashboard snapshot, industry statistics,
+    # quantile sketches, supplier cube and cached responses
+    rebuild_dashboard_snapshot()
+    rebuild_industry_stats()
+    rebuild_quantile_sketches()
+    rebuild_cube()
+    invalidate_tags(SUPPLIERS)
+    score_percentiles.invalidate()
+
+    job.status = 'completed'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at', 'updated_at'])
+    return job
@@ -0,0 +1,152 @@
+import time
+import hashlib
+import logging
+import functools
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpRequest, HttpResponse
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+# Data each cached endpoint depends on; writes to the matching models invalidate the tag
+SUPPLIERS = 'suppliers'
+SCORING_WEIGHTS = 'scoring_weights'
+ESG = 'esg'
+
+
+def _cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+
+def _tag_timeout():
+    """
+    Lifetime of tag versions: unbounded in a cache shared by every process,
+    otherwise the response timeout, so that invalidations made by other
+    processes (other workers, management commands) are picked up within it
+    """
+    if isinstance(_cache(), (LocMemCache, DummyCache)):
+        return _timeout()
+    return None
+
+
+def tag_versions(tags):
+    """
+    Current version of each tag: the time of its last invalidation
+
+    A tag missing from the cache (never invalidated, expired or evicted)
+    starts at the current time, which conservatively treats it as just modified.
+    """
+    cache = _cache()
+    keys = {tag: f'response-tag:{tag}' for tag in tags}
+    stored = cache.get_many(list(keys.values()))
+    versions = {}
+    for tag, key in keys.items():
+        version = stored.get(key)
+        if version is None:
+            cache.add(key, time.time(), timeout=_tag_timeout())
+            version = cache.get(key) or time.time()
+        versions[tag] = version
+    return versions
+
+
+def invalidate_tags(*tags):
+    """Mark every cached response depending on these tags as stale, in every process sharing the cache"""
+    now = time.time()
+    _cache().set_many({f'response-tag:{tag}': now for tag in tags}, timeout=_tag_timeout())
+
+
+def _request_of(args):
+    for arg in args[:2]:
+        if isinstance(arg, HttpRequest) or hasattr(arg, '_request'):
+            return arg
+    raise TypeError("cached_response needs a view taking the request as first or second argument")
+
+
+def cached_response(*tags, timeout=None):
+    """
+    Cache a read-only DRF view's response data until one of its tags is invalidated
+
+    Responses carry an ETag and Last-Modified taken from the cache entry
+    serving them: a hash of the rendered body (or, for formats stored
+    unrendered, of the entry key and creation time) and the entry's creation
+    time. A client revalidating with If-None-Match or If-Modified-Since gets a
+    304 without the view running while the entry lives, and a recomputed entry
+    only keeps the client's ETag if its body is unchanged. Only 200 responses
+    are stored. JSON is stored rendered, so a hit costs no serialization;
+    other formats (e.g. the browsable API) store the data and render per request.
+
+    Apply it to the function below @api_view or @action.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            request = _request_of(args)
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+
+            versions = tag_versions(tags)
+            media_type = getattr(request, 'accepted_media_type', '')
+            fingerprint = repr((
+                view.__module__, view.__qualname__, request.get_full_path(), media_type, sorted(versions.items())
+            ))
+            key = 'response:' + hashlib.sha256(fingerprint.encode()).hexdigest()
+
+            cached = _cache().get(key)
+            if cached is None:
+                response = view(*args, **kwargs)
+                if response.status_code != status.HTTP_200_OK or not isinstance(response, Response):
+                    return response
+                cached = _cache_entry(request, response, key)
+                _cache().set(key, cached, timeout if timeout is not None else _timeout())
+
+            if _not_modified(request, cached['etag'], cached['created_at']):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = _cached_response(cached)
+            response['ETag'] = cached['etag']
+            response['Last-Modified'] = http_date(cached['created_at'])
+            response['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+def _cache_entry(request, response, key):
+    created_at = int(time.time())
+    renderer = getattr(request, 'accepted_renderer', None)
+    if renderer is not None and renderer.format == 'json':
+        content = renderer.render(response.data, request.accepted_media_type, {'request': request, 'response': response})
+        content_type = request.accepted_media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        digest = hashlib.sha256(content_type.encode() + b'\0' + content).hexdigest()
+        return {
+            'kind': 'rendered', 'content': content, 'content_type': content_type,
+            'etag': quote_etag(digest[:32]), 'created_at': created_at,
+        }
+    digest = hashlib.sha256(f'{key}:{time.time()}'.encode()).hexdigest()
+    return {'kind': 'data', 'data': response.data, 'etag': quote_etag(digest[:32]), 'created_at': created_at}
+
+
+def _cached_response(cached):
+    if cached['kind'] == 'rendered':
+        return HttpResponse(cached['content'], content_type=cached['content_type'])
+    return Response(cached['data'])
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return etag in [value.strip() for value in if_none_match.split(',')] or if_none_match.strip() == '*'
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE') or '')
+    return if_modified_since is not None and last_modified <= if_modified_since
@@ -0,0 +1,94 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+
+from .models import ScoringWeight
+from .ml_model import EthicalScoringModel
+
+logger = logging.getLogger(__name__)
+
+
+class WeightProfileRegistry:
+    """
+    Process-wide cache of scorers compiled from ScoringWeight profiles
+
+    Each profile is compiled once into an EthicalScoringModel with read-only
+    weights, keyed by (id, updated_at) and evicted least-recently-used first.
+    Saves and deletes in this process invalidate entries through signals; other
+    processes pick up edits once revalidate_after seconds have passed.
+    """
+
+    def __init__(self, max_size=64, revalidate_after=30.0):
+        self.max_size = max_size
+        self.revalidate_after = revalidate_after
+        self._scorers = OrderedDict()  # (id, updated_at) -> scorer
+        self._versions = {}  # id -> ((id, updated_at), last checked)
+        self._lock = threading.Lock()
+
+    def get(self, weight_id):
+        """
+        Return the compiled scorer for a ScoringWeight id
+
+        Raises:
+            ScoringWeight.DoesNotExist: If there is no such profile
+        """
+        weight_id = int(weight_id)
+        now = time.monotonic()
+
+        with self._lock:
+            version = self._versions.get(weight_id)
+            if version is not None and now - version[1] < self.revalidate_after:
+                key = version[0]
+                self._scorers.move_to_end(key)
+                return self._scorers[key]
+
+        if version is not None:
+            # Cheap freshness check before trusting an entry that may be stale
+            updated_at = ScoringWeight.objects.filter(id=weight_id).values_list('updated_at', flat=True).first()
+            if updated_at is None:
+                self.invalidate(weight_id)
+                raise ScoringWeight.DoesNotExist(f"ScoringWeight {weight_id} does not exist")
+            if (weight_id, updated_at) == version[0]:
+                with self._lock:
+                    if version[0] in self._scorers:
+                        self._versions[weight_id] = (version[0], now)
+                        self._scorers.move_to_end(version[0])
+                        return self._scorers[version[0]]
+
+        return self._compile(ScoringWeight.objects.get(id=weight_id), now)
+
+    def _compile(self, weight_model, now):
+        key = (weight_model.id, weight_model.updated_at)
+        scorer = EthicalScoringModel(MappingProxyType(weight_model.as_model_weights()), load_model=False)
+
+        with self._lock:
+            previous = self._versions.get(weight_model.id)
+            if previous is not None and previous[0] != key:
+                self._scorers.pop(previous[0], None)
+            self._scorers[key] = scorer
+            self._scorers.move_to_end(key)
+            self._versions[weight_model.id] = (key, now)
+
+            while len(self._scorers) > self.max_size:
+                (evicted_id, _), _ = self._scorers.popitem(last=False)
+                self._versions.pop(evicted_id, None)
+
+        logger.info(f"Compiled scoring weight profile {weight_model.id}")
+        return scorer
+
+    def invalidate(self, weight_id):
+        """Drop the compiled scorer of a profile"""
+        with self._lock:
+            version = self._versions.pop(int(weight_id), None)
+            if version is not None:
+                self._scorers.pop(version[0], None)
+
+    def clear(self):
+        with self._lock:
+            self._scorers.clear()
+            self._versions.clear()
+
+
+weight_profiles = WeightProfileRegistry()
@@ -5,4 +5,4 @@ class SupplierSerializer(serializers.ModelSerializer):
     class Meta:
         model = Supplier
         fields = '__all__'
-        read_only_fields = ('ethical_score', 'created_at', 'updated_at') 
\ No newline at end of file
+        read_only_fields = ('ethical_score', 'cluster_label', 'created_at', 'updated_at') 
\ No newline at end of file
@@ -0,0 +1,289 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Supplier, ScoringWeight, SupplierESGReport, MediaSentiment, Controversy
+from .scoring_registry import weight_profiles
+from .clustering import assign_cluster, absorb_supplier, adjust_cluster_count
+from .neighbors import supplier_index
+from .recommendations import recommendation_cache
+from .dashboard import SNAPSHOT_FIELDS, apply_snapshot_change
+from .percentiles import score_percentiles
+from .industry_stats import INDUSTRY_STATS_FIELDS, apply_industry_stats_change
+from .sketches import SKETCH_FIELDS, apply_sketch_change
+from .cube import CUBE_FIELDS, apply_cube_change
+from .esg_trends import TREND_FIELDS, apply_report_change, move_supplier_reports
+from .response_cache import invalidate_tags, SUPPLIERS, SCORING_WEIGHTS, ESG
+from .ml_model import EthicalScoringModel, CLUSTER_FEATURES
+
+CLUSTER_FEATURE_FIELDS = [feature for feature, _ in CLUSTER_FEATURES]
+
+
+def _stored_values(instance, fields):
+    """Values of fields as last loaded from (or saved to) the database, or None for a new row"""
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is not None and all(field in loaded for field in fields):
+        return {field: loaded[field] for field in fields}
+    if instance.pk is None:
+        return None
+    return Supplier.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(post_save, sender=ScoringWeight)
+@receiver(post_delete, sender=ScoringWeight)
+def invalidate_weight_profile(sender, instance, **kwargs):
+    """Drop the compiled scorer of an edited or deleted weight profile"""
+    weight_profiles.invalidate(instance.id)
+
+
+@receiver(pre_save, sender=Supplier)
+def update_supplier_cluster(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Keep a supplier's cluster label in step with its metrics"""
+    if raw:
+        return
+    if update_fields is not None and 'cluster_label' not in update_fields:
+        instance._previous_cluster_label = instance.cluster_label
+        return
+
+    stored = _stored_values(instance, CLUSTER_FEATURE_FIELDS + ['cluster_label'])
+    if stored is None:
+        # New supplier: label it, and absorb it into the online clustering model once
+        # it is committed, unless a label was given
+        instance._previous_cluster_label = None
+        instance._absorb_into_clusters = instance.cluster_label is None
+        if instance._absorb_into_clusters:
+            instance.cluster_label = assign_cluster(instance.__dict__)
+        return
+
+    instance._previous_cluster_label = stored['cluster_label']
+    if any(getattr(instance, field) != stored[field] for field in CLUSTER_FEATURE_FIELDS):
+        label = EthicalScoringModel().get_supplier_cluster(instance.__dict__)
+        if label is not None:
+            instance.cluster_label = label
+
+
+@receiver(post_save, sender=Supplier)
+def count_supplier_cluster(sender, instance, raw=False, **kwargs):
+    """Move the supplier between cluster counts when its label changes"""
+    previous = getattr(instance, '_previous_cluster_label', None)
+    if not raw and previous != instance.cluster_label:
+        adjust_cluster_count(previous, -1)
+        adjust_cluster_count(instance.cluster_label, 1)
+    # The row now holds these values
+    instance._loaded_values = {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}
+
+
+@receiver(post_save, sender=Supplier)
+def absorb_new_supplier(sender, instance, created=False, raw=False, **kwargs):
+    """Absorb a new supplier into the online clustering model once its transaction commits"""
+    if raw or not created or not getattr(instance, '_absorb_into_clusters', False):
+        return
+    instance._absorb_into_clusters = False
+    supplier_data = {field: getattr(instance, field) for field in CLUSTER_FEATURE_FIELDS}
+    transaction.on_commit(lambda: absorb_supplier(supplier_data))
+
+
+@receiver(post_delete, sender=Supplier)
+def uncount_supplier_cluster(sender, instance, **kwargs):
+    """Remove a deleted supplier from its cluster count"""
+    adjust_cluster_count(instance.cluster_label, -1)
+
+
+@receiver(post_save, sender=Supplier)
+def index_supplier(sender, instance, raw=False, **kwargs):
+    """Keep the nearest-neighbour index in step with supplier metrics"""
+    if not raw:
+        supplier_index.update(instance)
+
+
+@receiver(post_delete, sender=Supplier)
+def unindex_supplier(sender, instance, **kwargs):
+    supplier_index.remove(instance.id)
+
+
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+def invalidate_supplier_recommendations(sender, instance, **kwargs):
+    """Drop cached recommendations of an edited or deleted supplier"""
+    recommendation_cache.invalidate(instance.id)
+
+
+@receiver(pre_save, sender=Supplier)
+def remember_snapshot_values(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Keep the values the dashboard snapshot currently counts for the supplier"""
+    instance._snapshot_values = None
+    instance._snapshot_changed = not raw and (update_fields is None or bool(set(update_fields) & set(SNAPSHOT_FIELDS)))
+    if instance._snapshot_changed:
+        instance._snapshot_values = _stored_values(instance, list(SNAPSHOT_FIELDS))
+
+
+@receiver(post_save, sender=Supplier)
+def update_dashboard_snapshot(sender, instance, raw=False, **kwargs):
+    """Apply a supplier write to the dashboard snapshot"""
+    if getattr(instance, '_snapshot_changed', False):
+        apply_snapshot_change(
+            instance._snapshot_values,
+            {field: instance._meta.get_field(field).to_python(getattr(instance, field)) for field in SNAPSHOT_FIELDS}
+        )
+
+
+@receiver(post_delete, sender=Supplier)
+def remove_from_dashboard_snapshot(sender, instance, **kwargs):
+    """Take a deleted supplier out of the dashboard snapshot"""
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    apply_snapshot_change({field: loaded.get(field, getattr(instance, field)) for field in SNAPSHOT_FIELDS}, None)
+
+
+@receiver(pre_save, sender=Supplier)
+def remember_cube_values(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Keep the values the supplier cube currently counts for the supplier"""
+    instance._cube_values = None
+    instance._cube_changed = not raw and (update_fields is None or bool(set(update_fields) & set(CUBE_FIELDS)))
+    if instance._cube_changed:
+        instance._cube_values = _stored_values(instance, list(CUBE_FIELDS))
+
+
+@receiver(post_save, sender=Supplier)
+def update_supplier_cube(sender, instance, **kwargs):
+    """Apply a supplier write to the supplier cube"""
+    if getattr(instance, '_cube_changed', False):
+        apply_cube_change(
+            instance._cube_values,
+            {field: instance._meta.get_field(field).to_python(getattr(instance, field)) for field in CUBE_FIELDS}
+        )
+
+
+@receiver(post_delete, sender=Supplier)
+def remove_from_supplier_cube(sender, instance, **kwargs):
+    """Take a deleted supplier out of the supplier cube"""
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    apply_cube_change({field: loaded.get(field, getattr(instance, field)) for field in CUBE_FIELDS}, None)
+
+
+@receiver(pre_save, sender=Supplier)
+def remember_industry_stats_values(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Keep the values the industry statistics currently count for the supplier"""
+    instance._industry_stats_values = None
+    instance._industry_stats_changed = not raw and (
+        update_fields is None or bool(set(update_fields) & set(INDUSTRY_STATS_FIELDS))
+    )
+    if instance._industry_stats_changed:
+        instance._industry_stats_values = _stored_values(instance, list(INDUSTRY_STATS_FIELDS))
+
+
+@receiver(post_save, sender=Supplier)
+def update_industry_stats(sender, instance, **kwargs):
+    """Apply a supplier write to the industry statistics"""
+    if getattr(instance, '_industry_stats_changed', False):
+        apply_industry_stats_change(
+            instance._industry_stats_values,
+            {field: instance._meta.get_field(field).to_python(getattr(instance, field)) for field in INDUSTRY_STATS_FIELDS}
+        )
+
+
+@receiver(post_delete, sender=Supplier)
+def remove_from_industry_stats(sender, instance, **kwargs):
+    """Take a deleted supplier out of the industry statistics"""
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    apply_industry_stats_change(
+        {field: loaded.get(field, getattr(instance, field)) for field in INDUSTRY_STATS_FIELDS}, None
+    )
+
+
+@receiver(pre_save, sender=Supplier)
+def remember_sketch_values(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Keep the values the quantile sketches currently hold for the supplier"""
+    instance._sketch_values = None
+    instance._sketch_changed = not raw and (update_fields is None or bool(set(update_fields) & set(SKETCH_FIELDS)))
+    if instance._sketch_changed:
+        instance._sketch_values = _stored_values(instance, list(SKETCH_FIELDS))
+
+
+@receiver(post_save, sender=Supplier)
+def update_quantile_sketches(sender, instance, **kwargs):
+    """Apply a supplier write to the quantile sketches"""
+    if getattr(instance, '_sketch_changed', False):
+        apply_sketch_change(
+            instance._sketch_values,
+            {field: instance._meta.get_field(field).to_python(getattr(instance, field)) for field in SKETCH_FIELDS}
+        )
+
+
+@receiver(post_delete, sender=Supplier)
+def remove_from_quantile_sketches(sender, instance, **kwargs):
+    """Take a deleted supplier out of the quantile sketches"""
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    apply_sketch_change({field: loaded.get(field, getattr(instance, field)) for field in SKETCH_FIELDS}, None)
+
+
+@receiver(pre_save, sender=Supplier)
+def remember_trend_industry(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Keep the industry the ESG trend rollup currently counts the supplier's reports under"""
+    instance._trend_industry = None
+    if not raw and (update_fields is None or 'industry' in update_fields):
+        instance._trend_industry = _stored_values(instance, ['industry'])
+
+
+@receiver(post_save, sender=Supplier)
+def move_esg_trend_industry(sender, instance, **kwargs):
+    """Move a supplier's reports between industries of the ESG trend rollup when its industry changes"""
+    old_values = getattr(instance, '_trend_industry', None)
+    if old_values is not None:
+        move_supplier_reports(instance.id, old_values['industry'], instance.industry)
+
+
+def _report_values(instance):
+    """A report's TREND_FIELDS and its supplier's industry, as stored after a write"""
+    values = {field: instance._meta.get_field(field).to_python(getattr(instance, field)) for field in TREND_FIELDS}
+    if SupplierESGReport.supplier.is_cached(instance):
+        values['industry'] = instance.supplier.industry
+    else:
+        values['industry'] = Supplier.objects.filter(pk=instance.supplier_id).values_list('industry', flat=True).first()
+    return values
+
+
+@receiver(pre_save, sender=SupplierESGReport)
+def remember_trend_values(sender, instance, **kwargs):
+    """Keep the values the ESG trend rollup currently counts for the report"""
+    instance._trend_values = None
+    if instance.pk is not None:
+        instance._trend_values = (
+            SupplierESGReport.objects.filter(pk=instance.pk)
+            .values(*TREND_FIELDS, industry=F('supplier__industry')).first()
+        )
+
+
+@receiver(post_save, sender=SupplierESGReport)
+def update_esg_trends(sender, instance, **kwargs):
+    """Apply a report write to the ESG trend rollup"""
+    apply_report_change(getattr(instance, '_trend_values', None), _report_values(instance))
+
+
+@receiver(post_delete, sender=SupplierESGReport)
+def remove_from_esg_trends(sender, instance, **kwargs):
+    """Take a deleted report out of the ESG trend rollup"""
+    apply_report_change(_report_values(instance), None)
+
+
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+def invalidate_supplier_responses(sender, instance, **kwargs):
+    invalidate_tags(SUPPLIERS)
+    score_percentiles.invalidate()
+
+
+@receiver(post_save, sender=ScoringWeight)
+@receiver(post_delete, sender=ScoringWeight)
+def invalidate_scoring_weight_responses(sender, instance, **kwargs):
+    invalidate_tags(SCORING_WEIGHTS)
+
+
+@receiver(post_save, sender=SupplierESGReport)
+@receiver(post_delete, sender=SupplierESGReport)
+@receiver(post_save, sender=MediaSentiment)
+@receiver(post_delete, sender=MediaSentiment)
+@receiver(post_save, sender=Controversy)
+@receiver(post_delete, sender=Controversy)
+def invalidate_esg_responses(sender, instance, **kwargs):
+    invalidate_tags(ESG)
@@ -0,0 +1,591 @@
+import bisect
+import datetime
+import math
+import random
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api.models import QuantileSketch, Supplier, SupplierESGReport
+from api.cube import CUBE_DIMENSIONS, CUBE_METRICS, cube_cache, cube_query, rebuild_cube
+from api.dashboard import SCORE_FIELDS, dashboard_snapshot, portfolio_overview, rebuild_dashboard_snapshot
+from api.ml_model import (
+    CLUSTER_FEATURES, EthicalScoringModel, SCORING_METRICS, SELF_REPORTED_METRICS, metrics_to_columns, score_memo
+)
+from api.esg_trends import TREND_SCORES, esg_trends, rebuild_esg_trends
+from api.industry_stats import STATS_FIELDS, industry_stats, rebuild_industry_stats
+from api.rescoring import create_rescore_job, run_rescore_job
+from api.sketches import (
+    exact_quantiles, quantile_sketches, rank_error_bound, rebuild_quantile_sketches, sketch_quantiles, SKETCH_METRICS
+)
+
+
+def random_metrics(rng):
+    """Two-decimal supplier metrics as a client would send them, with some absent or None"""
+    metrics = {}
+    for metric in SCORING_METRICS:
+        draw = rng.random()
+        if draw < 0.05:
+            continue
+        if metric in ('social_media_sentiment', 'news_sentiment', 'worker_satisfaction') and draw < 0.15:
+            metrics[metric] = None
+        elif metric in ('co2_emissions', 'water_usage'):
+            metrics[metric] = round(rng.uniform(0, 120), 2)
+        elif metric in ('social_media_sentiment', 'news_sentiment'):
+            metrics[metric] = round(rng.uniform(-1, 1), 2)
+        elif metric == 'worker_satisfaction':
+            metrics[metric] = round(rng.uniform(0, 5), 2)
+        elif metric == 'controversy_count':
+            metrics[metric] = rng.randint(0, 7)
+        else:
+            metrics[metric] = round(rng.uniform(0, 1), 2)
+    return metrics
+
+
+class DashboardQueryCountTests(TestCase):
+    """The supplier dashboard issues a fixed number of queries whatever the size of the portfolio"""
+
+    # Snapshot read, ESG trend rollup, id range and the sample of suppliers to recommend for
+    DASHBOARD_QUERIES = 4
+
+    def _load_portfolio(self, count, industries):
+        Supplier.objects.all().delete()
+        Supplier.objects.bulk_create([
+            Supplier(
+                name=f'Supplier {i}',
+                country=f'Country {i % 7}',
+                industry=f'Industry {i % industries}',
+                co2_emissions=10.0 + i % 90,
+                water_usage=20.0 + i % 60,
+                ethical_score=float(i % 100),
+                environmental_score=float((i * 3) % 100),
+                social_score=float((i * 7) % 100),
+                governance_score=float((i * 11) % 100),
+                risk_level=('low', 'medium', 'high')[i % 3],
+            )
+            for i in range(count)
+        ])
+        # bulk_create bypasses the signals that maintain the snapshot
+        rebuild_dashboard_snapshot()
+
+    def test_query_count_does_not_grow_with_portfolio(self):
+        for count, industries in [(20, 2), (400, 2), (20, 20), (400, 80)]:
+            with self.subTest(suppliers=count, industries=industries):
+                self._load_portfolio(count, industries)
+                # Warm the process-wide benchmark and model caches, then drop the cached response
+                self.client.get('/api/suppliers/dashboard/')
+                cache.clear()
+
+                with self.assertNumQueries(self.DASHBOARD_QUERIES):
+                    response = self.client.get('/api/suppliers/dashboard/')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['total_suppliers'], count)
+
+
+class ScoreBatchTests(SimpleTestCase):
+    """score_batch gives calculate_score's results row for row"""
+
+    def test_batch_matches_scalar_path(self):
+        model = EthicalScoringModel(load_model=False)
+        rows = [random_metrics(random.Random(seed)) for seed in range(5000)]
+        batch = model.score_batch(metrics_to_columns(rows))
+
+        for i, row in enumerate(rows):
+            expected = model._calculate_score(row)
+            actual = {key: batch[key][i] for key in expected}
+            actual = {key: value if key == 'risk_level' else float(value) for key, value in actual.items()}
+            self.assertEqual(actual, expected, msg=f"row {i}: {row}")
+
+
+
+class ScoreMemoTests(SimpleTestCase):
+    """The score memo counts hits and misses and never serves results for other weights"""
+
+    def setUp(self):
+        score_memo.clear()
+        self.addCleanup(score_memo.clear)
+
+    def test_hits_and_misses(self):
+        model = EthicalScoringModel(load_model=False)
+        metrics = random_metrics(random.Random(1))
+
+        first = model.calculate_score(metrics)
+        self.assertEqual((score_memo.hits, score_memo.misses), (0, 1))
+        # Another instance with the same weights shares the entry
+        self.assertEqual(EthicalScoringModel(load_model=False).calculate_score(dict(metrics)), first)
+        self.assertEqual((score_memo.hits, score_memo.misses), (1, 1))
+
+        # A miss on the impact, which reuses the current score and computes the new one
+        model.predict_impact(metrics, {'wage_fairness': 0.9})
+        self.assertEqual((score_memo.hits, score_memo.misses), (2, 3))
+        model.predict_impact(metrics, {'wage_fairness': 0.9})
+        self.assertEqual((score_memo.hits, score_memo.misses), (3, 3))
+        self.assertEqual(score_memo.stats()['size'], 3)
+
+    def test_new_weights_miss(self):
+        model = EthicalScoringModel(load_model=False)
+        metrics = random_metrics(random.Random(2))
+        before = model.calculate_score(metrics)
+
+        model.weights = dict(model.weights, environmental=0.8, social=0.1, governance=0.1)
+        after = model.calculate_score(metrics)
+
+        self.assertEqual((score_memo.hits, score_memo.misses), (0, 2))
+        self.assertEqual(after, model._calculate_score(metrics))
+        self.assertNotEqual(after['overall_score'], before['overall_score'])
+
+    def test_weights_are_read_only(self):
+        model = EthicalScoringModel(load_model=False)
+        with self.assertRaises(TypeError):
+            model.weights['environmental'] = 0.9
+
+
+@override_settings(CLUSTER_REFIT_IN_PROCESS=False)
+class RescoreTests(TestCase):
+    """A portfolio rescore only writes scores that change, and resumes after its checkpoint"""
+
+    def _evaluate(self, count):
+        for seed in range(count):
+            metrics = random_metrics(random.Random(seed))
+            response = self.client.post(
+                '/api/suppliers/evaluate/',
+                dict(metrics, name=f'Supplier {seed}', country='Country', industry=f'Industry {seed % 3}'),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 201)
+
+    def test_unchanged_weights_write_nothing(self):
+        self._evaluate(40)
+        before = dict(Supplier.objects.values_list('id', 'updated_at'))
+
+        job = run_rescore_job(create_rescore_job(), chunk_size=7, workers=1)
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.processed, 40)
+        self.assertEqual(dict(Supplier.objects.values_list('id', 'updated_at')), before)
+
+    def test_resumed_job_continues_after_checkpoint(self):
+        self._evaluate(20)
+        Supplier.objects.update(ethical_score=0.0)
+        ids = list(Supplier.objects.order_by('id').values_list('id', flat=True))
+
+        job = create_rescore_job()
+        job.last_supplier_id = ids[9]
+        job.save()
+        run_rescore_job(job, chunk_size=4, workers=1)
+
+        rescored = dict(Supplier.objects.values_list('id', 'ethical_score'))
+        self.assertTrue(all(rescored[supplier_id] == 0.0 for supplier_id in ids[:10]))
+        self.assertTrue(all(rescored[supplier_id] > 0.0 for supplier_id in ids[10:]))
+        self.assertEqual(job.processed, 10)
+        self.assertEqual(job.last_supplier_id, ids[-1])
+
+
+@override_settings(CLUSTER_REFIT_IN_PROCESS=False)
+class OptimizeTests(TestCase):
+    """Optimized changes reach the target within the bounds, moving only self-reported metrics"""
+
+    def setUp(self):
+        model = EthicalScoringModel(load_model=False)
+        self.suppliers = []
+        for seed in range(10):
+            rng = random.Random(seed)
+            metrics = {metric: round(rng.uniform(0.2, 0.6), 2) for metric in SELF_REPORTED_METRICS}
+            metrics.update(
+                co2_emissions=round(rng.uniform(40, 90), 2), water_usage=round(rng.uniform(40, 90), 2),
+                social_media_sentiment=-0.5, news_sentiment=-0.4, worker_satisfaction=1.5, controversy_count=3,
+            )
+            scores = model.calculate_score(metrics)
+            self.suppliers.append(Supplier.objects.create(
+                name=f'Supplier {seed}', country='Country', ethical_score=scores['overall_score'], **metrics
+            ))
+
+    def _check(self, supplier, result, target, bounds):
+        self.assertTrue(result['feasible'])
+        self.assertGreaterEqual(result['projected_score'], target)
+        metrics = {metric: getattr(supplier, metric) for metric in SCORING_METRICS}
+        for metric, change in result['changes'].items():
+            self.assertIn(metric, SELF_REPORTED_METRICS)
+            low, high = bounds.get(metric, (None, None))
+            if low is not None:
+                self.assertGreaterEqual(change['proposed'], low - 1e-4)
+            if high is not None:
+                self.assertLessEqual(change['proposed'], high + 1e-4)
+            metrics[metric] = change['proposed']
+        rescored = EthicalScoringModel(load_model=False).calculate_score(metrics)
+        self.assertGreaterEqual(rescored['overall_score'], target)
+
+    def test_optimize_meets_target_within_bounds(self):
+        bounds = {'co2_emissions': [30, None], 'wage_fairness': [None, 0.8], 'transparency_score': [None, 0.7]}
+        for supplier in self.suppliers:
+            response = self.client.post(
+                f'/api/suppliers/{supplier.id}/optimize/',
+                {'target_score': 70, 'bounds': bounds}, content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 200)
+            self._check(supplier, response.json(), 70, bounds)
+
+    def test_optimize_batch_meets_target_risk(self):
+        response = self.client.post(
+            '/api/suppliers/optimize_batch/',
+            {'supplier_ids': [supplier.id for supplier in self.suppliers], 'target_risk': 'medium'},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        results = {result['id']: result for result in response.json()['suppliers']}
+        for supplier in self.suppliers:
+            self.assertLess(results[supplier.id]['current_score'], 50)
+            self._check(supplier, results[supplier.id], 50, {})
+
+
+class SupplierClusteringSignalTests(TestCase):
+    """Saving a supplier only labels it; the online model absorbs it after the commit"""
+
+    def _create(self, name):
+        return Supplier.objects.create(name=name, country='Country', co2_emissions=42.0, wage_fairness=0.3)
+
+    def test_new_supplier_absorbed_on_commit(self):
+        with mock.patch.object(EthicalScoringModel, 'update_clustering') as update_clustering, \
+                mock.patch('api.signals.absorb_supplier') as absorb_supplier:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                supplier = self._create('Committed')
+                absorb_supplier.assert_not_called()
+
+        self.assertEqual(len(callbacks), 1)
+        absorb_supplier.assert_called_once_with({feature: getattr(supplier, feature) for feature, _ in CLUSTER_FEATURES})
+        update_clustering.assert_not_called()
+
+    def test_rolled_back_supplier_not_absorbed(self):
+        with mock.patch.object(EthicalScoringModel, 'update_clustering') as update_clustering, \
+                mock.patch('api.signals.absorb_supplier') as absorb_supplier:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with self.assertRaises(RuntimeError), transaction.atomic():
+                    self._create('Rolled back')
+                    raise RuntimeError
+
+        self.assertEqual(callbacks, [])
+        absorb_supplier.assert_not_called()
+        update_clustering.assert_not_called()
+        self.assertFalse(Supplier.objects.filter(name='Rolled back').exists())
+
+
+class SupplyChainGraphTests(TestCase):
+    """The cached supply chain graph is the same whichever process builds it"""
+
+    def test_graph_is_deterministic(self):
+        for i in range(12):
+            Supplier.objects.create(name=f'Supplier {i}', country='Country', industry=f'Industry {i}', ethical_score=50.0)
+
+        graphs = []
+        for _ in range(3):
+            cache.clear()
+            response = self.client.get('/api/supply-chain-graph/')
+            self.assertEqual(response.status_code, 200)
+            graphs.append(response.json())
+
+        self.assertEqual(graphs[1], graphs[0])
+        self.assertEqual(graphs[2], graphs[0])
+        # Unmatched industries still link every supplier to a raw material and a manufacturer
+        targets = {link['target'] for link in graphs[0]['links'] if link['source'].startswith('rm')}
+        self.assertEqual(len(targets), 12)
+
+
+class QuantileSketchTests(TestCase):
+    """Sketch quantiles stay within their rank error bound, through writes and racing creates"""
+
+    QUANTILES = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+
+    def setUp(self):
+        # Compactions pick their survivors at random; seed them so a run is repeatable
+        state = random.getstate()
+        random.seed(24)
+        self.addCleanup(random.setstate, state)
+
+    def _assert_within_bound(self, dimension):
+        rows = quantile_sketches(dimension, SKETCH_METRICS)
+        exact = exact_quantiles(dimension, SKETCH_METRICS, self.QUANTILES)
+        values = {}
+        for supplier in Supplier.objects.values(dimension, *SKETCH_METRICS):
+            for metric in SKETCH_METRICS:
+                if supplier[metric] is not None:
+                    values.setdefault((supplier[dimension] or '', metric), []).append(supplier[metric])
+
+        self.assertEqual(len(rows), len(values))
+        for row in rows:
+            group = sorted(values[(row.key, row.metric)])
+            self.assertEqual(row.count, exact[row.key][row.metric]['count'])
+            allowed = rank_error_bound(row) * row.count
+            for q, estimate in sketch_quantiles(row, self.QUANTILES).items():
+                # The estimate's true rank spans its ties; measure the distance to the target rank
+                target = max(1, math.ceil(q / 100 * row.count))
+                lowest, highest = bisect.bisect_left(group, estimate) + 1, bisect.bisect_right(group, estimate)
+                error = max(0, lowest - target, target - highest)
+                self.assertLessEqual(error, allowed, msg=f"{row.dimension}={row.key} {row.metric} q{q}")
+
+    def test_rank_error_within_bound(self):
+        rng = random.Random(7)
+        Supplier.objects.bulk_create([
+            Supplier(
+                name=f'Supplier {i}', country=f'Country {i % 3}', industry=f'Industry {i % 2}',
+                co2_emissions=round(rng.lognormvariate(3, 1), 2), water_usage=round(rng.uniform(0, 100), 2),
+                environmental_score=round(rng.gauss(60, 15), 2), social_score=round(rng.uniform(20, 90), 2),
+                governance_score=None if i % 10 == 0 else round(rng.betavariate(2, 5) * 100, 2),
+            )
+            for i in range(3000)
+        ])
+        rebuild_quantile_sketches()
+        self._assert_within_bound('industry')
+
+        # Moves between groups and deletes go through the signals, short of a group rebuild
+        suppliers = list(Supplier.objects.order_by('id')[:250])
+        for supplier in suppliers[:150]:
+            supplier.industry = 'Industry 1' if supplier.industry == 'Industry 0' else 'Industry 0'
+            supplier.co2_emissions = round(rng.lognormvariate(3, 1), 2)
+            supplier.save()
+        for supplier in suppliers[150:]:
+            supplier.delete()
+
+        self.assertTrue(all(row.removed_count for row in quantile_sketches('industry', SKETCH_METRICS)))
+        self._assert_within_bound('industry')
+        self._assert_within_bound('country')
+
+    def test_concurrently_created_group(self):
+        for i in range(5):
+            Supplier.objects.create(
+                name=f'Supplier {i}', country='Country', industry='Industry', co2_emissions=10.0 * i,
+                water_usage=5.0 * i, environmental_score=50.0 + i, social_score=60.0 + i, governance_score=70.0 + i
+            )
+        rebuild_quantile_sketches()
+
+        # The first locking read misses the rows, as if another request created them meanwhile
+        select_for_update = QuantileSketch.objects.select_for_update
+        calls = []
+
+        def racing_select_for_update(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                return QuantileSketch.objects.none()
+            return select_for_update(*args, **kwargs)
+
+        with mock.patch.object(QuantileSketch.objects, 'select_for_update', side_effect=racing_select_for_update):
+            Supplier.objects.create(
+                name='Supplier 5', country='Country', industry='Industry', co2_emissions=3.0,
+                water_usage=1.0, environmental_score=40.0, social_score=45.0, governance_score=99.0
+            )
+
+        # Each of the ten groups was created concurrently and then updated in place
+        self.assertEqual(len(calls), 11)
+        self.assertEqual(QuantileSketch.objects.count(), 2 * len(SKETCH_METRICS))
+        self.assertTrue(all(row.count == 6 for row in QuantileSketch.objects.all()))
+        self._assert_within_bound('industry')
+        self._assert_within_bound('country')
+
+
+class SupplierCubeTests(TestCase):
+    """Cube rollups kept by the signals match a GROUP BY over the supplier table"""
+
+    MEASURES = ('count',) + tuple(f'{kind}_{metric}' for metric in CUBE_METRICS for kind in ('sum', 'avg'))
+
+    def _create(self, rng, i):
+        return Supplier.objects.create(
+            name=f'Supplier {i}', country=rng.choice(['France', 'India', '']),
+            industry=rng.choice(['Textiles', 'Electronics', 'Furniture', '']),
+            risk_level=rng.choice(['low', 'medium', 'high']),
+            ethical_score=round(rng.uniform(0, 100), 2), environmental_score=round(rng.uniform(0, 100), 2),
+            social_score=None if i % 4 == 0 else round(rng.uniform(0, 100), 2),
+            governance_score=round(rng.uniform(0, 100), 2), co2_emissions=round(rng.uniform(0, 120), 2),
+        )
+
+    def _group_by(self, group_by, filters):
+        suppliers = Supplier.objects.order_by().annotate(
+            **{f'cube_{dimension}': Coalesce(dimension, Value('')) for dimension in CUBE_DIMENSIONS}
+        )
+        for dimension, values in filters.items():
+            suppliers = suppliers.filter(**{f'cube_{dimension}__in': values})
+        aggregates = {'count': Count('id')}
+        for metric in CUBE_METRICS:
+            aggregates[f'sum_{metric}'] = Coalesce(Sum(metric), Value(0.0))
+            aggregates[f'avg_{metric}'] = Avg(metric)
+        if not group_by:
+            return {(): suppliers.aggregate(**aggregates)}
+        rows = suppliers.values(*(f'cube_{dimension}' for dimension in group_by)).annotate(**aggregates)
+        return {tuple(row.pop(f'cube_{dimension}') or None for dimension in group_by): row for row in rows}
+
+    def _assert_matches_table(self):
+        cube_cache.clear()
+        for group_by, filters in [
+            ((), {}), (('country',), {}), (('industry', 'risk_level'), {}),
+            (CUBE_DIMENSIONS, {}), (('risk_level',), {'country': ['France', '']}),
+        ]:
+            with self.subTest(group_by=group_by, filters=filters):
+                expected = self._group_by(group_by, filters)
+                actual = {
+                    tuple(row.pop(dimension) for dimension in group_by): row
+                    for row in cube_query(filters, group_by, self.MEASURES)
+                }
+                self.assertEqual(set(actual), set(expected))
+                for group, row in actual.items():
+                    for measure in self.MEASURES:
+                        if expected[group][measure] is None:
+                            self.assertIsNone(row[measure])
+                        else:
+                            self.assertAlmostEqual(row[measure], expected[group][measure], places=6)
+        self.assertEqual(rebuild_cube(), 0)
+
+    def test_signals_match_group_by(self):
+        rng = random.Random(25)
+        suppliers = [self._create(rng, i) for i in range(10)]
+        rebuild_cube()
+
+        suppliers += [self._create(rng, i) for i in range(10, 60)]
+        self._assert_matches_table()
+
+        # Moves between cells, metric edits and a partial save
+        for supplier in suppliers[::3]:
+            supplier.country = rng.choice(['France', 'Brazil', ''])
+            supplier.risk_level = rng.choice(['low', 'critical'])
+            supplier.ethical_score = None if supplier.id % 5 == 0 else round(rng.uniform(0, 100), 2)
+            supplier.save()
+        suppliers[1].industry = 'Timber'
+        suppliers[1].save(update_fields=['industry'])
+        self._assert_matches_table()
+
+        for supplier in suppliers[::4]:
+            supplier.delete()
+        self._assert_matches_table()
+
+
+class SupplierWritesMixin:
+    """Creates, moves between groups, edits and deletes of suppliers, all through the model signals"""
+
+    COUNTRIES = ('France', 'India', 'Brazil', '')
+    INDUSTRIES = ('Textiles', 'Electronics', 'Furniture', '', None)
+
+    def _create_supplier(self, rng, i):
+        return Supplier.objects.create(
+            name=f'Supplier {i}', country=rng.choice(self.COUNTRIES), industry=rng.choice(self.INDUSTRIES),
+            risk_level=rng.choice(['low', 'medium', 'high', None]),
+            ethical_score=round(rng.uniform(0, 100), 2), environmental_score=round(rng.uniform(0, 100), 2),
+            social_score=None if i % 4 == 0 else round(rng.uniform(0, 100), 2),
+            governance_score=round(rng.uniform(0, 100), 2), co2_emissions=round(rng.uniform(0, 120), 2),
+            water_usage=None if i % 5 == 0 else round(rng.uniform(0, 120), 2),
+            wage_fairness=round(rng.uniform(0, 1), 2),
+        )
+
+    def _write_suppliers(self, rng, suppliers):
+        """Move, edit and delete some of suppliers; returns the ones left"""
+        for supplier in suppliers[::3]:
+            supplier.country = rng.choice(self.COUNTRIES)
+            supplier.industry = rng.choice(self.INDUSTRIES)
+            supplier.risk_level = rng.choice(['low', 'critical'])
+            supplier.ethical_score = None if supplier.id % 5 == 0 else round(rng.uniform(0, 100), 2)
+            supplier.co2_emissions = round(rng.uniform(0, 120), 2)
+            supplier.wage_fairness = None if supplier.id % 2 else round(rng.uniform(0, 1), 2)
+            supplier.save()
+        for supplier in suppliers[1::5]:
+            supplier.environmental_score = round(rng.uniform(0, 100), 2)
+            supplier.save(update_fields=['environmental_score'])
+        for supplier in suppliers[2::4]:
+            supplier.delete()
+        return [supplier for supplier in suppliers if supplier.id is not None]
+
+
+class DashboardSnapshotTests(SupplierWritesMixin, TestCase):
+    """The dashboard snapshot kept by the signals matches the supplier table"""
+
+    def test_signals_leave_no_drift(self):
+        rng = random.Random(18)
+        suppliers = [self._create_supplier(rng, i) for i in range(10)]
+        rebuild_dashboard_snapshot()
+
+        suppliers += [self._create_supplier(rng, i) for i in range(10, 60)]
+        self._write_suppliers(rng, suppliers)
+
+        snapshot = dashboard_snapshot()
+        expected = portfolio_overview(Supplier.objects.all())
+        self.assertEqual(snapshot['overview']['total_suppliers'], expected['total_suppliers'])
+        for field in SCORE_FIELDS:
+            self.assertAlmostEqual(snapshot['overview'][f'avg_{field}'], expected[f'avg_{field}'], places=6)
+            self.assertEqual(snapshot['overview'][f'{field}_distribution'], expected[f'{field}_distribution'])
+        countries = Supplier.objects.order_by().values('country').annotate(count=Count('id'))
+        self.assertEqual(snapshot['countries'], {row['country']: row['count'] for row in countries})
+        self.assertEqual(rebuild_dashboard_snapshot(), 0)
+
+
+class ESGTrendTests(SupplierWritesMixin, TestCase):
+    """The ESG trend rollup kept by the signals matches the report table"""
+
+    def _create_report(self, rng, supplier):
+        return SupplierESGReport.objects.create(
+            supplier=supplier, report_date=datetime.date(2025, rng.randint(1, 12), rng.randint(1, 28)),
+            environmental_score=round(rng.uniform(0, 100), 2), social_score=round(rng.uniform(0, 100), 2),
+            governance_score=round(rng.uniform(0, 100), 2), summary='Report',
+        )
+
+    def _expected_trends(self, industry=None):
+        months = {}
+        for report in SupplierESGReport.objects.select_related('supplier'):
+            if industry is None or (report.supplier.industry or '') == industry:
+                months.setdefault(report.report_date.replace(day=1), []).append(report)
+        trends = []
+        for month, reports in sorted(months.items()):
+            averages = {score: sum(getattr(report, score) for report in reports) / len(reports) for score in TREND_SCORES}
+            trends.append({
+                'date': month.strftime('%Y-%m'),
+                'report_count': len(reports),
+                'ethical_score': round(sum(averages.values()) / len(TREND_SCORES), 1),
+                **{score: round(average, 1) for score, average in averages.items()},
+            })
+        return trends
+
+    def test_signals_leave_no_drift(self):
+        rng = random.Random(21)
+        suppliers = [self._create_supplier(rng, i) for i in range(30)]
+        reports = [self._create_report(rng, rng.choice(suppliers)) for _ in range(80)]
+
+        # Report edits and deletes, then supplier moves between industries and deletes with their reports
+        for report in reports[::3]:
+            report.report_date = datetime.date(2025, rng.randint(1, 12), 15)
+            report.social_score = round(rng.uniform(0, 100), 2)
+            report.save()
+        for report in reports[1::7]:
+            report.delete()
+        self._write_suppliers(rng, suppliers)
+
+        self.assertEqual(esg_trends(), self._expected_trends())
+        for industry in self.INDUSTRIES[:-1]:
+            with self.subTest(industry=industry):
+                self.assertEqual(esg_trends(industry=industry), self._expected_trends(industry))
+        self.assertEqual(rebuild_esg_trends(), 0)
+
+
+class IndustryStatsTests(SupplierWritesMixin, TestCase):
+    """Industry statistics kept by the signals match the supplier table"""
+
+    def test_signals_leave_no_drift(self):
+        rng = random.Random(23)
+        suppliers = [self._create_supplier(rng, i) for i in range(10)]
+        rebuild_industry_stats()
+
+        suppliers += [self._create_supplier(rng, i) for i in range(10, 60)]
+        self._write_suppliers(rng, suppliers)
+
+        for industry in self.INDUSTRIES[:-1]:
+            with self.subTest(industry=industry):
+                in_industry = Supplier.objects.filter(Q(industry=industry) if industry else Q(industry='') | Q(industry__isnull=True))
+                stats = industry_stats(industry)
+                self.assertEqual(stats['supplier_count'], in_industry.count())
+                for field in STATS_FIELDS:
+                    expected = in_industry.aggregate(count=Count(field), mean=Avg(field), min=Min(field), max=Max(field))
+                    actual = stats['fields'][field]
+                    self.assertEqual(actual['count'], expected['count'], msg=field)
+                    self.assertEqual((actual['min'], actual['max']), (expected['min'], expected['max']), msg=field)
+                    if expected['mean'] is None:
+                        self.assertIsNone(actual['mean'], msg=field)
+                    else:
+                        self.assertAlmostEqual(actual['mean'], expected['mean'], places=6, msg=field)
+        self.assertEqual(rebuild_industry_stats(), 0)
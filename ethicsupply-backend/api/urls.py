@@ -3,6 +3,7 @@ from rest_framework.routers import DefaultRouter
 from .views import SupplierViewSet, dashboard_view, supply_chain_graph_view, health_check, supplier_list, evaluate_supplier
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from .ml_model import score_memo
 
 router = DefaultRouter()
 router.register(r'suppliers', SupplierViewSet)
@@ -15,15 +16,27 @@ router.register(r'suppliers', SupplierViewSet)
 # POST /suppliers/evaluate/
 # GET /suppliers/recommendations/
 # GET /suppliers/summary/
+# GET /suppliers/histogram/
+# GET /suppliers/esg_trends/
+# GET /suppliers/percentiles/
+# GET /suppliers/quantiles/
+# GET /suppliers/cube/
 # GET /suppliers/dashboard/
 # GET /suppliers/{id}/detailed_analysis/
 # POST /suppliers/{id}/simulate_changes/
+# POST /suppliers/simulate_batch/
+# POST /suppliers/{id}/optimize/
+# POST /suppliers/optimize_batch/
+# POST /suppliers/uncertainty/
+# GET /suppliers/compare_profiles/
+# GET /suppliers/sensitivity/
+# GET /suppliers/{id}/neighbors/
 # GET /suppliers/scorecard_settings/
 # POST /suppliers/create_scorecard_settings/
 
 @api_view(['GET'])
 def health_check(request):
-    return Response({"status": "healthy"})
+    return Response({"status": "healthy", "score_memo": score_memo.stats()})
 
 @api_view(['GET'])
 def api_root(request):
@@ -7,11 +7,44 @@ import datetime
 from dateutil.relativedelta import relativedelta
 from .models import Supplier, ScoringWeight, MediaSentiment, SupplierESGReport, Controversy
 from .serializers import SupplierSerializer
-from .ml_model import EthicalScoringModel
+from .ml_model import (
+    EthicalScoringModel, SCORING_METRICS, METRIC_DEFAULTS, SELF_REPORTED_METRICS, RISK_LEVEL_THRESHOLDS,
+    RECOMMENDATION_ACTIONS, score_profiles, scientific_libs_available
+)
+from .scoring_registry import weight_profiles
+from .portfolio import load_metrics, supplier_metric_fields
+from .clustering import cluster_peer_counts
+from .neighbors import nearest_suppliers
+from .recommendations import supplier_recommendations, recommend_for_data
+from .dashboard import dashboard_snapshot, sample_suppliers, metric_histogram
+from .esg_trends import esg_trends, parse_month
+from .percentiles import score_percentiles
+from .industry_stats import industry_stats
+from .sketches import (
+    SKETCH_DIMENSIONS, SKETCH_METRICS, SKETCH_RANK_ERROR,
+    quantile_sketches, sketch_quantiles, rank_error_bound, exact_quantiles
+)
+from .cube import CUBE_DIMENSIONS, cube_query
+from .response_cache import cached_response, SUPPLIERS, ESG
 from rest_framework.views import APIView
 from datetime import datetime, timedelta
 import random
 
+MAX_SIMULATION_SCENARIOS = 10000
+
+# Largest suppliers x samples run accepted by the uncertainty endpoint
+MAX_UNCERTAINTY_DRAWS = 20_000_000
+
+
+def _json_list(values):
+    """Convert a numpy array (or plain list) into JSON-serializable lists"""
+    return values if isinstance(values, list) else values.tolist()
+
+
+def _json_columns(columns):
+    """Convert a dict of score arrays into JSON-serializable lists"""
+    return {key: _json_list(values) for key, values in columns.items()}
+
 @api_view(['GET'])
 def health_check(request):
     """
@@ -48,58 +81,37 @@ def evaluate_supplier(request):
 class SupplierViewSet(viewsets.ModelViewSet):
     queryset = Supplier.objects.all()
     serializer_class = SupplierSerializer
-    ml_model = EthicalScoringModel()
+
+    @property
+    def ml_model(self):
+        """Scoring model, built on first use instead of when the module is imported"""
+        return EthicalScoringModel()
 
     @action(detail=False, methods=['post'])
     def evaluate(self, request):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            # Get customer scoring weights if provided
-            weights = None
+            # Use the compiled scorer of the customer scoring weights if provided
+            ml_model = None
             if 'scoring_weights_id' in request.data:
                 try:
-                    weight_model = ScoringWeight.objects.get(id=request.data['scoring_weights_id'])
-                    weights = {
-                        'environmental': weight_model.environmental_weight,
-                        'social': weight_model.social_weight,
-                        'governance': weight_model.governance_weight,
-                        'external_data': weight_model.external_data_weight,
-                        
-                        # Environmental subcategory weights
-                        'co2_emissions': weight_model.co2_weight,
-                        'water_usage': weight_model.water_usage_weight,
-                        'energy_efficiency': weight_model.energy_efficiency_weight,
-                        'waste_management': weight_model.waste_management_weight,
-                        
-                        # Social subcategory weights
-                        'wage_fairness': weight_model.wage_fairness_weight,
-                        'human_rights': weight_model.human_rights_weight,
-                        'diversity_inclusion': weight_model.diversity_inclusion_weight,
-                        'community_engagement': weight_model.community_engagement_weight,
-                        
-                        # Governance subcategory weights
-                        'transparency': weight_model.transparency_weight,
-                        'corruption_risk': weight_model.corruption_risk_weight,
-                        
-                        # External data subcategory weights
-                        'social_media': weight_model.social_media_weight,
-                        'news_coverage': weight_model.news_coverage_weight,
-                        'worker_reviews': weight_model.worker_reviews_weight,
-                        'controversies': weight_model.controversy_weight,
-                    }
+                    ml_model = weight_profiles.get(request.data['scoring_weights_id'])
                 except ScoringWeight.DoesNotExist:
                     pass
             
-            # Initialize ML model with custom weights if provided
-            ml_model = EthicalScoringModel(weights)
+            if ml_model is None:
+                ml_model = EthicalScoringModel()
             
             # Calculate ethical score
             data = serializer.validated_data
             scores = ml_model.calculate_score(data)
             
             try:
-                # Save supplier with full scores
+                # Save supplier with full scores; its cluster is assigned when it is saved.
+                # Metrics left out are stored as the values they were scored with, so a
+                # rescore with the same weights reproduces these scores.
                 supplier = serializer.save(
+                    **{metric: METRIC_DEFAULTS[metric] for metric in supplier_metric_fields() if metric not in data},
                     ethical_score=scores['overall_score'],
                     environmental_score=scores['environmental_score'],
                     social_score=scores['social_score'],
@@ -107,9 +119,8 @@ class SupplierViewSet(viewsets.ModelViewSet):
                     risk_level=scores['risk_level']
                 )
                 
-                # Generate recommendations using all supplier data for context
-                all_suppliers = list(Supplier.objects.values())
-                recommendations = ml_model.generate_recommendations(data, all_suppliers)
+                # Recommendations against the supplier's cluster and industry benchmarks
+                recommendations = supplier_recommendations([supplier], ml_model)[supplier.id]['recommendations']
                 
                 return Response({
                     'id': supplier.id,
@@ -127,7 +138,7 @@ class SupplierViewSet(viewsets.ModelViewSet):
                 return Response({
                     'scores': scores,
                     'error': f"Could not save supplier: {str(e)}",
-                    'recommendations': ml_model.generate_recommendations(data, list(Supplier.objects.values()))
+                    'recommendations': recommend_for_data(data, ml_model)['recommendations']
                 }, status=status.HTTP_200_OK)
                 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -136,75 +147,49 @@ class SupplierViewSet(viewsets.ModelViewSet):
     def recommendations(self, request):
         try:
             # Get top suppliers by ethical score
-            top_suppliers = self.queryset.order_by('-ethical_score')[:10]
+            top_suppliers = list(self.queryset.order_by('-ethical_score')[:10])
             serializer = self.get_serializer(top_suppliers, many=True)
             
             # Convert serialized data to list
             suppliers_data = serializer.data
+            suppliers_by_id = {supplier.id: supplier for supplier in top_suppliers}
             
-            # Append recommendations for each supplier
+            # Recommendations and explanations for all of them in one batch, against
+            # their cluster and industry benchmarks (cached between requests)
             ml_model = EthicalScoringModel()
-            all_suppliers = list(Supplier.objects.values())
+            engine_results = supplier_recommendations(top_suppliers, ml_model)
+            
+            # Peer counts come from the maintained per-cluster counts
+            peer_counts = cluster_peer_counts(supplier_data.get('cluster_label') for supplier_data in suppliers_data)
             
             for supplier_data in suppliers_data:
                 try:
-                    # Get the full supplier object
-                    supplier_id = supplier_data['id']
-                    try:
-                        supplier = Supplier.objects.get(id=supplier_id)
-                        supplier_dict = {
-                            'co2_emissions': getattr(supplier, 'co2_emissions', 50),
-                            'water_usage': getattr(supplier, 'water_usage', 50),
-                            'energy_efficiency': getattr(supplier, 'energy_efficiency', 0.5),
-                            'waste_management_score': getattr(supplier, 'waste_management_score', 0.5),
-                            'wage_fairness': getattr(supplier, 'wage_fairness', 0.5),
-                            'human_rights_index': getattr(supplier, 'human_rights_index', 0.5),
-                            'diversity_inclusion_score': getattr(supplier, 'diversity_inclusion_score', 0.5),
-                            'community_engagement': getattr(supplier, 'community_engagement', 0.5),
-                            'transparency_score': getattr(supplier, 'transparency_score', 0.5),
-                            'corruption_risk': getattr(supplier, 'corruption_risk', 0.5),
-                            'industry': getattr(supplier, 'industry', 'Manufacturing'),
-                            'country': getattr(supplier, 'country', 'Unknown')
-                        }
-                        
-                        # Generate recommendations
-                        recommendations = ml_model.generate_recommendations(supplier_dict, all_suppliers)
-                        
-                        # Generate AI explanations of why this supplier is recommended
-                        explanations = ml_model.generate_explanation(supplier_dict, all_suppliers)
-                        
-                        # Add to results
-                        supplier_data['recommendations'] = recommendations
-                        supplier_data['ai_explanation'] = explanations
-                        
-                        # Set the recommendation summary as the main recommendation text
-                        supplier_data['recommendation'] = explanations.get('summary', 'No recommendation available.')
-                        
-                        # Add peer insights if clustering is available
-                        supplier_cluster = ml_model.get_supplier_cluster(supplier_dict)
-                        if supplier_cluster is not None:
-                            # Count peers in same cluster
-                            peer_count = sum(1 for s in all_suppliers if ml_model.get_supplier_cluster(s) == supplier_cluster)
-                            try:
-                                percentile = self._calculate_percentile(getattr(supplier, 'ethical_score', 0))
-                            except Exception as e:
-                                percentile = 50  # Default to 50th percentile if calculation fails
-                                
-                            supplier_data['peer_insights'] = {
-                                'cluster': supplier_cluster,
-                                'peer_count': peer_count,
-                                'percentile': percentile
-                            }
-                        
-                    except Supplier.DoesNotExist:
-                        supplier_data['recommendations'] = []
-                        supplier_data['ai_explanation'] = {
-                            'key_strengths': [],
-                            'percentile_insights': [],
-                            'comparative_insights': [],
-                            'summary': 'No data available for this supplier.'
+                    supplier = suppliers_by_id[supplier_data['id']]
+                    result = engine_results[supplier.id]
+                    explanations = result['explanation']
+                    
+                    # Add to results
+                    supplier_data['recommendations'] = result['recommendations']
+                    supplier_data['ai_explanation'] = explanations
+                    
+                    # Set the recommendation summary as the main recommendation text
+                    supplier_data['recommendation'] = explanations.get('summary', 'No recommendation available.')
+                    
+                    # Add peer insights if the supplier has been clustered
+                    supplier_cluster = supplier.cluster_label
+                    if supplier_cluster is not None:
+                        # Count peers in same cluster
+                        peer_count = peer_counts.get(supplier_cluster, 0)
+                        try:
+                            percentile = self._calculate_percentile(getattr(supplier, 'ethical_score', 0))
+                        except Exception as e:
+                            percentile = 50  # Default to 50th percentile if calculation fails
+                            
+                        supplier_data['peer_insights'] = {
+                            'cluster': supplier_cluster,
+                            'peer_count': peer_count,
+                            'percentile': percentile
                         }
-                        supplier_data['recommendation'] = 'No data available for this supplier.'
                 except Exception as inner_e:
                     # Handle any exceptions for individual suppliers
                     import logging
@@ -229,6 +214,7 @@ class SupplierViewSet(viewsets.ModelViewSet):
             return Response({"error": "Failed to generate recommendations"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     @action(detail=False, methods=['get'])
+    @cached_response(SUPPLIERS)
     def summary(self, request):
         stats = {
             'total_suppliers': Supplier.objects.count(),
@@ -239,47 +225,189 @@ class SupplierViewSet(viewsets.ModelViewSet):
         return Response(stats)
 
     @action(detail=False, methods=['get'])
+    @cached_response(SUPPLIERS)
+    def histogram(self, request):
+        """
+        Equal-width histogram of any score or metric, counted in the database
+
+        Query parameters:
+            field: Supplier score or metric to bin (default ethical_score)
+            bins: Number of bins (default 10)
+            min: Lower edge of the first bin (default: the field's minimum)
+            max: Upper edge of the last bin (default: the field's maximum)
+            group_by: industry or country, to also count each group separately
+        """
+        try:
+            params = request.query_params
+            field = params.get('field', 'ethical_score')
+            bins = int(params.get('bins', 10))
+            lower = float(params['min']) if params.get('min') not in (None, '') else None
+            upper = float(params['max']) if params.get('max') not in (None, '') else None
+            histogram = metric_histogram(
+                self.queryset, field, bins=bins, lower=lower, upper=upper, group_by=params.get('group_by') or None
+            )
+        except ValueError as e:
+            return Response({"error": f"Invalid parameters: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(histogram)
+
+    @action(detail=False, methods=['get'])
+    def cube(self, request):
+        """
+        Slice, roll up or drill down supplier counts and metrics by country, industry and risk level
+
+        Answered from the per-process copy of the supplier cube, without querying suppliers.
+
+        Query parameters:
+            country, industry, risk_level: Comma-separated values to keep
+            group_by: Comma-separated dimensions to break down by (default: one total)
+            measures: Comma-separated measures (default count); count, or
+                sum_<metric> / avg_<metric> for the dashboard scores,
+                co2_emissions and water_usage
+        """
+        try:
+            params = request.query_params
+            filters = {
+                dimension: params[dimension].split(',')
+                for dimension in CUBE_DIMENSIONS if params.get(dimension)
+            }
+            group_by = params['group_by'].split(',') if params.get('group_by') else []
+            measures = params['measures'].split(',') if params.get('measures') else ['count']
+            cells = cube_query(filters, group_by, measures)
+        except ValueError as e:
+            return Response({"error": f"Invalid parameters: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'group_by': group_by, 'measures': measures, 'cells': cells})
+
+    @action(detail=False, methods=['get'])
+    @cached_response(SUPPLIERS)
+    def quantiles(self, request):
+        """
+        Approximate quantiles of supplier metrics per industry or country
+
+        Estimates come from KLL sketches maintained as suppliers are written.
+        A reported quantile's rank among the group's values is within
+        rank_error * count of the requested rank with 99% confidence, where
+        rank_error is reported per group (at least 1.65%, growing with the
+        removals the sketch has absorbed since it was last rebuilt).
+
+        Query parameters:
+            dimension: industry or country (default industry)
+            metrics: Comma-separated metrics (default all sketched metrics)
+            q: Comma-separated percentages (default 10,50,90)
+            keys: Comma-separated industries or countries to limit the result to
+            exact: true to compute exact quantiles with a full pass over the table instead
+        """
+        try:
+            params = request.query_params
+            dimension = params.get('dimension', 'industry')
+            if dimension not in SKETCH_DIMENSIONS:
+                raise ValueError(f"dimension must be one of {', '.join(SKETCH_DIMENSIONS)}")
+            metrics = params['metrics'].split(',') if params.get('metrics') else list(SKETCH_METRICS)
+            unknown = [metric for metric in metrics if metric not in SKETCH_METRICS]
+            if unknown:
+                raise ValueError(f"metrics must be among {', '.join(SKETCH_METRICS)}")
+            quantiles = [float(q) for q in params.get('q', '10,50,90').split(',')]
+            if not all(0 <= q <= 100 for q in quantiles):
+                raise ValueError("quantiles must be between 0 and 100")
+            keys = params['keys'].split(',') if params.get('keys') else None
+            exact = params.get('exact', '').lower() in ('1', 'true', 'yes')
+        except ValueError as e:
+            return Response({"error": f"Invalid parameters: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        def label(q):
+            return f'p{q:g}'
+
+        groups = {}
+        if exact:
+            for key, by_metric in exact_quantiles(dimension, metrics, quantiles, keys).items():
+                groups[key or None] = {
+                    metric: dict({'count': values['count'], 'rank_error': 0}, **{label(q): values[q] for q in quantiles})
+                    for metric, values in by_metric.items()
+                }
+        else:
+            for row in quantile_sketches(dimension, metrics, keys):
+                estimates = sketch_quantiles(row, quantiles)
+                groups.setdefault(row.key or None, {})[row.metric] = dict(
+                    {'count': row.count, 'rank_error': round(rank_error_bound(row), 4)},
+                    **{label(q): estimates[q] for q in quantiles}
+                )
+
+        return Response({
+            'dimension': dimension,
+            'quantiles': [label(q) for q in quantiles],
+            'exact': exact,
+            'base_rank_error': 0 if exact else SKETCH_RANK_ERROR,
+            'groups': groups,
+        })
+
+    @action(detail=False, methods=['get'])
+    @cached_response(SUPPLIERS)
+    def percentiles(self, request):
+        """
+        Percentile of every score of every supplier, for list views and exports
+
+        Query parameters:
+            ids: Comma-separated supplier ids to limit the result to
+        """
+        try:
+            suppliers = self.queryset
+            if request.query_params.get('ids'):
+                suppliers = suppliers.filter(id__in=[int(i) for i in request.query_params['ids'].split(',')])
+        except ValueError as e:
+            return Response({"error": f"Invalid parameters: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(score_percentiles.supplier_percentiles(suppliers))
+
+    @action(detail=False, methods=['get'])
+    @cached_response(SUPPLIERS, ESG)
+    def esg_trends(self, request):
+        """
+        Monthly average ESG report scores
+
+        Query parameters:
+            from: First month to include (YYYY-MM or YYYY-MM-DD)
+            to: Last month to include (YYYY-MM or YYYY-MM-DD)
+            industry: Only count reports of suppliers in this industry
+        """
+        try:
+            params = request.query_params
+            start = parse_month(params['from']) if params.get('from') else None
+            end = parse_month(params['to']) if params.get('to') else None
+        except ValueError as e:
+            return Response({"error": f"Invalid parameters: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(esg_trends(start=start, end=end, industry=params.get('industry')))
+
+    @action(detail=False, methods=['get'])
+    @cached_response(SUPPLIERS, ESG)
     def dashboard(self, request):
         # Get all suppliers
         suppliers = self.queryset.all()
         
-        # Calculate stats
-        total_suppliers = suppliers.count()
-        avg_ethical_score = suppliers.aggregate(Avg('ethical_score'))['ethical_score__avg'] or 0
-        avg_environmental_score = suppliers.aggregate(Avg('environmental_score'))['environmental_score__avg'] or 0
-        avg_social_score = suppliers.aggregate(Avg('social_score'))['social_score__avg'] or 0
-        avg_governance_score = suppliers.aggregate(Avg('governance_score'))['governance_score__avg'] or 0
+        # Totals, averages, distributions and breakdowns from the incrementally maintained snapshot
+        snapshot = dashboard_snapshot()
+        overview = snapshot['overview']
+        total_suppliers = overview['total_suppliers']
+        avg_ethical_score = overview['avg_ethical_score']
+        avg_environmental_score = overview['avg_environmental_score']
+        avg_social_score = overview['avg_social_score']
+        avg_governance_score = overview['avg_governance_score']
         
         # Calculate risk assessments
-        risk_counts = dict(suppliers.values('risk_level').annotate(count=Count('id')).values_list('risk_level', 'count'))
+        risk_counts = dict(snapshot['risk_levels'])
         # Ensure all risk levels have a value
         for level in ['low', 'medium', 'high', 'critical']:
             if level not in risk_counts:
                 risk_counts[level] = 0
         
         # Get suppliers by country
-        suppliers_by_country = dict(
-            suppliers.values('country')
-            .annotate(count=Count('id'))
-            .values_list('country', 'count')
-        )
+        suppliers_by_country = dict(snapshot['countries'])
         
-        # Get suppliers by industry
-        try:
-            suppliers_by_industry = dict(
-                suppliers.values('industry')
-                .annotate(count=Count('id'))
-                .values_list('industry', 'count')
-            )
-            
-            # Safely handle None/null values by replacing them with 'Unspecified'
-            if None in suppliers_by_industry:
-                count = suppliers_by_industry.pop(None)
-                suppliers_by_industry['Unspecified'] = count
-                
-        except Exception as e:
-            print(f"Error in suppliers_by_industry: {str(e)}")
-            suppliers_by_industry = {}
+        # Counts, CO2 totals and water usage averages per industry
+        industries = snapshot['industry_rollup']
+        
+        # Get suppliers by industry, replacing None/null with 'Unspecified'
+        suppliers_by_industry = {
+            industry if industry is not None else 'Unspecified': values['count']
+            for industry, values in industries.items()
+        }
         
         # If we have fewer than 3 countries or industries, add some mock data
         if len(suppliers_by_country) < 3:
@@ -298,108 +426,35 @@ class SupplierViewSet(viewsets.ModelViewSet):
             if 'Retail' not in suppliers_by_industry:
                 suppliers_by_industry['Retail'] = 2
         
-        # Create ethical score distribution
-        ethical_score_distribution = [
-            {'range': '0-20', 'count': suppliers.filter(ethical_score__lte=20).count()},
-            {'range': '21-40', 'count': suppliers.filter(ethical_score__gt=20, ethical_score__lte=40).count()},
-            {'range': '41-60', 'count': suppliers.filter(ethical_score__gt=40, ethical_score__lte=60).count()},
-            {'range': '61-80', 'count': suppliers.filter(ethical_score__gt=60, ethical_score__lte=80).count()},
-            {'range': '81-100', 'count': suppliers.filter(ethical_score__gt=80, ethical_score__lte=100).count()},
-        ]
-        
-        # Create environmental, social, governance score distributions
-        environmental_score_distribution = [
-            {'range': '0-20', 'count': suppliers.filter(environmental_score__lte=20).count()},
-            {'range': '21-40', 'count': suppliers.filter(environmental_score__gt=20, environmental_score__lte=40).count()},
-            {'range': '41-60', 'count': suppliers.filter(environmental_score__gt=40, environmental_score__lte=60).count()},
-            {'range': '61-80', 'count': suppliers.filter(environmental_score__gt=60, environmental_score__lte=80).count()},
-            {'range': '81-100', 'count': suppliers.filter(environmental_score__gt=80, environmental_score__lte=100).count()},
-        ]
-        
-        social_score_distribution = [
-            {'range': '0-20', 'count': suppliers.filter(social_score__lte=20).count()},
-            {'range': '21-40', 'count': suppliers.filter(social_score__gt=20, social_score__lte=40).count()},
-            {'range': '41-60', 'count': suppliers.filter(social_score__gt=40, social_score__lte=60).count()},
-            {'range': '61-80', 'count': suppliers.filter(social_score__gt=60, social_score__lte=80).count()},
-            {'range': '81-100', 'count': suppliers.filter(social_score__gt=80, social_score__lte=100).count()},
-        ]
-        
-        governance_score_distribution = [
-            {'range': '0-20', 'count': suppliers.filter(governance_score__lte=20).count()},
-            {'range': '21-40', 'count': suppliers.filter(governance_score__gt=20, governance_score__lte=40).count()},
-            {'range': '41-60', 'count': suppliers.filter(governance_score__gt=40, governance_score__lte=60).count()},
-            {'range': '61-80', 'count': suppliers.filter(governance_score__gt=60, governance_score__lte=80).count()},
-            {'range': '81-100', 'count': suppliers.filter(governance_score__gt=80, governance_score__lte=100).count()},
-        ]
+        # Score distributions
+        ethical_score_distribution = overview['ethical_score_distribution']
+        environmental_score_distribution = overview['environmental_score_distribution']
+        social_score_distribution = overview['social_score_distribution']
+        governance_score_distribution = overview['governance_score_distribution']
         
         # Generate CO2 emissions by industry data
-        co2_emissions_by_industry = []
-        industries = {}
-        
-        for supplier in suppliers:
-            # Safely handle None values for industry
-            industry = getattr(supplier, 'industry', None) or 'Other'
-            
-            if supplier.co2_emissions is not None:
-                industries[industry] = industries.get(industry, 0) + supplier.co2_emissions
-                
-        for industry, total in industries.items():
-            co2_emissions_by_industry.append({'name': industry, 'value': total})
+        co2_emissions_by_industry = [
+            {'name': industry or 'Other', 'value': values['co2_emissions']}
+            for industry, values in industries.items()
+            if values['co2_emissions'] is not None
+        ]
             
         # Generate water usage by industry data
         water_usage_by_industry = []
         for industry in suppliers_by_industry.keys():
-            industry_suppliers = suppliers.filter(industry=industry)
-            if industry_suppliers.exists():
-                avg_usage = industry_suppliers.aggregate(Avg('water_usage'))['water_usage__avg'] or 0
-                water_usage_by_industry.append({
-                    'name': industry,
-                    'value': round(avg_usage, 1)
-                })
-            else:
-                water_usage_by_industry.append({
-                    'name': industry,
-                    'value': 0
-                })
+            values = industries.get(None if industry == 'Unspecified' else industry)
+            water_usage_by_industry.append({
+                'name': industry,
+                'value': round(values['water_usage'] or 0, 1) if values else 0
+            })
         
         # Generate ethical score trends (mock data if not enough historical data)
-        today = datetime.datetime.now().date()
-        trend_data = []
-        
-        # Try to get real data from ESG reports
-        esg_reports = SupplierESGReport.objects.all().order_by('report_date')
-        if esg_reports.exists() and esg_reports.count() >= 3:
-            # Group by month and calculate average scores
-            report_months = {}
-            for report in esg_reports:
-                month_key = report.report_date.strftime('%Y-%m')
-                if month_key not in report_months:
-                    report_months[month_key] = {
-                        'count': 0,
-                        'env_score': 0,
-                        'social_score': 0,
-                        'gov_score': 0
-                    }
-                report_months[month_key]['count'] += 1
-                report_months[month_key]['env_score'] += report.environmental_score
-                report_months[month_key]['social_score'] += report.social_score
-                report_months[month_key]['gov_score'] += report.governance_score
-            
-            # Calculate averages and format for trend data
-            for month, data in report_months.items():
-                avg_env = data['env_score'] / data['count']
-                avg_social = data['social_score'] / data['count']
-                avg_gov = data['gov_score'] / data['count']
-                avg_total = (avg_env + avg_social + avg_gov) / 3
-                
-                trend_data.append({
-                    'date': month,
-                    'ethical_score': round(avg_total, 1),
-                    'environmental_score': round(avg_env, 1),
-                    'social_score': round(avg_social, 1),
-                    'governance_score': round(avg_gov, 1)
-                })
-        else:
+        today = datetime.now().date()
+        # Monthly averages of the ESG reports, from the rollup maintained as reports are written
+        trend_data = esg_trends()
+        if sum(month['report_count'] for month in trend_data) < 3:
+            trend_data = []
+        if not trend_data:
             # Generate mock trend data
             for i in range(6, 0, -1):
                 month_date = today - relativedelta(months=i)
@@ -422,34 +477,23 @@ class SupplierViewSet(viewsets.ModelViewSet):
         ml_model = EthicalScoringModel()
         improvement_opportunities = []
         
-        if suppliers.count() > 0:
-            # Get a sample of suppliers to analyze
-            sample_size = min(10, suppliers.count())
-            sample_suppliers = suppliers.order_by('?')[:sample_size]
+        if total_suppliers > 0:
+            # Get a random sample of suppliers to analyze, looked up by id rather than sorting the table
+            sample_size = min(10, total_suppliers)
+            id_range = suppliers.order_by().aggregate(min_id=Min('id'), max_id=Max('id'))
+            sampled_suppliers = sample_suppliers(suppliers, sample_size, id_range['min_id'], id_range['max_id'])
             
-            all_recommendations = []
-            for supplier in sample_suppliers:
-                supplier_dict = {
-                    'co2_emissions': supplier.co2_emissions,
-                    'water_usage': supplier.water_usage,
-                    'energy_efficiency': supplier.energy_efficiency,
-                    'waste_management_score': supplier.waste_management_score,
-                    'wage_fairness': supplier.wage_fairness,
-                    'human_rights_index': supplier.human_rights_index,
-                    'diversity_inclusion_score': supplier.diversity_inclusion_score,
-                    'community_engagement': supplier.community_engagement,
-                    'transparency_score': supplier.transparency_score,
-                    'corruption_risk': supplier.corruption_risk
-                }
-                
-                # Get recommendations for this supplier
-                recommendations = ml_model.generate_recommendations(supplier_dict)
-                all_recommendations.extend(recommendations)
+            all_recommendations = [
+                recommendation
+                for result in supplier_recommendations(sampled_suppliers, ml_model).values()
+                for recommendation in result['recommendations']
+            ]
             
             # Count the frequency of each recommendation type
             action_counts = {}
             for rec in all_recommendations:
-                action = rec['action']
+                # Group by the kind of action rather than the supplier-specific targets
+                action = RECOMMENDATION_ACTIONS[rec['metric']][1]
                 if action in action_counts:
                     action_counts[action] += 1
                 else:
@@ -534,20 +578,19 @@ class SupplierViewSet(viewsets.ModelViewSet):
                 'corruption_risk': getattr(supplier, 'corruption_risk', 0.5),
                 'industry': getattr(supplier, 'industry', 'Manufacturing'),
                 'country': getattr(supplier, 'country', 'Unknown'),
-                'social_media_sentiment': getattr(supplier, 'social_media_sentiment', 0),
-                'news_sentiment': getattr(supplier, 'news_sentiment', 0),
-                'worker_satisfaction': getattr(supplier, 'worker_satisfaction', 3)
+                'social_media_sentiment': supplier.social_media_sentiment,
+                'news_sentiment': supplier.news_sentiment,
+                'worker_satisfaction': supplier.worker_satisfaction,
+                'controversy_count': supplier.controversy_count
             }
             
             # Initialize ML model
             ml_model = EthicalScoringModel()
             
-            # Generate recommendations
-            all_suppliers = list(Supplier.objects.values())
-            recommendations = ml_model.generate_recommendations(supplier_dict, all_suppliers)
-            
-            # Generate AI explanations
-            explanations = ml_model.generate_explanation(supplier_dict, all_suppliers)
+            # Generate recommendations and AI explanations against the cluster and industry benchmarks
+            result = supplier_recommendations([supplier], ml_model)[supplier.id]
+            recommendations = result['recommendations']
+            explanations = result['explanation']
             
             # Calculate industry benchmarks
             industry_benchmarks = self._calculate_benchmarks(getattr(supplier, 'industry', 'Manufacturing'))
@@ -590,9 +633,10 @@ class SupplierViewSet(viewsets.ModelViewSet):
                 'community_engagement': getattr(supplier, 'community_engagement', 0.5),
                 'transparency_score': getattr(supplier, 'transparency_score', 0.5),
                 'corruption_risk': getattr(supplier, 'corruption_risk', 0.5),
-                'social_media_sentiment': getattr(supplier, 'social_media_sentiment', 0),
-                'news_sentiment': getattr(supplier, 'news_sentiment', 0),
-                'worker_satisfaction': getattr(supplier, 'worker_satisfaction', 3),
+                'social_media_sentiment': supplier.social_media_sentiment,
+                'news_sentiment': supplier.news_sentiment,
+                'worker_satisfaction': supplier.worker_satisfaction,
+                'controversy_count': supplier.controversy_count,
                 'percentiles': percentiles,
                 'industry_benchmarks': industry_benchmarks,
                 'recommendations': recommendations,
@@ -644,9 +688,10 @@ class SupplierViewSet(viewsets.ModelViewSet):
                 'community_engagement': getattr(supplier, 'community_engagement', 0.5),
                 'transparency_score': getattr(supplier, 'transparency_score', 0.5),
                 'corruption_risk': getattr(supplier, 'corruption_risk', 0.5),
-                'social_media_sentiment': getattr(supplier, 'social_media_sentiment', 0),
-                'news_sentiment': getattr(supplier, 'news_sentiment', 0),
-                'worker_satisfaction': getattr(supplier, 'worker_satisfaction', 3)
+                'social_media_sentiment': supplier.social_media_sentiment,
+                'news_sentiment': supplier.news_sentiment,
+                'worker_satisfaction': supplier.worker_satisfaction,
+                'controversy_count': supplier.controversy_count
             }
             
             # Predict impact
@@ -668,20 +713,593 @@ class SupplierViewSet(viewsets.ModelViewSet):
                 {"error": f"Failed to simulate changes: {str(e)}"}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+    @action(detail=False, methods=['post'])
+    def simulate_batch(self, request):
+        """
+        Simulate many change-sets, across one or more suppliers, in a single request
+
+        Accepts either an explicit list of scenarios:
+            {"scenarios": [{"supplier_id": 1, "changes": {"co2_emissions": 20}}, ...]}
+        or a sweep applying every change-set to every listed supplier:
+            {"supplier_ids": [1, 2], "changes": [{"co2_emissions": 20}, {"wage_fairness": 0.9}]}
+
+        Results are returned column-wise, one list entry per supplier or scenario.
+        """
+        try:
+            if 'scenarios' in request.data:
+                scenarios = [
+                    (scenario['supplier_id'], scenario.get('changes') or {})
+                    for scenario in request.data['scenarios']
+                ]
+            else:
+                scenarios = [
+                    (supplier_id, changes)
+                    for supplier_id in request.data.get('supplier_ids', [])
+                    for changes in request.data.get('changes', [])
+                ]
+            scenarios = [(int(supplier_id), dict(changes)) for supplier_id, changes in scenarios]
+            for _, changes in scenarios:
+                for value in changes.values():
+                    if value is not None and not isinstance(value, (int, float)):
+                        raise ValueError(f"Change values must be numbers, got {value!r}")
+        except (KeyError, TypeError, ValueError) as e:
+            return Response({"error": f"Invalid scenarios: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not scenarios:
+            return Response({"error": "No scenarios provided"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(scenarios) > MAX_SIMULATION_SCENARIOS:
+            return Response(
+                {"error": f"At most {MAX_SIMULATION_SCENARIOS} scenarios per request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            supplier_ids = sorted({supplier_id for supplier_id, _ in scenarios})
+            rows, current_metrics = load_metrics(Supplier.objects.filter(id__in=supplier_ids).order_by('id'))
+            row_index = {row['id']: i for i, row in enumerate(rows)}
+            missing = [supplier_id for supplier_id in supplier_ids if supplier_id not in row_index]
+            if missing:
+                return Response(
+                    {'detail': 'Supplier not found', 'supplier_ids': missing},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            result = EthicalScoringModel().predict_impact_batch(
+                current_metrics,
+                [row_index[supplier_id] for supplier_id, _ in scenarios],
+                [changes for _, changes in scenarios]
+            )
+
+            return Response({
+                'suppliers': dict(
+                    {'id': [row['id'] for row in rows]},
+                    **_json_columns(result['current_scores'])
+                ),
+                'scenarios': dict(
+                    {'supplier_id': [supplier_id for supplier_id, _ in scenarios]},
+                    **_json_columns(result['predicted_scores'])
+                ),
+                'improvements': _json_columns(result['improvements'])
+            })
+
+        except Exception as e:
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.error(f"Batch simulation error: {str(e)}")
+            return Response(
+                {"error": f"Failed to simulate changes: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+    def _optimization_params(self, data):
+        """
+        Parse the target, bounds, costs and levers of an optimization request
+
+        Raises:
+            ValueError: If a parameter is missing or malformed
+        """
+        if data.get('target_score') is not None:
+            target = float(data['target_score'])
+        elif data.get('target_risk') in RISK_LEVEL_THRESHOLDS:
+            target = float(RISK_LEVEL_THRESHOLDS[data['target_risk']])
+        else:
+            raise ValueError(f"Provide target_score or a target_risk of {', '.join(RISK_LEVEL_THRESHOLDS)}")
+
+        bounds = {}
+        for metric, (low, high) in (data.get('bounds') or {}).items():
+            if metric not in SCORING_METRICS:
+                raise ValueError(f"Unknown metric {metric!r}")
+            bounds[metric] = (None if low is None else float(low), None if high is None else float(high))
+
+        costs = {metric: float(cost) for metric, cost in (data.get('costs') or {}).items()}
+        if any(cost <= 0 for cost in costs.values()):
+            raise ValueError("costs must be positive")
+
+        # By default only the metrics a supplier reports itself can be changed
+        levers = data.get('levers') or list(SELF_REPORTED_METRICS)
+        unknown = [metric for metric in levers if metric not in SCORING_METRICS]
+        if unknown:
+            raise ValueError(f"Unknown metrics {', '.join(unknown)}")
+
+        return target, bounds, costs, levers
+
+    def _optimization_results(self, rows, result):
+        """Build one response entry per supplier from optimize_changes output"""
+        changes, cost, feasible, current_score, projected_score = (
+            _json_list(result[key]) for key in ['changes', 'cost', 'feasible', 'current_score', 'projected_score']
+        )
+        ml_model = EthicalScoringModel(load_model=False)
+        results = []
+        for i, row in enumerate(rows):
+            if current_score[i] is None or current_score[i] != current_score[i]:
+                # Missing required metrics: calculate_score cannot score this supplier
+                results.append({'id': row['id'], 'feasible': False, 'error': 'Supplier has missing metrics'})
+                continue
+
+            results.append({
+                'id': row['id'],
+                'feasible': bool(feasible[i]),
+                'cost': round(cost[i], 4),
+                'current_score': round(current_score[i], 1),
+                'projected_score': round(projected_score[i], 1),
+                'current_risk_level': ml_model.determine_risk_level(current_score[i]),
+                'projected_risk_level': ml_model.determine_risk_level(projected_score[i]),
+                'changes': {
+                    metric: {
+                        'current': row[metric],
+                        'proposed': round(row[metric] + changes[i][j], 4),
+                        'change': round(changes[i][j], 4)
+                    }
+                    for j, metric in enumerate(SCORING_METRICS) if changes[i][j] != 0
+                }
+            })
+        return results
+
+    @action(detail=True, methods=['post'])
+    def optimize(self, request, pk=None):
+        """
+        Minimum-cost metric changes that take a supplier to a target score or risk level
+
+        Body:
+            target_score: Overall score to reach, or
+            target_risk: Risk level to reach ('low' or 'medium')
+            bounds: Optional {metric: [min, max]} limits on the proposed values
+            costs: Optional {metric: cost} of improving a metric by 1% of its scale
+            levers: Optional list of metrics that may change (default: SELF_REPORTED_METRICS)
+        """
+        try:
+            target, bounds, costs, levers = self._optimization_params(request.data)
+        except (TypeError, ValueError) as e:
+            return Response({"error": f"Invalid parameters: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            rows, metrics = load_metrics(Supplier.objects.filter(id=pk))
+            if not rows:
+                return Response({'detail': 'Supplier not found'}, status=status.HTTP_404_NOT_FOUND)
+
+            result = EthicalScoringModel().optimize_changes(metrics, target, bounds=bounds, costs=costs, levers=levers)
+            return Response(dict({'target_score': target}, **self._optimization_results(rows, result)[0]))
+
+        except Exception as e:
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.error(f"Optimization error for supplier {pk}: {str(e)}")
+            return Response(
+                {"error": f"Failed to optimize supplier: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['post'])
+    def optimize_batch(self, request):
+        """
+        Solve the optimize problem for every supplier of an industry, or a list of suppliers
+
+        Body: industry or supplier_ids, plus the parameters of optimize
+        """
+        try:
+            target, bounds, costs, levers = self._optimization_params(request.data)
+            suppliers = Supplier.objects.order_by('id')
+            if request.data.get('supplier_ids'):
+                suppliers = suppliers.filter(id__in=[int(i) for i in request.data['supplier_ids']])
+            elif request.data.get('industry'):
+                suppliers = suppliers.filter(industry=request.data['industry'])
+            else:
+                raise ValueError("Provide an industry or supplier_ids")
+        except (TypeError, ValueError) as e:
+            return Response({"error": f"Invalid parameters: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            rows, metrics = load_metrics(suppliers)
+            if not rows:
+                return Response({'target_score': target, 'summary': {'suppliers': 0}, 'suppliers': []})
+
+            result = EthicalScoringModel().optimize_changes(metrics, target, bounds=bounds, costs=costs, levers=levers)
+            results = self._optimization_results(rows, result)
+            feasible = [entry for entry in results if entry['feasible']]
+
+            return Response({
+                'target_score': target,
+                'summary': {
+                    'suppliers': len(results),
+                    'already_met': sum(1 for entry in results if entry['feasible'] and not entry['changes']),
+                    'feasible': len(feasible),
+                    'infeasible': len(results) - len(feasible),
+                    'total_cost': round(sum(entry['cost'] for entry in feasible), 4)
+                },
+                'suppliers': results
+            })
+
+        except Exception as e:
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.error(f"Batch optimization error: {str(e)}")
+            return Response(
+                {"error": f"Failed to optimize suppliers: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['post'])
+    def uncertainty(self, request):
+        """
+        Monte Carlo confidence intervals of supplier scores under metric measurement error
+
+        Body:
+            industry / supplier_ids: Optional filters; defaults to the whole portfolio
+            samples: Samples per supplier (default 1000)
+            errors: Optional {metric: sd} or {metric: {"distribution": "normal"|"uniform", "scale": x}}
+            percentiles: Score percentiles to report (default [5, 50, 95])
+            seed: Optional random seed
+        """
+        try:
+            samples = int(request.data.get('samples', 1000))
+            if samples < 1:
+                raise ValueError("samples must be positive")
+            percentiles = [float(q) for q in request.data.get('percentiles', [5, 50, 95])]
+            if not all(0 <= q <= 100 for q in percentiles):
+                raise ValueError("percentiles must be between 0 and 100")
+            seed = request.data.get('seed')
+            seed = int(seed) if seed is not None else None
+            errors = request.data.get('errors')
+
+            suppliers = Supplier.objects.order_by('id')
+            if request.data.get('supplier_ids'):
+                suppliers = suppliers.filter(id__in=[int(i) for i in request.data['supplier_ids']])
+            if request.data.get('industry'):
+                suppliers = suppliers.filter(industry=request.data['industry'])
+        except (TypeError, ValueError) as e:
+            return Response({"error": f"Invalid parameters: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            rows, metrics = load_metrics(suppliers)
+            if len(rows) * samples > MAX_UNCERTAINTY_DRAWS:
+                return Response(
+                    {"error": f"{len(rows)} suppliers x {samples} samples exceeds {MAX_UNCERTAINTY_DRAWS} draws"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            try:
+                result = EthicalScoringModel().score_uncertainty(
+                    metrics, errors=errors, samples=samples, percentiles=percentiles, seed=seed
+                )
+            except (TypeError, ValueError, AttributeError) as e:
+                return Response({"error": f"Invalid errors: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+            def clean(values, digits):
+                # NaN marks suppliers calculate_score cannot score
+                if isinstance(values, list):
+                    return [clean(value, digits) for value in values]
+                return None if values is None or values != values else round(values, digits)
+
+            risk_levels = ['low', 'medium', 'high']
+            mean, std, score_percentiles, risk_probabilities = (
+                _json_list(result[key]) for key in ['mean', 'std', 'percentiles', 'risk_probabilities']
+            )
+            portfolio = result['portfolio']
+
+            return Response({
+                'samples': samples,
+                'percentiles': percentiles,
+                'suppliers': {
+                    'id': [row['id'] for row in rows],
+                    'mean': clean(mean, 2),
+                    'std': clean(std, 3),
+                    'percentiles': clean(score_percentiles, 2),
+                    'risk_probabilities': [
+                        dict(zip(risk_levels, clean(p, 4))) if p is not None else None
+                        for p in risk_probabilities
+                    ]
+                },
+                'portfolio': {
+                    'suppliers': len(rows),
+                    'mean_score_percentiles': clean(_json_list(portfolio['mean_score_percentiles']), 2),
+                    'expected_risk_counts': dict(zip(risk_levels, clean(_json_list(portfolio['expected_risk_counts']), 1))),
+                    'risk_probabilities': dict(zip(risk_levels, clean([
+                        count / len(rows) if rows else 0.0
+                        for count in _json_list(portfolio['expected_risk_counts'])
+                    ], 4)))
+                }
+            })
+
+        except Exception as e:
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.error(f"Uncertainty analysis error: {str(e)}")
+            return Response(
+                {"error": f"Failed to compute score uncertainty: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['get'])
+    def compare_profiles(self, request):
+        """
+        Rank the portfolio under several scoring weight profiles at once
+
+        Query parameters:
+            profiles: Comma-separated ScoringWeight ids; 'builtin' selects the model's
+                built-in weights. The first profile is the baseline for rank shifts.
+            top: Length of the top-N, mover and risk-flip lists (default 10)
+            industry: Only rank suppliers in this industry
+        """
+        try:
+            keys = [key.strip() for key in request.query_params.get('profiles', '').split(',') if key.strip()]
+            if len(keys) < 2:
+                raise ValueError("Select at least two profiles")
+            weight_ids = [int(key) for key in keys if key != 'builtin']
+            top = int(request.query_params.get('top', 10))
+            if top < 1:
+                raise ValueError("top must be positive")
+        except ValueError as e:
+            return Response({"error": f"Invalid parameters: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not scientific_libs_available():
+            return Response(
+                {"error": "Profile comparison requires scientific libraries"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
+        try:
+            weight_models = ScoringWeight.objects.in_bulk(weight_ids)
+            missing = [weight_id for weight_id in weight_ids if weight_id not in weight_models]
+            if missing:
+                return Response(
+                    {'detail': 'Scoring weight profile not found', 'profiles': missing},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            profiles = []
+            for key in keys:
+                if key == 'builtin':
+                    profiles.append({'key': key, 'name': 'Built-in weights', 'weights': dict(EthicalScoringModel(load_model=False).weights)})
+                else:
+                    weight_model = weight_models[int(key)]
+                    profiles.append({'key': key, 'name': weight_model.name, 'weights': weight_model.as_model_weights()})
+
+            suppliers = Supplier.objects.order_by('id')
+            if request.query_params.get('industry'):
+                suppliers = suppliers.filter(industry=request.query_params['industry'])
+            rows, metrics = load_metrics(suppliers, extra_fields=('name',))
+            result = score_profiles(metrics, [profile['weights'] for profile in profiles])
+
+            from .ml_model import np
+            scores = np.asarray(result['overall_score'], dtype=float)
+            risk_levels = np.asarray(result['risk_level'], dtype=object)
+
+            # Rank scorable suppliers under each profile, best first; ties keep id order
+            valid = np.flatnonzero(~np.isnan(scores).any(axis=1))
+            ranks = np.empty((len(valid), len(profiles)), dtype=np.int64)
+            for k in range(len(profiles)):
+                order = np.argsort(-scores[valid, k], kind='stable')
+                ranks[order, k] = np.arange(1, len(valid) + 1)
+
+            def supplier_entry(i, k):
+                return {
+                    'id': rows[i]['id'],
+                    'name': rows[i]['name'],
+                    'score': round(float(scores[i, k]), 1),
+                    'risk_level': risk_levels[i, k]
+                }
+
+            top_lists = {}
+            rank_shifts = {}
+            for k, profile in enumerate(profiles):
+                best = np.argsort(ranks[:, k])[:top]
+                top_lists[profile['key']] = [dict(supplier_entry(valid[p], k), rank=int(ranks[p, k])) for p in best]
+                if k == 0:
+                    continue
+
+                # Positive shifts move up the ranking relative to the baseline profile
+                shift = ranks[:, 0] - ranks[:, k]
+                n = len(valid)
+                rank_shifts[profile['key']] = {
+                    'mean_abs_shift': round(float(np.abs(shift).mean()), 2) if n else 0.0,
+                    'spearman': round(1 - 6 * float((shift.astype(float) ** 2).sum()) / (n * (n ** 2 - 1)), 4) if n > 1 else 1.0,
+                    'up': [
+                        dict(supplier_entry(valid[p], k), rank=int(ranks[p, k]), shift=int(shift[p]))
+                        for p in np.argsort(-shift, kind='stable')[:top] if shift[p] > 0
+                    ],
+                    'down': [
+                        dict(supplier_entry(valid[p], k), rank=int(ranks[p, k]), shift=int(shift[p]))
+                        for p in np.argsort(shift, kind='stable')[:top] if shift[p] < 0
+                    ]
+                }
+
+            # Suppliers whose risk level differs between profiles, widest score spread first
+            flips = np.flatnonzero((risk_levels != risk_levels[:, :1]).any(axis=1))
+            spread = np.nanmax(scores[flips], axis=1) - np.nanmin(scores[flips], axis=1) if len(flips) else np.array([])
+            risk_flips = [
+                {
+                    'id': rows[i]['id'],
+                    'name': rows[i]['name'],
+                    'scores': {profile['key']: round(float(scores[i, k]), 1) for k, profile in enumerate(profiles)},
+                    'risk_levels': {profile['key']: risk_levels[i, k] for k, profile in enumerate(profiles)}
+                }
+                for i in flips[np.argsort(-spread, kind='stable')[:top]]
+            ]
+
+            return Response({
+                'profiles': [{'key': profile['key'], 'name': profile['name']} for profile in profiles],
+                'baseline': profiles[0]['key'],
+                'suppliers': len(rows),
+                'top': top_lists,
+                'rank_shifts': rank_shifts,
+                'risk_flips': {'count': int(len(flips)), 'suppliers': risk_flips}
+            })
+
+        except Exception as e:
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.error(f"Profile comparison error: {str(e)}")
+            return Response(
+                {"error": f"Failed to compare profiles: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['get'])
+    def sensitivity(self, request):
+        """
+        Per-supplier, per-metric marginal contribution to the ethical score
+
+        Query parameters:
+            industry: Only analyse suppliers in this industry
+            supplier_ids: Comma-separated ids to analyse
+            top: Number of cheapest levers to rank per supplier (default 3)
+            cost_<metric>: Cost of improving <metric> by 1% of its scale (default 1)
+        """
+        try:
+            top = int(request.query_params.get('top', 3))
+            costs = {
+                metric: float(request.query_params[f'cost_{metric}'])
+                for metric in SCORING_METRICS
+                if f'cost_{metric}' in request.query_params
+            }
+            if any(cost <= 0 for cost in costs.values()):
+                raise ValueError("costs must be positive")
+            suppliers = Supplier.objects.order_by('id')
+            if request.query_params.get('industry'):
+                suppliers = suppliers.filter(industry=request.query_params['industry'])
+            if request.query_params.get('supplier_ids'):
+                suppliers = suppliers.filter(id__in=[int(i) for i in request.query_params['supplier_ids'].split(',')])
+        except ValueError as e:
+            return Response({"error": f"Invalid parameters: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            rows, metrics = load_metrics(suppliers)
+            if not rows:
+                return Response({'metrics': list(SCORING_METRICS), 'suppliers': [], 'portfolio': {}})
+
+            result = EthicalScoringModel().sensitivity(metrics, costs=costs, top=top)
+            derivatives, gain_per_unit, max_gain, efficiency, levers = (
+                _json_list(result[key]) for key in ['derivatives', 'gain_per_unit', 'max_gain', 'efficiency', 'levers']
+            )
+
+            supplier_results = []
+            for i, row in enumerate(rows):
+                supplier_results.append({
+                    'id': row['id'],
+                    'derivatives': derivatives[i],
+                    'gain_per_unit': gain_per_unit[i],
+                    'max_gain': max_gain[i],
+                    'levers': [
+                        {
+                            'metric': SCORING_METRICS[j],
+                            'points_per_cost': round(efficiency[i][j], 4),
+                            'gain_per_unit': round(gain_per_unit[i][j], 4),
+                            'max_gain': round(max_gain[i][j], 2)
+                        }
+                        for j in levers[i] if gain_per_unit[i][j] > 0
+                    ]
+                })
+
+            # Portfolio view: average leverage of each metric and how often it is the best lever
+            portfolio = {}
+            for j, metric in enumerate(SCORING_METRICS):
+                portfolio[metric] = {
+                    'mean_gain_per_unit': round(sum(g[j] for g in gain_per_unit) / len(rows), 4),
+                    'mean_max_gain': round(sum(g[j] for g in max_gain) / len(rows), 2),
+                    'top_lever_count': sum(
+                        1 for i in range(len(rows)) if levers[i] and levers[i][0] == j and gain_per_unit[i][j] > 0
+                    )
+                }
+
+            return Response({
+                'metrics': list(SCORING_METRICS),
+                'suppliers': supplier_results,
+                'portfolio': portfolio
+            })
+
+        except Exception as e:
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.error(f"Sensitivity analysis error: {str(e)}")
+            return Response(
+                {"error": f"Failed to compute sensitivity: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
             
+    @action(detail=True, methods=['get'])
+    def neighbors(self, request, pk=None):
+        """
+        Suppliers with the most similar metrics
+
+        Query parameters:
+            k: Number of neighbours to return (default 5, at most 100)
+            industry: Only return suppliers in this industry
+        """
+        try:
+            k = int(request.query_params.get('k', 5))
+            if not 1 <= k <= 100:
+                raise ValueError("k must be between 1 and 100")
+        except ValueError as e:
+            return Response({"error": f"Invalid parameters: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            supplier = Supplier.objects.get(pk=pk)
+            neighbors = nearest_suppliers(supplier, k=k, industry=request.query_params.get('industry') or None)
+            if neighbors is None:
+                return Response(
+                    {"error": "Similarity search requires scientific libraries"},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE
+                )
+
+            results = []
+            for neighbor, distance in neighbors:
+                neighbor_data = SupplierSerializer(neighbor).data
+                neighbor_data['distance'] = round(distance, 4)
+                results.append(neighbor_data)
+
+            return Response({'id': supplier.id, 'name': supplier.name, 'neighbors': results})
+
+        except Supplier.DoesNotExist:
+            return Response({'detail': 'Supplier not found'}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.error(f"Neighbour search error for supplier {pk}: {str(e)}")
+            return Response(
+                {"error": f"Failed to find similar suppliers: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
     @action(detail=True, methods=['get'])
     def analytics(self, request, pk=None):
         """Get advanced analytics for a supplier"""
         try:
             supplier = self.get_object()
             
-            # Get similar suppliers
+            # Get the most similar suppliers in the same industry
             industry = getattr(supplier, 'industry', 'Manufacturing')
-            similar_suppliers = Supplier.objects.filter(industry=industry).exclude(id=supplier.id)[:5]
+            neighbors = nearest_suppliers(supplier, k=5, industry=industry)
+            if neighbors is not None:
+                similar_suppliers = [neighbor for neighbor, _ in neighbors]
+            else:
+                similar_suppliers = Supplier.objects.filter(industry=industry).exclude(id=supplier.id)[:5]
             similar_suppliers_serialized = SupplierSerializer(similar_suppliers, many=True).data
             
-            # Calculate industry averages
-            industry_suppliers = Supplier.objects.filter(industry=industry)
+            # Industry averages from the industry's row of running statistics
+            industry_fields = industry_stats(industry)['fields']
             industry_average = {}
             
             # Get average for each field
@@ -689,7 +1307,7 @@ class SupplierViewSet(viewsets.ModelViewSet):
                 'ethical_score', 'environmental_score', 'social_score', 'governance_score',
                 'co2_emissions', 'water_usage'
             ]:
-                avg = industry_suppliers.aggregate(Avg(field))[f'{field}__avg'] or 0
+                avg = industry_fields[field]['mean'] or 0
                 industry_average[field] = round(avg, 2)
                 
             # Add overall_score as a copy of ethical_score for the frontend
@@ -702,7 +1320,7 @@ class SupplierViewSet(viewsets.ModelViewSet):
                 'transparency_score', 'corruption_risk', 'delivery_efficiency',
                 'quality_control_score'
             ]:
-                avg = industry_suppliers.aggregate(Avg(field))[f'{field}__avg'] or 0.5
+                avg = industry_fields[field]['mean'] or 0.5
                 industry_average[field] = round(avg, 2)
             
             # Initialize ML model
@@ -722,14 +1340,14 @@ class SupplierViewSet(viewsets.ModelViewSet):
                 'corruption_risk': getattr(supplier, 'corruption_risk', 0.5),
                 'industry': getattr(supplier, 'industry', 'Manufacturing'),
                 'country': getattr(supplier, 'country', 'Unknown'),
-                'social_media_sentiment': getattr(supplier, 'social_media_sentiment', 0),
-                'news_sentiment': getattr(supplier, 'news_sentiment', 0),
-                'worker_satisfaction': getattr(supplier, 'worker_satisfaction', 3)
+                'social_media_sentiment': supplier.social_media_sentiment,
+                'news_sentiment': supplier.news_sentiment,
+                'worker_satisfaction': supplier.worker_satisfaction,
+                'controversy_count': supplier.controversy_count
             }
             
-            # Generate recommendations
-            all_suppliers = list(Supplier.objects.values())
-            recommendations = ml_model.generate_recommendations(supplier_dict, all_suppliers)
+            # Generate recommendations against the cluster and industry benchmarks
+            recommendations = supplier_recommendations([supplier], ml_model)[supplier.id]['recommendations']
             
             # Generate improvement potential data
             environmental_score = getattr(supplier, 'environmental_score', 0)
@@ -1004,28 +1622,14 @@ class SupplierViewSet(viewsets.ModelViewSet):
     
     def _calculate_percentile(self, value, field='ethical_score'):
         """Calculate the percentile of a value within all suppliers"""
-        if value is None:
-            return 0
-            
-        # Get all values for the field
-        values = list(Supplier.objects.exclude(**{field+'__isnull': True}).values_list(field, flat=True))
-        if not values:
-            return 0
-            
-        # Count how many values are less than the given value
-        count_less = sum(1 for v in values if v < value)
-        
-        # Calculate percentile
-        percentile = (count_less / len(values)) * 100
-        
-        return round(percentile, 1)
+        return score_percentiles.percentile(value, field)
     
     def _calculate_benchmarks(self, industry):
         """Calculate industry benchmarks"""
-        # Get suppliers in the same industry
-        industry_suppliers = Supplier.objects.filter(industry=industry)
+        # One row of running statistics for the industry
+        stats = industry_stats(industry)
         
-        if not industry_suppliers.exists():
+        if not stats['supplier_count']:
             return {
                 'avg_ethical_score': 0,
                 'avg_environmental_score': 0,
@@ -1033,14 +1637,14 @@ class SupplierViewSet(viewsets.ModelViewSet):
                 'avg_governance_score': 0
             }
         
-        # Calculate averages
+        fields = stats['fields']
         benchmarks = {
-            'avg_ethical_score': industry_suppliers.aggregate(Avg('ethical_score'))['ethical_score__avg'] or 0,
-            'avg_environmental_score': industry_suppliers.aggregate(Avg('environmental_score'))['environmental_score__avg'] or 0,
-            'avg_social_score': industry_suppliers.aggregate(Avg('social_score'))['social_score__avg'] or 0,
-            'avg_governance_score': industry_suppliers.aggregate(Avg('governance_score'))['governance_score__avg'] or 0,
-            'best_ethical_score': industry_suppliers.aggregate(Max('ethical_score'))['ethical_score__max'] or 0,
-            'worst_ethical_score': industry_suppliers.aggregate(Min('ethical_score'))['ethical_score__min'] or 0
+            'avg_ethical_score': fields['ethical_score']['mean'] or 0,
+            'avg_environmental_score': fields['environmental_score']['mean'] or 0,
+            'avg_social_score': fields['social_score']['mean'] or 0,
+            'avg_governance_score': fields['governance_score']['mean'] or 0,
+            'best_ethical_score': fields['ethical_score']['max'] or 0,
+            'worst_ethical_score': fields['ethical_score']['min'] or 0
         }
         
         # Round values
@@ -1052,6 +1656,7 @@ class SupplierViewSet(viewsets.ModelViewSet):
     def _generate_improvement_scenarios(self, supplier_data, ml_model):
         """Generate improvement scenarios for the supplier"""
         scenarios = []
+        current_scores = ml_model.calculate_score(supplier_data)
         
         # Environmental improvements
         env_changes = {
@@ -1060,7 +1665,7 @@ class SupplierViewSet(viewsets.ModelViewSet):
             'energy_efficiency': min(1.0, supplier_data.get('energy_efficiency', 0.5) * 1.2),  # 20% increase
             'waste_management_score': min(1.0, supplier_data.get('waste_management_score', 0.5) * 1.2)  # 20% increase
         }
-        env_impact = ml_model.predict_impact(supplier_data, env_changes)
+        env_impact = ml_model.predict_impact(supplier_data, env_changes, current_scores)
         scenarios.append({
             'name': 'Environmental Focus',
             'description': 'Improve environmental metrics by 20%',
@@ -1075,7 +1680,7 @@ class SupplierViewSet(viewsets.ModelViewSet):
             'diversity_inclusion_score': min(1.0, supplier_data.get('diversity_inclusion_score', 0.5) * 1.2),  # 20% increase
             'community_engagement': min(1.0, supplier_data.get('community_engagement', 0.5) * 1.2)  # 20% increase
         }
-        social_impact = ml_model.predict_impact(supplier_data, social_changes)
+        social_impact = ml_model.predict_impact(supplier_data, social_changes, current_scores)
         scenarios.append({
             'name': 'Social Responsibility Focus',
             'description': 'Improve social metrics by 20%',
@@ -1088,7 +1693,7 @@ class SupplierViewSet(viewsets.ModelViewSet):
             'transparency_score': min(1.0, supplier_data.get('transparency_score', 0.5) * 1.2),  # 20% increase
             'corruption_risk': max(0, supplier_data.get('corruption_risk', 0.5) * 0.8)  # 20% decrease
         }
-        gov_impact = ml_model.predict_impact(supplier_data, gov_changes)
+        gov_impact = ml_model.predict_impact(supplier_data, gov_changes, current_scores)
         scenarios.append({
             'name': 'Governance Focus',
             'description': 'Improve governance metrics by 20%',
@@ -1103,7 +1708,7 @@ class SupplierViewSet(viewsets.ModelViewSet):
             'wage_fairness': min(1.0, supplier_data.get('wage_fairness', 0.5) * 1.1),  # 10% increase
             'transparency_score': min(1.0, supplier_data.get('transparency_score', 0.5) * 1.1)  # 10% increase
         }
-        balanced_impact = ml_model.predict_impact(supplier_data, balanced_changes)
+        balanced_impact = ml_model.predict_impact(supplier_data, balanced_changes, current_scores)
         scenarios.append({
             'name': 'Balanced Approach',
             'description': 'Make moderate improvements across all areas',
@@ -1124,14 +1729,16 @@ class SupplierViewSet(viewsets.ModelViewSet):
         return suggestions
 
 @api_view(['GET'])
+@cached_response(SUPPLIERS)
 def dashboard_view(request):
     """Standalone dashboard view function that doesn't require a viewset instance"""
     try:
-        # Get suppliers
-        suppliers = Supplier.objects.all()
+        # Serve from the incrementally maintained snapshot
+        snapshot = dashboard_snapshot()
+        overview = snapshot['overview']
         
         # Calculate stats
-        total_suppliers = suppliers.count()
+        total_suppliers = overview['total_suppliers']
         
         if total_suppliers == 0:
             # Return empty stats if no suppliers
@@ -1144,42 +1751,25 @@ def dashboard_view(request):
                 'co2_emissions_by_industry': []
             })
             
-        # Calculate averages, handling NULL values
-        avg_ethical_score = suppliers.filter(ethical_score__isnull=False).aggregate(Avg('ethical_score'))['ethical_score__avg'] or 0
-        avg_co2_emissions = suppliers.filter(co2_emissions__isnull=False).aggregate(Avg('co2_emissions'))['co2_emissions__avg'] or 0
+        # Averages over suppliers with a value
+        avg_ethical_score = overview['avg_ethical_score']
+        avg_co2_emissions = overview['avg_co2_emissions']
         
         # Group by country
         suppliers_by_country = {}
-        for supplier in suppliers:
-            country = supplier.country or 'Unknown'
-            suppliers_by_country[country] = suppliers_by_country.get(country, 0) + 1
+        for country, count in snapshot['countries'].items():
+            country = country or 'Unknown'
+            suppliers_by_country[country] = suppliers_by_country.get(country, 0) + count
             
-        # Create ethical score distribution
-        ranges = ["0-20", "21-40", "41-60", "61-80", "81-100"]
-        ethical_score_distribution = []
-        
-        for range_str in ranges:
-            lower, upper = map(int, range_str.split('-'))
-            count = suppliers.filter(
-                ethical_score__isnull=False,
-                ethical_score__gte=lower,
-                ethical_score__lte=upper
-            ).count()
-            ethical_score_distribution.append({'range': range_str, 'count': count})
+        # Ethical score distribution
+        ethical_score_distribution = overview['ethical_score_distribution']
             
         # Create CO2 emissions by industry
-        co2_emissions_by_industry = []
-        industries = {}
-        
-        for supplier in suppliers:
-            # Safely handle None values for industry
-            industry = getattr(supplier, 'industry', None) or 'Other'
-            
-            if supplier.co2_emissions is not None:
-                industries[industry] = industries.get(industry, 0) + supplier.co2_emissions
-                
-        for industry, total in industries.items():
-            co2_emissions_by_industry.append({'name': industry, 'value': total})
+        co2_emissions_by_industry = [
+            {'name': industry or 'Other', 'value': values['co2_emissions']}
+            for industry, values in snapshot['industry_rollup'].items()
+            if values['co2_emissions'] is not None
+        ]
             
         # Build and return response
         return Response({
@@ -1251,6 +1841,7 @@ class MLStatusView(APIView):
         return Response(ml_status)
 
 @api_view(['GET'])
+@cached_response(SUPPLIERS)
 def supply_chain_graph_view(request):
     """Generate a supply chain relationship graph showing connections between suppliers and other entities."""
     try:
@@ -1278,7 +1869,9 @@ def supply_chain_graph_view(request):
                     'level': 2  # Suppliers are at level 2
                 })
             except Exception as supplier_error:
-                print(f"Error processing supplier: {supplier_error}")
+                import logging
+                logger = logging.getLogger(__name__)
+                logger.warning(f"Error processing supplier: {supplier_error}")
                 # Skip this supplier and continue with others
                 continue
         
@@ -1317,7 +1910,8 @@ def supply_chain_graph_view(request):
         
         # For each supplier, create links to raw materials and manufacturers
         # This is where we'd use real relationships from a database in a production system
-        # For now, we'll create semi-random connections based on supplier properties
+        # For now, connections follow supplier properties; the rest are spread by supplier id
+        # so the cached graph is the same whichever process builds it
         for supplier in suppliers:
             try:
                 supplier_id = f's{supplier.get("id", 0)}'
@@ -1344,9 +1938,9 @@ def supply_chain_graph_view(request):
                 elif industry and ('chemical' in industry or 'energy' in industry):
                     links.append({'source': 'rm5', 'target': supplier_id, 'ethical': is_ethical_source})
                 else:
-                    # If no specific industry match, connect to a random raw material
-                    random_rm = random.choice(raw_materials)
-                    links.append({'source': random_rm['id'], 'target': supplier_id, 'ethical': is_ethical_source})
+                    # If no specific industry match, spread suppliers over the raw materials
+                    raw_material = raw_materials[supplier.get('id', 0) % len(raw_materials)]
+                    links.append({'source': raw_material['id'], 'target': supplier_id, 'ethical': is_ethical_source})
                 
                 # Connect suppliers to manufacturers
                 # Here we'll make somewhat logical connections based on supplier ethical score and industry
@@ -1357,11 +1951,13 @@ def supply_chain_graph_view(request):
                 elif industry and ('wood' in industry or 'furniture' in industry):
                     links.append({'source': supplier_id, 'target': 'm3', 'ethical': is_ethical_source})
                 else:
-                    # Random manufacturer connection for other industries
-                    random_manufacturer = random.choice(manufacturers)
-                    links.append({'source': supplier_id, 'target': random_manufacturer['id'], 'ethical': is_ethical_source})
+                    # Spread other industries over the manufacturers
+                    manufacturer = manufacturers[supplier.get('id', 0) % len(manufacturers)]
+                    links.append({'source': supplier_id, 'target': manufacturer['id'], 'ethical': is_ethical_source})
             except Exception as link_error:
-                print(f"Error creating links for supplier: {link_error}")
+                import logging
+                logger = logging.getLogger(__name__)
+                logger.warning(f"Error creating links for supplier: {link_error}")
                 # Skip this supplier's links and continue with others
                 continue
         
@@ -1381,9 +1977,9 @@ def supply_chain_graph_view(request):
         })
         
     except Exception as e:
-        import traceback
-        print(f"Error generating supply chain graph: {str(e)}")
-        print(traceback.format_exc())
+        import logging
+        logger = logging.getLogger(__name__)
+        logger.exception(f"Error generating supply chain graph: {str(e)}")
         return Response(
             {"error": "Failed to generate supply chain graph data"},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -79,6 +79,46 @@ else:
         }
     }
 
+# Cache configuration
+# Responses of the read-heavy endpoints are cached and invalidated by tags on writes.
+# Local memory is per process; set CACHE_DIR to share a file-based cache between the
+# workers of one host, or REDIS_URL for a cache shared by every host.
+REDIS_URL = os.environ.get('REDIS_URL')
+CACHE_DIR = os.environ.get('CACHE_DIR')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+elif CACHE_DIR:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+            'OPTIONS': {'MAX_ENTRIES': 1000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'ethicsupply',
+            'OPTIONS': {'MAX_ENTRIES': 1000},
+        }
+    }
+
+# Seconds a cached response may be served even without an invalidating write. With the
+# per-process local memory cache this also bounds how long invalidations made by other
+# workers or management commands take to reach a process.
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))
+
+# Whether a web process that requests a clustering refit also launches it in a detached
+# process. Serverless functions are frozen once they respond, so on Vercel the requested
+# refit is left to a scheduled `manage.py recluster_suppliers --if-needed` instead.
+CLUSTER_REFIT_IN_PROCESS = os.environ.get('CLUSTER_REFIT_IN_PROCESS', 'False' if os.environ.get('VERCEL') else 'True') == 'True'
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',